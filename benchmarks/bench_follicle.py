@@ -0,0 +1,177 @@
+"""Scaling benchmark of the follicle component build
+
+Runs Component.addObjects and the joint step against the in-memory stand-ins
+of maya.cmds, maya.api.OpenMaya, pymel.core and the mGear base classes found in
+benchmarks/standins, so it only needs Python and NumPy.
+
+For every locator count it reports the wall time, the number of maya.cmds
+commands issued and the number of nodes created, then checks that none of
+them grows faster than the locator count. The exit code is 1 when a scaling
+exponent goes over its limit.
+
+    python benchmarks/bench_follicle.py
+    python benchmarks/bench_follicle.py --sizes 10 100 1000 --attach-mode uvPin --json report.json
+
+With --uv-cache the scene gets a path in a temporary directory and every
+build runs twice with the useUVCache setting: cold, without a cache file, then
+warm, reading the U/V parameters the first build saved. The warm wall time
+is reported in its own column.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(HERE, "standins"), os.path.dirname(HERE)]
+
+from maya import _standin, cmds  # noqa: E402
+from mgear.shifter import component as mgear_component  # noqa: E402
+
+import follicle  # noqa: E402
+from follicle import constants, profiler  # noqa: E402
+
+
+SIZES = [10, 100, 1000, 10000]
+METRICS = ["seconds", "commands", "nodes"]
+MESH_RESOLUTION = 64
+
+
+def build_component(locator_count, attach_mode="follicle", use_offset_parent_matrix=False, seed=0,
+                    mesh_resolution=MESH_RESOLUTION, profile=False, scene_path=None):
+    """
+    Build one component with locator_count guide locators in a fresh scene.
+
+    The surface is a quad grid of mesh_resolution by mesh_resolution faces over
+    the unit square of the XZ plane.
+
+    :param profile: time the build phases, see follicle.profiler
+    :param scene_path: file name of the scene, the build uses the U/V cache
+        next to it when given, see follicle.cache
+    :return: dict with the locator count, seconds, commands, nodes and the
+        phases of the build profiler, empty when profile is False
+    """
+    _standin.reset()
+    profiler.set_enabled(profile)
+    _standin.scene.scene_name = scene_path or ""
+    rig = mgear_component.Rig()
+    surface = cmds.createNode("transform", name="surface")
+    surface_shape = cmds.createNode("mesh", name="surfaceShape", parent=surface)
+    _standin.scene.find(surface_shape).geometry = _standin.grid_mesh(mesh_resolution)
+
+    random_generator = random.Random(seed)
+    positions = [(random_generator.random(), random_generator.uniform(-0.1, 0.1), random_generator.random())
+                 for _ in range(locator_count)]
+    settings = {"comp_name": "follicle",
+                "surfaceName": surface,
+                "attachMode": constants.ATTACH_MODES.index(attach_mode),
+                "useOffsetParentMatrix": use_offset_parent_matrix,
+                "useUVCache": bool(scene_path),
+                "uvSolver": 0,
+                "useProxyMesh": False,
+                "proxyRadius": 0.1,
+                "useLOD": False,
+                "primaryCount": 32,
+                "freezeStaticSurfaces": False,
+                "useSymmetry": False,
+                "instanceControlShapes": False,
+                "buildChunkSize": 256}
+    component = follicle.Component(rig, mgear_component.Guide(positions, settings))
+
+    scene = _standin.scene
+    commands_before = sum(scene.command_log.values())
+    nodes_before = scene.created_count
+    start = time.perf_counter()
+    component.addObjects()
+    component.jointStructure()
+    seconds = time.perf_counter() - start
+
+    return {"locators": locator_count,
+            "seconds": seconds,
+            "commands": sum(scene.command_log.values()) - commands_before,
+            "nodes": scene.created_count - nodes_before,
+            "phases": component.build_profiler.report()["phases"]}
+
+
+def scaling_exponents(results, metric, min_size=100):
+    """Log-log slope of a metric between consecutive sizes, 1.0 is linear"""
+    points = [(result["locators"], result[metric]) for result in results
+              if result["locators"] >= min_size and result[metric] > 0]
+    return [math.log(value_b / value_a) / math.log(size_b / size_a)
+            for (size_a, value_a), (size_b, value_b) in zip(points, points[1:])]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES,
+                        help="guide locator counts to build")
+    parser.add_argument("--attach-mode", choices=constants.ATTACH_MODES, default="follicle")
+    parser.add_argument("--offset-parent-matrix", action="store_true",
+                        help="build with the useOffsetParentMatrix setting")
+    parser.add_argument("--mesh-resolution", type=int, default=MESH_RESOLUTION,
+                        help="quads along each side of the surface grid")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="builds per size, the fastest one is kept")
+    parser.add_argument("--max-time-exponent", type=float, default=1.3,
+                        help="limit of the wall time scaling exponent")
+    parser.add_argument("--max-count-exponent", type=float, default=1.05,
+                        help="limit of the command and node count scaling exponents")
+    parser.add_argument("--uv-cache", action="store_true",
+                        help="build every size cold then warm with the U/V cache of a saved scene")
+    parser.add_argument("--json", help="write the results and the profiled build phases to this file")
+    args = parser.parse_args(argv)
+
+    metrics = METRICS + ["warm_seconds"] if args.uv_cache else METRICS
+    results = []
+    print(" ".join("{:>12}".format(name) for name in ["locators"] + metrics))
+    with tempfile.TemporaryDirectory() as scene_dir:
+        for size in sorted(args.sizes):
+            runs = []
+            warm_seconds = []
+            for run in range(args.repeat):
+                kwargs = dict(attach_mode=args.attach_mode, use_offset_parent_matrix=args.offset_parent_matrix,
+                              seed=run, mesh_resolution=args.mesh_resolution, profile=bool(args.json))
+                if args.uv_cache:
+                    kwargs["scene_path"] = os.path.join(scene_dir, "bench_{}_{}.ma".format(size, run))
+                runs.append(build_component(size, **kwargs))
+                if args.uv_cache:
+                    warm_seconds.append(build_component(size, **kwargs)["seconds"])
+            result = min(runs, key=lambda run: run["seconds"])
+            if args.uv_cache:
+                result["warm_seconds"] = min(warm_seconds)
+            results.append(result)
+            print(" ".join("{:>12.4f}".format(result[name]) if isinstance(result[name], float)
+                           else "{:>12}".format(result[name]) for name in ["locators"] + metrics))
+
+    failures = []
+    exponents = {}
+    for metric in metrics:
+        exponents[metric] = scaling_exponents(results, metric)
+        limit = args.max_time_exponent if metric.endswith("seconds") else args.max_count_exponent
+        worst = max(exponents[metric] or [0.0])
+        print("{} scaling exponent: {:.3f} (limit {})".format(metric, worst, limit))
+        if worst > limit:
+            failures.append(metric)
+
+    if args.json:
+        with open(args.json, "w") as json_file:
+            json.dump({"attach_mode": args.attach_mode,
+                       "offset_parent_matrix": args.offset_parent_matrix,
+                       "uv_cache": args.uv_cache,
+                       "results": results,
+                       "exponents": exponents,
+                       "failures": failures}, json_file, indent=2)
+
+    if failures:
+        print("Super-linear scaling: {}".format(", ".join(failures)))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
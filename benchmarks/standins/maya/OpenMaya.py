@@ -0,0 +1 @@
+"""maya.OpenMaya (API 1.0) stand-in, nothing of it is used by the build"""
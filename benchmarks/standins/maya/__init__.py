@@ -0,0 +1 @@
+"""Stand-in for the parts of Maya the follicle component build uses, see _standin"""
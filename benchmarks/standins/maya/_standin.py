@@ -0,0 +1,332 @@
+"""In-memory node graph backing the maya.cmds and OpenMaya stand-ins
+
+Only what the follicle component build needs is modelled: typed nodes with a
+DAG hierarchy, unique names, attribute values, connections, locks and a few
+compute hooks for the outputs the build reads back. Every maya.cmds call is
+recorded so the benchmarks can count them.
+
+Name lookups are dictionary based, so any growth of the build time faster
+than the number of locators comes from the component, not from the stand-in.
+"""
+
+import collections
+import itertools
+import math
+import re
+
+
+DAG_TYPES = {"transform", "joint", "follicle", "mesh", "nurbsSurface", "nurbsCurve",
+             "locator", "parentConstraint"}
+SHAPE_TYPES = {"follicle", "mesh", "nurbsSurface", "nurbsCurve", "locator"}
+
+ATTR_ALIASES = {"t": "translate", "r": "rotate", "s": "scale", "v": "visibility",
+                "tx": "translateX", "ty": "translateY", "tz": "translateZ",
+                "rx": "rotateX", "ry": "rotateY", "rz": "rotateZ",
+                "sx": "scaleX", "sy": "scaleY", "sz": "scaleZ",
+                "opm": "offsetParentMatrix", "wm": "worldMatrix"}
+VECTOR_CHILDREN = {"translate": "XYZ", "rotate": "XYZ", "scale": "XYZ"}
+DEFAULTS = {"scale": (1.0, 1.0, 1.0), "visibility": True}
+
+IDENTITY = (1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0)
+
+# matrix outputs of the math nodes are not evaluated, they read as identity
+DEFAULTS["matrixSum"] = IDENTITY
+
+
+class Node(object):
+    """One node of the stand-in scene"""
+
+    _uuids = itertools.count(1)
+
+    def __init__(self, node_type, name):
+        self.type = node_type
+        self.name = name
+        self.parent = None
+        self.children = []
+        self.values = {}
+        self.locked = set()
+        self.alive = False
+        self.uuid = "00000000-0000-0000-0000-{:012d}".format(next(Node._uuids))
+        # MeshGeometry of mesh nodes
+        self.geometry = None
+
+    @property
+    def is_dag(self):
+        return self.type in DAG_TYPES
+
+    def path(self):
+        names = []
+        node = self
+        while node is not None:
+            names.append(node.name)
+            node = node.parent
+        return "|" + "|".join(reversed(names))
+
+
+def normalize_attr(attr_path):
+    """Long attribute names for the aliases the build uses"""
+    parts = []
+    for part in attr_path.split("."):
+        index = ""
+        if part.endswith("]"):
+            part, index = part[:-1].split("[")
+            index = "[{}]".format(index)
+        parts.append(ATTR_ALIASES.get(part, part) + index)
+    return ".".join(parts)
+
+
+MeshGeometry = collections.namedtuple(
+    "MeshGeometry", ["points", "face_counts", "face_vertices", "uvs", "uv_ids", "triangles"])
+
+
+def grid_mesh(resolution):
+    """
+    Quad grid over the unit square of the XZ plane, UVs following X and Z.
+
+    :param resolution: number of quads along each side
+    :return: MeshGeometry, triangles lists the vertices of the two triangles
+        of every quad
+    """
+    side = resolution + 1
+    points = [(x / float(resolution), 0.0, z / float(resolution)) for z in range(side) for x in range(side)]
+    face_vertices = []
+    triangles = []
+    for z in range(resolution):
+        for x in range(resolution):
+            a, b, c, d = z * side + x, z * side + x + 1, (z + 1) * side + x + 1, (z + 1) * side + x
+            # counter clockwise seen from +Y, so the normals point up
+            face_vertices.extend([a, d, c, b])
+            triangles.extend([a, d, c, a, c, b])
+    return MeshGeometry(points=points,
+                        face_counts=[4] * resolution * resolution,
+                        face_vertices=face_vertices,
+                        uvs=[(x, z) for x, _, z in points],
+                        uv_ids=list(face_vertices),
+                        triangles=triangles)
+
+
+def _euler_matrix(rotate, translate, scale):
+    rx, ry, rz = [math.radians(angle) for angle in rotate]
+    cx, sx, cy, sy, cz, sz = math.cos(rx), math.sin(rx), math.cos(ry), math.sin(ry), math.cos(rz), math.sin(rz)
+    # xyz rotate order, row vectors like Maya
+    rows = [(cy * cz, cy * sz, -sy),
+            (sx * sy * cz - cx * sz, sx * sy * sz + cx * cz, sx * cy),
+            (cx * sy * cz + sx * sz, cx * sy * sz - sx * cz, cx * cy)]
+    matrix = []
+    for row, factor in zip(rows, scale):
+        matrix.extend([value * factor for value in row] + [0.0])
+    matrix.extend(list(translate) + [1.0])
+    return tuple(matrix)
+
+
+class Scene(object):
+    """Nodes, connections and the log of the commands issued"""
+
+    def __init__(self):
+        self.nodes = {}
+        self.inputs = {}
+        self.name_counters = collections.defaultdict(int)
+        self.command_log = collections.Counter()
+        self.created_count = 0
+        self.node_added_callbacks = {}
+        self.command_callbacks = {}
+        self.compute_hooks = {}
+        self.undo_state = True
+        # undoable commands, None opens a chunk
+        self.undo_queue = []
+        self.plugins = {}
+        self.current_time = 1.0
+        self.scene_name = ""
+
+    # ---------------------------------------------------------------
+    # nodes
+    # ---------------------------------------------------------------
+    def unique_name(self, name):
+        if name not in self.nodes:
+            return name
+        base = re.sub(r"\d+$", "", name)
+        while True:
+            self.name_counters[base] += 1
+            candidate = "{}{}".format(base, self.name_counters[base])
+            if candidate not in self.nodes:
+                return candidate
+
+    def new_node(self, node_type, name=None):
+        """Node that is not part of the scene yet, see add_node"""
+        return Node(node_type, name or "{}1".format(node_type))
+
+    def add_node(self, node, parent=None):
+        node.name = self.unique_name(node.name)
+        node.alive = True
+        self.nodes[node.name] = node
+        if parent is not None:
+            self.reparent(node, parent)
+        self.created_count += 1
+        for callback in list(self.node_added_callbacks.values()):
+            callback(node)
+        return node
+
+    def create(self, node_type, name=None, parent=None):
+        """Create a node, a shape without parent gets its own transform like in Maya"""
+        if node_type in SHAPE_TYPES:
+            if parent is None:
+                parent = self.add_node(self.new_node("transform", "{}1".format(node_type)))
+            name = name or "{}Shape1".format(node_type)
+        return self.add_node(self.new_node(node_type, name), parent)
+
+    def rename(self, node, name):
+        del self.nodes[node.name]
+        node.name = self.unique_name(name)
+        self.nodes[node.name] = node
+        return node.name
+
+    def reparent(self, node, parent):
+        if node.parent is not None:
+            node.parent.children.remove(node)
+        node.parent = parent
+        if parent is not None:
+            parent.children.append(node)
+
+    def delete(self, *nodes):
+        """Delete nodes and their children, dropping their connections in one pass"""
+        deleted = set()
+        pending = list(nodes)
+        while pending:
+            node = pending.pop()
+            if node in deleted:
+                continue
+            deleted.add(node)
+            pending.extend(node.children)
+        for node in deleted:
+            if node.parent is not None and node.parent not in deleted:
+                self.reparent(node, None)
+            self.nodes.pop(node.name, None)
+            node.alive = False
+        for key in [key for key, source in self.inputs.items() if key[0] in deleted or source[0] in deleted]:
+            del self.inputs[key]
+
+    def find(self, name):
+        """Node from a name, a DAG path or a plug"""
+        name = name.split(".", 1)[0].split("|")[-1]
+        if name not in self.nodes:
+            raise ValueError("No object matches name: {}".format(name))
+        return self.nodes[name]
+
+    def exists(self, name):
+        return name.split(".", 1)[0].split("|")[-1] in self.nodes
+
+    # ---------------------------------------------------------------
+    # plugs
+    # ---------------------------------------------------------------
+    def split_plug(self, plug):
+        node_name, attr_path = plug.split(".", 1)
+        return self.find(node_name), normalize_attr(attr_path)
+
+    def connect(self, source, destination):
+        self.inputs[destination] = source
+
+    def disconnect(self, destination):
+        self.inputs.pop(destination, None)
+
+    def set_value(self, node, attr, value):
+        if attr in node.locked:
+            raise RuntimeError("The attribute '{}.{}' is locked".format(node.name, attr))
+        node.values[attr] = value
+
+    def get_value(self, node, attr):
+        """Evaluated value of a plug, pulled through the connections"""
+        if (node, attr) in self.inputs:
+            source_node, source_attr = self.inputs[(node, attr)]
+            return self.get_value(source_node, source_attr)
+        hook = self.compute_hooks.get(node.type)
+        if hook is not None:
+            value = hook(self, node, attr)
+            if value is not None:
+                return value
+        if attr in node.values:
+            return node.values[attr]
+        for parent_attr, axes in VECTOR_CHILDREN.items():
+            if attr[:-1] == parent_attr and attr[-1] in axes:
+                return self.get_value(node, parent_attr)[axes.index(attr[-1])]
+        if attr in ("worldMatrix[0]", "worldMatrix"):
+            return self.world_matrix(node)
+        return DEFAULTS.get(attr, 0.0)
+
+    def local_matrix(self, node):
+        if "matrix" in node.values and not any((node, attr) in self.inputs for attr in ("translate", "rotate")):
+            return node.values["matrix"]
+        values = [self.get_value(node, attr) for attr in ("rotate", "translate", "scale")]
+        # unevaluated outputs, like constraints, read as their rest value
+        values = [value if isinstance(value, tuple) else rest
+                  for value, rest in zip(values, ((0.0, 0.0, 0.0), (0.0, 0.0, 0.0), (1.0, 1.0, 1.0)))]
+        return _euler_matrix(*values)
+
+    def world_matrix(self, node):
+        matrix = self.local_matrix(node)
+        if node.parent is None:
+            return matrix
+        return multiply(matrix, self.world_matrix(node.parent))
+
+
+def multiply(matrix_a, matrix_b):
+    """Product of two flat row major 4x4 matrices"""
+    return tuple(sum(matrix_a[row * 4 + k] * matrix_b[k * 4 + col] for k in range(4))
+                 for row in range(4) for col in range(4))
+
+
+def _closest_point_hook(scene, node, attr):
+    # the benchmark surface is the unit square of the XZ plane
+    if attr not in ("parameterU", "parameterV", "result.parameterU", "result.parameterV"):
+        return None
+    position = scene.get_value(node, "inPosition") or (0.0, 0.0, 0.0)
+    value = position[0] if attr.endswith("U") else position[2]
+    return min(max(value, 0.0), 1.0)
+
+
+def _follicle_hook(scene, node, attr):
+    if attr == "outTranslate":
+        return (scene.get_value(node, "parameterU"), 0.0, scene.get_value(node, "parameterV"))
+    if attr == "outRotate":
+        return (0.0, 0.0, 0.0)
+    return None
+
+
+def _uv_pin_hook(scene, node, attr):
+    match = re.match(r"outputMatrix\[(\d+)\]$", attr)
+    if not match:
+        return None
+    coordinate = "coordinate[{}]".format(match.group(1))
+    return IDENTITY[:12] + (scene.get_value(node, coordinate + ".coordinateU"), 0.0,
+                            scene.get_value(node, coordinate + ".coordinateV"), 1.0)
+
+
+def _proximity_pin_hook(scene, node, attr):
+    # the pin is not evaluated on the geometry, its inputs are given back in world space
+    match = re.match(r"outputMatrix\[(\d+)\]$", attr)
+    if not match:
+        return None
+    input_matrix = scene.get_value(node, "inputMatrix[{}]".format(match.group(1)))
+    if not isinstance(input_matrix, tuple):
+        input_matrix = IDENTITY
+    source = scene.inputs.get((node, "deformedGeometry"))
+    return input_matrix if source is None else multiply(input_matrix, scene.world_matrix(source[0]))
+
+
+def new_scene():
+    """Fresh scene with the compute hooks of the nodes the build reads back"""
+    new = Scene()
+    new.compute_hooks["closestPointOnMesh"] = _closest_point_hook
+    new.compute_hooks["follicle"] = _follicle_hook
+    new.compute_hooks["uvPin"] = _uv_pin_hook
+    new.compute_hooks["proximityPin"] = _proximity_pin_hook
+    return new
+
+
+scene = new_scene()
+
+
+def reset():
+    """Replace the current scene by an empty one"""
+    global scene
+    scene = new_scene()
+    return scene
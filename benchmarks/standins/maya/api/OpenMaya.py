@@ -0,0 +1,488 @@
+"""maya.api.OpenMaya stand-in working on the in-memory scene
+
+Modifier operations are queued and applied on doIt like the real ones.
+"""
+
+import itertools
+
+from .. import _standin
+
+
+class MFn(object):
+    kDagNode = "dagNode"
+    kTransform = "transform"
+    kMesh = "mesh"
+    kNurbsSurface = "nurbsSurface"
+
+
+class MSpace(object):
+    kTransform = 1
+    kObject = 2
+    kWorld = 4
+
+
+class MObject(object):
+    def __init__(self, node=None):
+        self.node = node
+
+    def isNull(self):
+        return self.node is None
+
+    def hasFn(self, fn_type):
+        if self.node is None:
+            return False
+        if fn_type == MFn.kDagNode:
+            return self.node.is_dag
+        return self.node.type == fn_type
+
+    def __eq__(self, other):
+        return isinstance(other, MObject) and self.node is other.node
+
+    def __hash__(self):
+        return id(self.node)
+
+
+MObject.kNullObj = MObject()
+
+
+class MObjectHandle(object):
+    def __init__(self, node_object):
+        self._object = node_object
+
+    def object(self):
+        return self._object
+
+    def isValid(self):
+        return self._object.node is not None and self._object.node.alive
+
+    def isAlive(self):
+        return self.isValid()
+
+    def hashCode(self):
+        return id(self._object.node)
+
+
+class MPoint(object):
+    def __init__(self, x=0.0, y=0.0, z=0.0, w=1.0):
+        self.x, self.y, self.z, self.w = x, y, z, w
+
+    def __iter__(self):
+        return iter((self.x, self.y, self.z, self.w))
+
+    def __len__(self):
+        return 4
+
+    def __getitem__(self, index):
+        return (self.x, self.y, self.z, self.w)[index]
+
+
+MFloatPoint = MPoint
+
+
+class MMatrix(tuple):
+    def __new__(cls, values=_standin.IDENTITY):
+        return tuple.__new__(cls, values)
+
+
+class MFnMatrixData(object):
+    def create(self, matrix):
+        return tuple(matrix)
+
+
+class MDagPath(object):
+    def __init__(self, node=None):
+        self._node = node
+
+    def node(self):
+        return MObject(self._node)
+
+    def hasFn(self, fn_type):
+        return self.node().hasFn(fn_type)
+
+    def inclusiveMatrix(self):
+        return list(_standin.scene.world_matrix(self._node))
+
+    def partialPathName(self):
+        return self._node.name
+
+    def fullPathName(self):
+        return self._node.path()
+
+
+class MSelectionList(object):
+    def __init__(self):
+        self._nodes = []
+
+    def add(self, name):
+        self._nodes.append(_standin.scene.find(name))
+        return self
+
+    def length(self):
+        return len(self._nodes)
+
+    def getDependNode(self, index):
+        return MObject(self._nodes[index])
+
+    def getDagPath(self, index):
+        return MDagPath(self._nodes[index])
+
+
+class _Attribute(object):
+    def __init__(self, name):
+        self.name = name
+
+
+class MUuid(object):
+    def __init__(self, value):
+        self._value = value
+
+    def asString(self):
+        return self._value
+
+
+class MPlug(object):
+    def __init__(self, node=None, attr=""):
+        self._node = node
+        self._attr = attr
+
+    @property
+    def key(self):
+        return self._node, _standin.normalize_attr(self._attr)
+
+    def name(self):
+        return "{}.{}".format(self._node.name, self._attr)
+
+    def node(self):
+        return MObject(self._node)
+
+    def elementByLogicalIndex(self, index):
+        return MPlug(self._node, "{}[{}]".format(self._attr, index))
+
+    def child(self, attribute):
+        return MPlug(self._node, "{}.{}".format(self._attr, attribute.name))
+
+    @property
+    def isLocked(self):
+        return _standin.normalize_attr(self._attr) in self._node.locked
+
+    @isLocked.setter
+    def isLocked(self, value):
+        if value:
+            self._node.locked.add(_standin.normalize_attr(self._attr))
+        else:
+            self._node.locked.discard(_standin.normalize_attr(self._attr))
+
+    @property
+    def isKeyable(self):
+        return self._node.values.get("_keyable", {}).get(_standin.normalize_attr(self._attr), False)
+
+    @isKeyable.setter
+    def isKeyable(self, value):
+        self._node.values.setdefault("_keyable", {})[_standin.normalize_attr(self._attr)] = bool(value)
+
+    def getExistingArrayAttributeIndices(self):
+        prefix = _standin.normalize_attr(self._attr) + "["
+        attrs = [attr for node, attr in _standin.scene.inputs if node is self._node]
+        attrs += list(self._node.values)
+        return sorted(set(int(attr[len(prefix):].split("]")[0]) for attr in attrs if attr.startswith(prefix)))
+
+    def asDouble(self):
+        return _standin.scene.get_value(*self.key)
+
+    def asString(self):
+        return str(_standin.scene.get_value(*self.key))
+
+    def asInt(self):
+        return int(_standin.scene.get_value(*self.key))
+
+    def asBool(self):
+        return bool(_standin.scene.get_value(*self.key))
+
+    def setDouble(self, value):
+        _standin.scene.set_value(self._node, _standin.normalize_attr(self._attr), value)
+
+    setInt = setDouble
+    setBool = setDouble
+
+
+class MFnDependencyNode(object):
+    def __init__(self, node_object=None):
+        self._node = node_object.node if node_object is not None else None
+
+    def name(self):
+        return self._node.name
+
+    def typeName(self):
+        return self._node.type
+
+    def uuid(self):
+        return MUuid(self._node.uuid)
+
+    def findPlug(self, attr, want_networked=False):
+        return MPlug(self._node, attr)
+
+    def attribute(self, attr):
+        return _Attribute(attr)
+
+    def object(self):
+        return MObject(self._node)
+
+
+class MFnMesh(object):
+    """Reads the MeshGeometry of a stand-in mesh node"""
+
+    def __init__(self, dag_path):
+        self._geometry = dag_path.node().node.geometry
+        if self._geometry is None:
+            raise RuntimeError("(kFailure): the mesh has no geometry")
+
+    def numVertices(self):
+        return len(self._geometry.points)
+
+    def getFloatPoints(self, space=MSpace.kObject):
+        return [MFloatPoint(*point) for point in self._geometry.points]
+
+    getPoints = getFloatPoints
+
+    def getVertices(self):
+        return list(self._geometry.face_counts), list(self._geometry.face_vertices)
+
+    def getUVs(self):
+        return [u for u, _ in self._geometry.uvs], [v for _, v in self._geometry.uvs]
+
+    def getAssignedUVs(self):
+        return list(self._geometry.face_counts), list(self._geometry.uv_ids)
+
+    def getTriangles(self):
+        return [2] * len(self._geometry.face_counts), list(self._geometry.triangles)
+
+
+class MFnDagNode(MFnDependencyNode):
+    kNextPos = 255
+
+    def __init__(self, node=None):
+        if isinstance(node, MDagPath):
+            node = node.node()
+        super(MFnDagNode, self).__init__(node)
+
+    def partialPathName(self):
+        return self._node.name
+
+    def fullPathName(self):
+        return self._node.path()
+
+    def childCount(self):
+        return len(self._node.children)
+
+    def child(self, index):
+        return MObject(self._node.children[index])
+
+    def parent(self, index):
+        return MObject(self._node.parent)
+
+    def addChild(self, child, index=kNextPos, keepExistingParent=False):
+        # an instance is listed under its new parent, its first parent stays node.parent
+        if keepExistingParent:
+            self._node.children.append(child.node)
+        else:
+            _standin.scene.reparent(child.node, self._node)
+        return child
+
+
+class MFnNurbsCurve(MFnDagNode):
+    def copy(self, source, parent=MObject.kNullObj):
+        scene = _standin.scene
+        node = scene.add_node(scene.new_node(source.node.type, source.node.name), parent.node)
+        node.values.update((attr, value) for attr, value in source.node.values.items() if not attr.startswith("_"))
+        return MObject(node)
+
+
+class MTime(object):
+    kFilm = 6
+
+    def __init__(self, value=0.0, unit=kFilm):
+        self.value = value
+
+    @staticmethod
+    def uiUnit():
+        return MTime.kFilm
+
+
+MTimeArray = list
+MDoubleArray = list
+
+
+class MFnAnimCurve(object):
+    kAnimCurveTA, kAnimCurveTL, kAnimCurveTT, kAnimCurveTU = range(4)
+    kTangentLinear = 2
+    _types = ("animCurveTA", "animCurveTL", "animCurveTT", "animCurveTU")
+
+    def __init__(self, node_object=None):
+        self._node = node_object.node if node_object is not None else None
+
+    def create(self, plug, curve_type, modifier=None):
+        if modifier is not None:
+            node_object = modifier.createNode(self._types[curve_type])
+            modifier.connect(MPlug(node_object.node, "output"), plug)
+            self._node = node_object.node
+            return node_object
+        scene = _standin.scene
+        self._node = scene.add_node(scene.new_node(self._types[curve_type]))
+        scene.connect((self._node, "output"), plug.key)
+        return MObject(self._node)
+
+    def addKeys(self, times, values, tangent_in=kTangentLinear, tangent_out=kTangentLinear):
+        self._node.values["keys"] = [(time.value, value) for time, value in zip(times, values)]
+
+
+class MDGModifier(object):
+    """Queue of scene edits applied on doIt"""
+
+    def __init__(self):
+        self._operations = []
+        self._created = []
+        self._connections = []
+
+    def _queue(self, *operation):
+        self._operations.append(operation)
+
+    def _create(self, node_type, parent):
+        node = _standin.scene.new_node(node_type)
+        self._created.append(node)
+        self._queue("create", node, parent)
+        return MObject(node)
+
+    def createNode(self, node_type):
+        return self._create(node_type, None)
+
+    def renameNode(self, node_object, name):
+        self._queue("rename", node_object.node, name)
+
+    def connect(self, source, destination):
+        self._queue("connect", source.key, destination.key)
+
+    def disconnect(self, source, destination):
+        self._queue("disconnect", source.key, destination.key)
+
+    def deleteNode(self, node_object):
+        self._queue("delete", node_object.node)
+
+    def newPlugValueDouble(self, plug, value):
+        self._queue("value", plug.key, value)
+
+    newPlugValueInt = newPlugValueDouble
+    newPlugValueBool = newPlugValueDouble
+    newPlugValueFloat = newPlugValueDouble
+    newPlugValue = newPlugValueDouble
+    newPlugValueString = newPlugValueDouble
+
+    def doIt(self):
+        scene = _standin.scene
+        for operation in self._operations:
+            kind, args = operation[0], operation[1:]
+            if kind == "create":
+                node, parent = args
+                if node.type in _standin.SHAPE_TYPES and parent is None:
+                    parent = scene.add_node(scene.new_node("transform"))
+                scene.add_node(node, parent)
+            elif kind == "rename":
+                scene.rename(*args)
+            elif kind == "reparent":
+                scene.reparent(*args)
+            elif kind == "connect":
+                scene.connect(*args)
+                self._connections.append(args[1])
+            elif kind == "disconnect":
+                scene.disconnect(args[1])
+            elif kind == "delete":
+                scene.delete(args[0])
+            elif kind == "value":
+                (node, attr), value = args
+                scene.set_value(node, attr, value)
+        self._operations = []
+
+    def undoIt(self):
+        scene = _standin.scene
+        for destination in reversed(self._connections):
+            scene.disconnect(destination)
+        for node in reversed(self._created):
+            if node.alive:
+                scene.delete(node)
+        self._connections = []
+        self._created = []
+
+
+class MDagModifier(MDGModifier):
+    def createNode(self, node_type, parent=MObject.kNullObj):
+        # like Maya, DG nodes have to go through MDGModifier.createNode
+        if node_type not in _standin.DAG_TYPES:
+            raise RuntimeError("(kInvalidParameter): {} is not a DAG node type".format(node_type))
+        return self._create(node_type, parent.node)
+
+    def reparentNode(self, node_object, new_parent=MObject.kNullObj):
+        self._queue("reparent", node_object.node, new_parent.node)
+
+
+class MPxCommand(object):
+    def __init__(self):
+        pass
+
+    def isUndoable(self):
+        return False
+
+
+class MFnPlugin(object):
+    def __init__(self, plugin=None, vendor="", version=""):
+        pass
+
+    def registerCommand(self, name, creator):
+        from .. import cmds
+        cmds.register_command(name, creator)
+
+    def deregisterCommand(self, name):
+        from .. import cmds
+        cmds.deregister_command(name)
+
+
+_callback_ids = itertools.count(1)
+
+
+class MMessage(object):
+    @staticmethod
+    def removeCallback(callback_id):
+        _standin.scene.node_added_callbacks.pop(callback_id, None)
+        _standin.scene.command_callbacks.pop(callback_id, None)
+
+
+class MDGMessage(MMessage):
+    @staticmethod
+    def addNodeAddedCallback(function, node_type="dependNode", client_data=None):
+        callback_id = next(_callback_ids)
+        _standin.scene.node_added_callbacks[callback_id] = \
+            lambda node: function(MObject(node), client_data)
+        return callback_id
+
+
+class MCommandMessage(MMessage):
+    @staticmethod
+    def addCommandCallback(function, client_data=None):
+        callback_id = next(_callback_ids)
+        _standin.scene.command_callbacks[callback_id] = lambda command: function(command, client_data)
+        return callback_id
+
+
+class MProfiler(object):
+    kColorE_L1 = 0
+    _events = itertools.count(1)
+
+    @staticmethod
+    def addCategory(name, description=""):
+        return 1
+
+    @staticmethod
+    def eventBegin(category, color, name, description=""):
+        return next(MProfiler._events)
+
+    @staticmethod
+    def eventEnd(event_id):
+        return None
@@ -0,0 +1,381 @@
+"""maya.cmds stand-in recording every call on the in-memory scene"""
+
+import functools
+import importlib.util
+import os
+
+from . import _standin
+
+
+def _command(function):
+    @functools.wraps(function)
+    def recorded(*args, **kwargs):
+        _standin.scene.command_log[function.__name__] += 1
+        for callback in list(_standin.scene.command_callbacks.values()):
+            callback(function.__name__)
+        return function(*args, **kwargs)
+    return recorded
+
+
+def _flag(kwargs, long_name, short_name=None, default=None):
+    if long_name in kwargs:
+        return kwargs[long_name]
+    if short_name is not None and short_name in kwargs:
+        return kwargs[short_name]
+    return default
+
+
+def _names(nodes):
+    if isinstance(nodes, (list, tuple)):
+        return [str(node) for node in nodes]
+    return [str(nodes)]
+
+
+@_command
+def createNode(node_type, **kwargs):
+    scene = _standin.scene
+    parent = _flag(kwargs, "parent", "p")
+    node = scene.create(node_type, _flag(kwargs, "name", "n"),
+                        scene.find(parent) if parent else None)
+    return node.name
+
+
+@_command
+def group(*nodes, **kwargs):
+    scene = _standin.scene
+    parent = _flag(kwargs, "parent", "p")
+    node = scene.create("transform", _flag(kwargs, "name", "n", "group1"),
+                        scene.find(parent) if parent else None)
+    for child in nodes:
+        scene.reparent(scene.find(child), node)
+    return node.name
+
+
+@_command
+def spaceLocator(**kwargs):
+    return [_standin.scene.create("locator", None).parent.name]
+
+
+@_command
+def rename(node, name):
+    scene = _standin.scene
+    return scene.rename(scene.find(node), name)
+
+
+@_command
+def parent(*nodes, **kwargs):
+    scene = _standin.scene
+    nodes = [name for names in nodes for name in _names(names)]
+    if kwargs.get("world") or kwargs.get("w"):
+        new_parent = None
+    else:
+        new_parent = scene.find(nodes.pop())
+    for node in nodes:
+        if _flag(kwargs, "addObject", "add"):
+            # an instance is listed under its new parent, its first parent stays node.parent
+            new_parent.children.append(scene.find(node))
+        else:
+            scene.reparent(scene.find(node), new_parent)
+    return [str(node) for node in nodes]
+
+
+@_command
+def delete(*nodes, **kwargs):
+    scene = _standin.scene
+    scene.delete(*[scene.find(name) for names in nodes for name in _names(names) if scene.exists(name)])
+
+
+@_command
+def objExists(name):
+    return _standin.scene.exists(str(name))
+
+
+@_command
+def nodeType(node):
+    return _standin.scene.find(str(node)).type
+
+
+@_command
+def objectType(node, **kwargs):
+    return _standin.scene.find(str(node)).type
+
+
+@_command
+def listRelatives(nodes, **kwargs):
+    scene = _standin.scene
+    nodes = [scene.find(name) for name in _names(nodes)]
+    if _flag(kwargs, "parent", "p"):
+        parents = [node.parent.name for node in nodes if node.parent is not None]
+        return parents or None
+    children = [child for node in nodes for child in node.children]
+    node_type = _flag(kwargs, "type")
+    if node_type == "shape" or _flag(kwargs, "shapes", "s"):
+        children = [child for child in children if child.type in _standin.SHAPE_TYPES]
+    elif node_type:
+        children = [child for child in children if child.type == node_type]
+    return [child.name for child in children] or None
+
+
+@_command
+def ls(*patterns, **kwargs):
+    scene = _standin.scene
+    if _flag(kwargs, "uuid"):
+        return [scene.find(name).uuid for name in patterns if scene.exists(name)]
+    node_types = _flag(kwargs, "type")
+    if node_types is not None:
+        node_types = _names(node_types)
+    names = [name for pattern in patterns for name in _names(pattern)] or list(scene.nodes)
+    by_uuid = dict((node.uuid, node.name) for node in scene.nodes.values())
+    names = [by_uuid.get(name, name) for name in names]
+    intermediate = _flag(kwargs, "intermediateObjects", "io", False)
+    return [name for name in names if scene.exists(name)
+            and (node_types is None or scene.find(name).type in node_types)
+            and (not intermediate or scene.find(name).values.get("intermediateObject", False))]
+
+
+@_command
+def listHistory(nodes, **kwargs):
+    scene = _standin.scene
+    prune_dag = _flag(kwargs, "pruneDagObjects", "pdo", False)
+    sources = {}
+    for (destination, _), (source, _) in scene.inputs.items():
+        sources.setdefault(destination, []).append(source)
+    pending = [scene.find(name) for name in _names(nodes)]
+    history, visited = [], set()
+    while pending:
+        node = pending.pop()
+        if node in visited:
+            continue
+        visited.add(node)
+        history.append(node)
+        pending.extend(source for source in sources.get(node, [])
+                       if not (prune_dag and source.type in _standin.DAG_TYPES))
+    return [node.name for node in history] or None
+
+
+@_command
+def connectAttr(source, destination, **kwargs):
+    scene = _standin.scene
+    scene.connect(scene.split_plug(source), scene.split_plug(destination))
+
+
+@_command
+def disconnectAttr(source, destination, **kwargs):
+    scene = _standin.scene
+    scene.disconnect(scene.split_plug(destination))
+
+
+@_command
+def setAttr(plug, *values, **kwargs):
+    scene = _standin.scene
+    node, attr = scene.split_plug(plug)
+    if "lock" in kwargs or "l" in kwargs:
+        if _flag(kwargs, "lock", "l"):
+            node.locked.add(attr)
+        else:
+            node.locked.discard(attr)
+    if "keyable" in kwargs or "k" in kwargs or "channelBox" in kwargs or "cb" in kwargs:
+        node.values.setdefault("_keyable", {})[attr] = _flag(kwargs, "keyable", "k")
+    if not values:
+        return
+    if len(values) == 1:
+        value = values[0]
+        value = tuple(value) if isinstance(value, list) else value
+    else:
+        value = tuple(values)
+    scene.set_value(node, attr, value)
+
+
+@_command
+def getAttr(plug, **kwargs):
+    scene = _standin.scene
+    node, attr = scene.split_plug(plug)
+    value = scene.get_value(node, attr)
+    if isinstance(value, tuple) and len(value) in (2, 3):
+        return [value]
+    if isinstance(value, tuple):
+        return list(value)
+    return value
+
+
+@_command
+def addAttr(nodes, **kwargs):
+    scene = _standin.scene
+    attr = _flag(kwargs, "longName", "ln")
+    for name in _names(nodes):
+        node = scene.find(name)
+        node.values[attr] = _flag(kwargs, "defaultValue", "dv", 0.0)
+        node.values.setdefault("_dynamic", {})[attr] = {
+            "attributeType": "typed" if _flag(kwargs, "dataType", "dt") else _flag(kwargs, "attributeType", "at"),
+            "enumName": _flag(kwargs, "enumName", "en", "")}
+        node.values.setdefault("_keyable", {})[attr] = _flag(kwargs, "keyable", "k", False)
+
+
+@_command
+def listAttr(node, **kwargs):
+    node = _standin.scene.find(str(node))
+    if _flag(kwargs, "userDefined", "ud"):
+        return list(node.values.get("_dynamic", {})) or None
+    return [attr for attr in node.values if not attr.startswith("_")] or None
+
+
+@_command
+def listConnections(nodes, **kwargs):
+    scene = _standin.scene
+    source = _flag(kwargs, "source", "s", True)
+    destination = _flag(kwargs, "destination", "d", True)
+    plugs = _flag(kwargs, "plugs", "p", False)
+    node_type = _flag(kwargs, "type", "t")
+    result = []
+    for name in _names(nodes):
+        node = scene.find(name)
+        attr = name.split(".", 1)[1] if "." in name else None
+        for (dst_node, dst_attr), (src_node, src_attr) in scene.inputs.items():
+            if destination and src_node is node and attr in (None, src_attr):
+                found, own = (dst_node, dst_attr), (src_node, src_attr)
+            elif source and dst_node is node and attr in (None, dst_attr):
+                found, own = (src_node, src_attr), (dst_node, dst_attr)
+            else:
+                continue
+            if node_type and not found[0].type.startswith(node_type):
+                continue
+            if _flag(kwargs, "connections", "c", False):
+                result.append("{}.{}".format(*[own[0].name, own[1]]))
+            result.append("{}.{}".format(found[0].name, found[1]) if plugs else found[0].name)
+    return result or None
+
+
+@_command
+def attributeQuery(attr, **kwargs):
+    node = _standin.scene.find(str(_flag(kwargs, "node", "n")))
+    dynamic = node.values.get("_dynamic", {}).get(attr, {})
+    if _flag(kwargs, "attributeType", "at"):
+        return dynamic.get("attributeType", "double")
+    if _flag(kwargs, "keyable", "k"):
+        return node.values.get("_keyable", {}).get(attr, False)
+    if _flag(kwargs, "listEnum", "le"):
+        return [dynamic.get("enumName", "")]
+    return attr in node.values
+
+
+@_command
+def xform(node, **kwargs):
+    scene = _standin.scene
+    node = scene.find(str(node))
+    if _flag(kwargs, "query", "q"):
+        world = _flag(kwargs, "worldSpace", "ws")
+        matrix = scene.world_matrix(node) if world else scene.local_matrix(node)
+        if _flag(kwargs, "matrix", "m"):
+            return list(matrix)
+        if _flag(kwargs, "translation", "t"):
+            return list(matrix[12:15])
+        return None
+    matrix = _flag(kwargs, "matrix", "m")
+    if matrix is not None:
+        matrix = tuple(float(value) for value in matrix)
+        node.values["matrix"] = matrix
+        node.values["translate"] = matrix[12:15]
+    translation = _flag(kwargs, "translation", "t")
+    if translation is not None:
+        node.values["translate"] = tuple(translation)
+
+
+@_command
+def parentConstraint(*nodes, **kwargs):
+    scene = _standin.scene
+    driven = scene.find(str(nodes[-1]))
+    constraint = scene.create("parentConstraint", driven.name + "_parentConstraint1", driven)
+    for index, driver in enumerate(nodes[:-1]):
+        driver = scene.find(str(driver))
+        scene.connect((driver, "worldMatrix[0]"), (constraint, "target[{}].targetParentMatrix".format(index)))
+    for attr in ("translate", "rotate"):
+        scene.connect((constraint, "constraint" + attr.capitalize()), (driven, attr))
+    return [constraint.name]
+
+
+@_command
+def file(*args, **kwargs):
+    # the benchmark scene is never saved, it only has a name
+    if _flag(kwargs, "query", "q") and _flag(kwargs, "sceneName", "sn"):
+        return _standin.scene.scene_name
+    return None
+
+
+@_command
+def about(**kwargs):
+    # the stand-in has no UI, like mayapy
+    return bool(_flag(kwargs, "batch", "b"))
+
+
+@_command
+def refresh(**kwargs):
+    return None
+
+
+@_command
+def currentTime(*time, **kwargs):
+    scene = _standin.scene
+    if time:
+        scene.current_time = float(time[0])
+    return scene.current_time
+
+
+@_command
+def undoInfo(**kwargs):
+    scene = _standin.scene
+    if _flag(kwargs, "query", "q"):
+        return scene.undo_state
+    for flag in ("state", "stateWithoutFlush", "swf"):
+        if flag in kwargs:
+            scene.undo_state = kwargs[flag]
+    if _flag(kwargs, "openChunk", "ock"):
+        scene.undo_queue.append(None)
+    return None
+
+
+@_command
+def undo():
+    """Undo the commands back to the last chunk opened"""
+    queue = _standin.scene.undo_queue
+    while queue:
+        command = queue.pop()
+        if command is None:
+            break
+        command.undoIt()
+
+
+@_command
+def loadPlugin(path, quiet=False):
+    scene = _standin.scene
+    spec = importlib.util.spec_from_file_location(os.path.splitext(os.path.basename(path))[0] + "_plugin", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    from .api import OpenMaya
+    module.initializePlugin(OpenMaya.MObject())
+    scene.plugins[path] = module
+    return [path]
+
+
+@_command
+def pluginInfo(path, **kwargs):
+    return path in _standin.scene.plugins
+
+
+def register_command(name, creator):
+    """Add a plugin command to the module, undoable ones go on the undo queue"""
+    def run(*args, **kwargs):
+        command = creator()
+        command.doIt(args)
+        if command.isUndoable():
+            _standin.scene.undo_queue.append(command)
+    run.__name__ = name
+    globals()[name] = _command(run)
+
+
+def deregister_command(name):
+    globals().pop(name, None)
+
+
+@_command
+def warning(*messages):
+    return None
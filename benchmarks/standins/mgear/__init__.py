@@ -0,0 +1 @@
+"""mGear stand-in for the benchmarks, see maya._standin"""
@@ -0,0 +1 @@
+"""mgear.core.applyop stand-in, nothing of it is used by the build"""
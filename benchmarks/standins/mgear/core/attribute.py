@@ -0,0 +1 @@
+"""mgear.core.attribute stand-in, nothing of it is used by the build"""
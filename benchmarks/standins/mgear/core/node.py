@@ -0,0 +1 @@
+"""mgear.core.node stand-in, nothing of it is used by the build"""
@@ -0,0 +1,13 @@
+"""mgear.core.primitive stand-in"""
+
+from maya import cmds
+from pymel import core as pm
+
+
+def addTransform(parent, name, m=None):
+    node = cmds.createNode("transform", name=name)
+    if parent is not None:
+        cmds.parent(node, str(parent))
+    if m is not None:
+        cmds.xform(node, matrix=list(m), worldSpace=True)
+    return pm.PyNode(node)
@@ -0,0 +1 @@
+"""mgear.core.transform stand-in, nothing of it is used by the build"""
@@ -0,0 +1 @@
+"""mgear.core.vector stand-in, nothing of it is used by the build"""
@@ -0,0 +1,102 @@
+"""mgear.shifter.component stand-in
+
+Main reproduces the calls the real base class issues around the component
+methods the benchmarks run: the root, the controls and the joints.
+"""
+
+import collections
+
+from maya import cmds
+from pymel import core as pm
+from pymel.core import datatypes
+
+from mgear.core import primitive
+
+
+class Guide(object):
+    """Guide data handed to the component: positions and settings"""
+
+    def __init__(self, positions, settings):
+        self.pos = collections.OrderedDict([("root", datatypes.Vector())])
+        for index, position in enumerate(positions):
+            self.pos["{}_loc".format(index)] = datatypes.Vector(*position)
+        self.apos = list(self.pos.values())
+        self.values = settings
+
+
+class Rig(object):
+    """Top nodes of a rig: rig, rig|setup and a component group"""
+
+    def __init__(self):
+        self.model = pm.PyNode(cmds.createNode("transform", name="rig"))
+        self.setupWS = pm.PyNode(cmds.createNode("transform", name="setup", parent="rig"))
+        self.components_grp = pm.PyNode(cmds.createNode("transform", name="components", parent="rig"))
+        self.components = {}
+        # custom control shapes of the guide, by <control>_controlBuffer name
+        self.guide = collections.namedtuple("RigGuide", ["controllers"])({})
+
+
+class Main(object):
+    """Base class of the shifter components"""
+
+    def __init__(self, rig, guide):
+        self.rig = rig
+        self.guide = guide
+        self.settings = guide.values
+        self.name = self.settings["comp_name"]
+        self.side = self.settings.get("comp_side", "C")
+        self.index = self.settings.get("comp_index", 0)
+        self.fullName = "{}_{}{}".format(self.name, self.side, self.index)
+        self.size = 1.0
+        self.color_ik = [0, 0, 1]
+        self.color_fk = [1, 0, 0]
+        self.jnt_pos = []
+        self.controlers = []
+        self.groups = {}
+        self.transform2Lock = []
+        self.setupWS = rig.setupWS
+        self.parentCtlTag = None
+        self.root = primitive.addTransform(rig.components_grp, self.getName("root"))
+
+    def getName(self, name="", side=None):
+        if name:
+            return "{}_{}".format(self.fullName, name)
+        return self.fullName
+
+    def addCtl(self, parent, name, m, color, iconShape, tp=None, lp=True, guide_loc_ref=None, **kwargs):
+        # transform, curve shape, color and the control attributes
+        ctl = primitive.addTransform(parent, self.getName(name), m)
+        cmds.createNode("nurbsCurve", name=ctl.name() + "Shape", parent=ctl.name())
+        cmds.setAttr(ctl.name() + "Shape.overrideEnabled", 1)
+        cmds.setAttr(ctl.name() + "Shape.overrideRGBColors", 1)
+        cmds.setAttr(ctl.name() + "Shape.overrideColorRGB", *color)
+        ctl_grp = self.settings.get("ctlGrp") or "controllers"
+        self.addToGroup(ctl, list(set([ctl_grp, "controllers"])))
+        if parent not in self.groups[ctl_grp] and lp:
+            self.transform2Lock.append(parent)
+        tag = cmds.createNode("controller", name=ctl.name() + "_tag")
+        cmds.connectAttr(ctl.name() + ".message", tag + ".controllerObject")
+        self.controlers.append(ctl)
+        cmds.addAttr(ctl.name(), longName="isCtl", attributeType="bool")
+        cmds.addAttr(ctl.name(), longName="uiHost", dataType="string")
+        cmds.addAttr(ctl.name(), longName="uiHost_cnx", attributeType="message")
+        cmds.addAttr(ctl.name(), longName="ctl_role", dataType="string")
+        cmds.setAttr(ctl.name() + ".ctl_role", name, type="string")
+        if guide_loc_ref:
+            cmds.addAttr(ctl.name(), longName="guide_loc_ref", dataType="string")
+            cmds.setAttr(ctl.name() + ".guide_loc_ref", guide_loc_ref, type="string")
+        return ctl
+
+    def addToGroup(self, objects, names=["hidden"]):
+        if not isinstance(objects, list):
+            objects = [objects]
+        if not isinstance(names, list):
+            names = [names]
+        for name in names:
+            self.groups.setdefault(name, []).extend(objects)
+
+    def jointStructure(self):
+        for jnt_pos in self.jnt_pos:
+            joint = cmds.createNode("joint", name=self.getName(jnt_pos["name"].name() + "_jnt"),
+                                    parent=self.root.name())
+            cmds.connectAttr(jnt_pos["obj"].name() + ".worldMatrix[0]", joint + ".offsetParentMatrix")
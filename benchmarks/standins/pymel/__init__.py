@@ -0,0 +1 @@
+"""PyMEL stand-in for the benchmarks, see maya._standin"""
@@ -0,0 +1,30 @@
+"""pymel.core stand-in, nodes are only wrapped names"""
+
+from maya import cmds
+
+
+class PyNode(object):
+    def __init__(self, name):
+        self._name = str(name)
+
+    def name(self):
+        return self._name
+
+    def __str__(self):
+        return self._name
+
+    def __repr__(self):
+        return "PyNode({!r})".format(self._name)
+
+    def __add__(self, other):
+        return self._name + other
+
+    def exists(self):
+        return cmds.objExists(self._name)
+
+    def attr(self, attr_name):
+        return "{}.{}".format(self._name, attr_name)
+
+
+def displayWarning(message):
+    cmds.warning(message)
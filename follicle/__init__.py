@@ -1,165 +1,630 @@
-import ast
+import collections
+import os
+import sys
 
-import pymel.core as pm
-from pymel.core import datatypes
-import maya.cmds as cmds
-import maya.OpenMaya as om
+import numpy as np
 
-import mgear
+import maya.cmds as cmds
 
 from mgear.shifter import component
 
-from mgear.core import node, applyop, vector
-from mgear.core import attribute, transform, primitive
+# directory of the follicle_kernels package, the NumPy solvers that import no Maya module,
+# and of the follicle_undo plugin running the API modifiers as undoable commands
+KERNELS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lib")
+if KERNELS_PATH not in sys.path:
+    sys.path.append(KERNELS_PATH)
+
+from . import build, closest, constants, controls, profiler, progress, registry
 
 
 class Component(component.Main):
     """Shifter component Class"""
 
+    @property
+    def build_profiler(self):
+        """Build profiler of the component, see profiler.BuildProfiler"""
+        if getattr(self, "_build_profiler", None) is None:
+            self._build_profiler = profiler.BuildProfiler(self.getName())
+        return self._build_profiler
+
+    @property
+    def node_registry(self):
+        """Nodes created by the component, see registry.NodeRegistry"""
+        if getattr(self, "_node_registry", None) is None:
+            self._node_registry = registry.NodeRegistry()
+        return self._node_registry
+
     # =====================================================
     # OBJECTS
     # =====================================================
+    @profiler.profiled("addObjects")
     def addObjects(self):
         """Add all the objects needed to create the component."""
 
-        surface_name = self.settings["surfaceName"]
+        # queue the DAG/DG construction without viewport refresh or undo recording
+        with build.suspended_build():
+            surface_name = self.settings["surfaceName"]
+            self.node_registry.add("root", self.root.name())
+            self.node_registry.add("setup", self.setupWS.name())
+
+            # world positions of the MGear guide multi locators
+            positions = [(pos_vector.x, pos_vector.y, pos_vector.z)
+                         for pos_key, pos_vector in self.guide.pos.items() if pos_key != "root"]
+
+            # only the primaries are attached to the surface when useLOD is on
+            use_lod = self.settings["useLOD"] and self.settings["primaryCount"] < len(positions)
+            if use_lod:
+                from follicle_kernels import lod
+                primaries = lod.farthest_point_sampling(positions, self.settings["primaryCount"])
+                attach_positions = [positions[i] for i in primaries]
+            else:
+                attach_positions = positions
+
+            # the drivers and the controls are built in chunks, reporting progress, see progress.py
+            with progress.BuildProgress(self.getName(), len(attach_positions) + len(positions),
+                                        on_rollback=self.drop_deleted_nodes) as self._build_progress:
+                # create the attachments, follicles, a uvPin per surface or triangle rivets
+                attach_mode = constants.ATTACH_MODES[self.settings["attachMode"]]
+                if attach_mode == "uvPin":
+                    driver_lst = self.create_uv_pin(surface_name, attach_positions)
+                elif attach_mode == "rivet":
+                    driver_lst = self.create_rivets(surface_name, attach_positions)
+                else:
+                    driver_lst = self.create_follicles(surface_name, attach_positions)
+
+                # every driver is a world matrix plug, except the follicle transforms
+                matrix_drivers = attach_mode in constants.MATRIX_ATTACH_MODES
+                if self.settings["freezeStaticSurfaces"] and driver_lst:
+                    driver_lst, matrix_drivers = self.freeze_static_drivers(surface_name, attach_positions,
+                                                                            driver_lst, matrix_drivers)
+                if use_lod and driver_lst:
+                    driver_lst = self.create_secondaries(positions, primaries, driver_lst, matrix_drivers)
+                    matrix_drivers = True
+
+                # lean hierarchy: the controls sit under the root and are driven through offsetParentMatrix
+                use_offset_parent_matrix = self.settings["useOffsetParentMatrix"]
+
+                # addCtl builds every control, the factory batches their groups and can share their icons
+                ctl_factory = controls.ControlFactory(self,
+                                                      "cube",
+                                                      self.color_ik,
+                                                      instance_shapes=self.settings["instanceControlShapes"],
+                                                      w=self.size * 0.2,
+                                                      h=self.size * 0.2,
+                                                      d=self.size * 0.2)
+                # the driver nodes are resolved once, the builder connects their MObjects
+                driver_plugs = None
+                if use_offset_parent_matrix or matrix_drivers:
+                    driver_plugs = self.node_registry.plugs(
+                        driver_lst if matrix_drivers else [driver + ".worldMatrix[0]" for driver in driver_lst])
+                root_object = self.node_registry.get("root")
+                ctl_lst = []
+                for chunk in progress.chunks(len(driver_lst), self.settings["buildChunkSize"]):
+                    os_grp_lst = []
+                    for i in chunk:
+                        if matrix_drivers:
+                            curr_transform_matrix = cmds.getAttr(driver_lst[i])
+                        else:
+                            curr_transform_matrix = cmds.xform(driver_lst[i], query=True, matrix=True)
+                        ctl_name = "{}_{}_ctl".format(self.settings["comp_name"], i)
+                        if use_offset_parent_matrix:
+                            ctl_factory.add(self.root, ctl_name, curr_transform_matrix)
+                        else:
+                            os_grp, _ = ctl_factory.add(self.root, ctl_name, curr_transform_matrix,
+                                                        groups=["{}_os_grp".format(i), "{}_ik_cns".format(i)])
+                            os_grp_lst.append(os_grp)
+
+                    with self.build_profiler.phase("controls"):
+                        chunk_ctl_lst = ctl_factory.commit(tp=self.parentCtlTag, guide_loc_ref="root")
+                    for i, os_grp in zip(chunk, os_grp_lst):
+                        self.node_registry.add(("os_grp", i), os_grp)
+                    ctl_lst.extend(chunk_ctl_lst)
+
+                    builder = build.FollicleBuilder()
+                    matrix_nodes = []
+                    for chunk_index, (i, ctl) in enumerate(zip(chunk, chunk_ctl_lst)):
+                        if use_offset_parent_matrix:
+                            matrix_nodes.append((i, builder.add_offset_parent_driver(
+                                driver_plugs[i], ctl.name(), root_object), None))
+                        elif matrix_drivers:
+                            matrix_nodes.append((i,) + builder.add_matrix_driver(
+                                driver_plugs[i], self.node_registry.get(("os_grp", i))))
+                        else:
+                            cmds.parentConstraint(driver_lst[i], build.node_name(os_grp_lst[chunk_index]), mo=True)
+                    builder.commit()
+                    for i, mult_matrix, decompose in matrix_nodes:
+                        self.node_registry.add(("multMatrix", i), mult_matrix)
+                        if decompose is not None:
+                            self.node_registry.add(("decomposeMatrix", i), decompose)
+                    self.report_progress(len(chunk), "controls")
+
+                # the bake and playback tools find the drivers on the root, see bake.py
+                from . import bake
+                bake.store_drivers(self.root.name(), driver_lst)
+
+                # add joints by populating mgear component's dictionary
+                with self.build_profiler.phase("jnt_pos"):
+                    for ctl_name in ctl_lst:
+                        self.jnt_pos.append(
+                            {
+                                "obj": ctl_name,
+                                "name": ctl_name,
+                                "newActiveJnt": "component_jnt_org",
+                                "guide_relative": "root",
+                                "UniScale": True,
+                                "leaf_joint": False,
+                            }
+                        )
+
+    def report_progress(self, count, status):
+        """
+        Count built locators on the progress of the build, see progress.BuildProgress.
 
-        # create pseudo locators at the MGear guide multi locators
-        pseudo_locator_lst = []
-        pseudo_locator_group = cmds.group(empty=True, name="pseudo_locator_grp")
-        for i, pos_key in enumerate(self.guide.pos):
-            if pos_key == "root":
-                continue
-            pos_vector = self.guide.pos[pos_key]
-            pseudo_locator = cmds.spaceLocator(name="pseudoLocator_" + str(i))[0]
-            cmds.setAttr(pseudo_locator + ".translateX", pos_vector.x)
-            cmds.setAttr(pseudo_locator + ".translateY", pos_vector.y)
-            cmds.setAttr(pseudo_locator + ".translateZ", pos_vector.z)
-            pseudo_locator_lst.append(pseudo_locator)
-            cmds.parent(pseudo_locator, pseudo_locator_group)
-
-        # put the pseudo locators under rig|setup
-        cmds.parent(pseudo_locator_group, "rig|setup")
-
-        # create follicles
-        # note that this is a dict of follicle transform name mapped to follicle shape name
-        follicles_trans_lst = self.create_follicles(surface_name, pseudo_locator_lst)
-
-        ctl_lst = []
-        for i, follicle_trans in enumerate(follicles_trans_lst):
-            curr_transform_matrix = cmds.xform(follicle_trans, query=True, matrix=True)
-            ctl_name = follicle_trans + "_ctl"
-            os_grp_name = "follicle_" + str(i) + "_os_grp"
-            os_grp = primitive.addTransform(self.root, os_grp_name, curr_transform_matrix)
-            ik_cns = primitive.addTransform(os_grp, "follicle_" + str(i) + "_ik_cns", curr_transform_matrix)
-
-            print("Parent control tag: ")
-            print(self.parentCtlTag)
-
-            ctl = self.addCtl(ik_cns,
-                              ctl_name,
-                              curr_transform_matrix,
-                              self.color_ik,
-                              "cube",
-                              w=self.size * 0.2,
-                              h=self.size * 0.2,
-                              d=self.size * 0.2,
-                              tp=self.parentCtlTag,
-                              guide_loc_ref="root")
-            ctl_lst.append(ctl)
-            cmds.parentConstraint(follicle_trans, os_grp.name(), mo=True)
-
-        # add joints by populating mgear component's dictionary
-        for ctl_name in ctl_lst:
-            self.jnt_pos.append(
-                {
-                    "obj": ctl_name,
-                    "name": ctl_name,
-                    "newActiveJnt": "component_jnt_org",
-                    "guide_relative": "root",
-                    "UniScale": True,
-                    "leaf_joint": False,
-                }
-            )
-
-    def create_follicles(self, surface_name, locator_list):
-        """
-        Create follicles based on the locator_list. Currently surface_name does nothing.
+        :param count: number of locators built since the last report
+        :param status: what was built, like "follicles"
+        :raise progress.BuildCancelled: when the user cancelled the build
+        """
+        build_progress = getattr(self, "_build_progress", None)
+        if build_progress is not None and build_progress.active:
+            build_progress.step(count, status)
 
-        Returns a list of the follicle's transform names as String
+    def drop_deleted_nodes(self):
         """
+        Remove the nodes a rolled back build deleted from the lists of the component.
 
-        fol_grp = cmds.group(empty=True, name="follicle_grp")
-        cmds.parent(fol_grp, "rig|setup")
+        The base class later locks, groups and builds the joints of what
+        controlers, transform2Lock, groups and jnt_pos hold, see
+        progress.BuildProgress.rollback.
+        """
+        def exists(node):
+            return node.exists() if hasattr(node, "exists") else cmds.objExists(str(node))
+
+        self.controlers[:] = [node for node in self.controlers if exists(node)]
+        self.transform2Lock[:] = [node for node in self.transform2Lock if exists(node)]
+        for group_name, nodes in self.groups.items():
+            self.groups[group_name] = [node for node in nodes if exists(node)]
+        self.jnt_pos[:] = [joint for joint in self.jnt_pos if exists(joint["obj"])]
+
+    @profiler.profiled("addCtl")
+    def addCtl(self, *args, **kwargs):
+        """Add a control, timed in the addCtl phase of the build profiler"""
+        return super(Component, self).addCtl(*args, **kwargs)
+
+    @profiler.profiled("jnt_pos")
+    def jointStructure(self):
+        """Build the joints from jnt_pos, timed in the jnt_pos phase of the build profiler"""
+        return super(Component, self).jointStructure()
+
+    def get_surface_shapes(self, surface_name, record_failures=True):
+        """
+        Shapes of the surfaces of the surfaceName setting.
 
-        surface_shape = cmds.listRelatives(surface_name, type="shape")[0]
-        shape_type = cmds.nodeType(surface_shape)
-        follicle_trans_list = []
-        closest_point_node_list = []
+        The surfaces that are neither a NURBS surface nor a mesh are skipped
+        and recorded as failures of the build.
 
-        # TODO: figure out the surface type properly, by using checking children
-        surface_type = cmds.nodeType(surface_name)
+        :param surface_name: transform of the nurbsSurface or mesh, or several
+            of them separated by commas
+        :param record_failures: warn and record the skipped surfaces, off when
+            the surfaces were already checked earlier in the build
+        :return: list of nurbsSurface or mesh shape node names
+        """
+        surface_shapes = []
+        for name in closest.surface_names(surface_name):
+            surface_shape = cmds.listRelatives(name, type="shape")[0]
+            if cmds.nodeType(surface_shape) not in ("nurbsSurface", "mesh"):
+                if record_failures:
+                    message = "Please select a NURBS surface nor a mesh"
+                    cmds.warning(message)
+                    self.build_profiler.add_failure("{}: {}".format(name, message))
+                continue
+            surface_shapes.append(surface_shape)
+        return surface_shapes
 
-        for n, loc in enumerate(locator_list):
-            # Create Point on Curve Info node
-            if shape_type == "nurbsSurface":
-                closest_point_node = cmds.createNode("closestPointOnSurface", n="cps")
-                closest_point_node_list.append(closest_point_node)
-            elif shape_type == "mesh":
-                closest_point_node = cmds.createNode("closestPointOnMesh", n="cpm")
-                closest_point_node_list.append(closest_point_node)
-            else:
-                cmds.warning("Please select a NURBS surface nor a mesh")
-                return
-
-            # Print locator position
-            loc_position = cmds.xform(loc, query=True, translation=True, worldSpace=True)
-            print("Locator Position {}: {}".format(n, loc_position))
-
-            # Connect surface to closestPointOnSurface node
-            if shape_type == "nurbsSurface":
-                cmds.connectAttr(surface_shape + ".local", closest_point_node + ".inputSurface", force=True)
-                cmds.connectAttr("{}.local".format(surface_shape), "{}.inputSurface".format(closest_point_node),
-                                 force=True)
+    @profiler.profiled("solve_surface_uvs")
+    def solve_surface_uvs(self, surface_name, positions):
+        """
+        Find the shapes of the surfaces and solve the U/V parameters of every position.
+
+        When several surfaces are given every position goes to the nearest
+        one, see closest.assign_surfaces. With the useProxyMesh setting the
+        positions of a mesh are moved to its proxy, see create_proxy_mesh.
+        The U/V parameters are then solved
+        in one batch per surface, see closest.surface_uvs, on the solver picked
+        by the uvSolver setting. With the useUVCache setting the parameters are
+        read from the disk cache of the scene and only the positions
+        missing from it are solved, see cache.cached_surface_uvs. With the
+        useSymmetry setting the parameters of the surfaces shared with the
+        component of the other side are mirrored from its solution instead,
+        see mirror_surface_uvs.
+
+        :param surface_name: transform of the nurbsSurface or mesh, or several
+            of them separated by commas
+        :param positions: list of world space positions as (x, y, z)
+        :return: (list of the surface shape of every position, list of (u, v)
+            tuples), None if no surface is a NURBS surface or a mesh
+        """
+        surface_shapes = self.get_surface_shapes(surface_name)
+        if not surface_shapes:
+            return None
+
+        solver = constants.UV_SOLVERS[self.settings["uvSolver"]]
+        assignment = closest.assign_surfaces(surface_shapes, positions)
+        if self.settings["useSymmetry"]:
+            mirrored = self.mirror_surface_uvs(surface_shapes, assignment, positions)
+        else:
+            mirrored = {}
+        source_shapes = list(surface_shapes)
+        uv_list = [None] * len(positions)
+        for surface_index, surface_shape in enumerate(surface_shapes):
+            indices = [i for i, assigned in enumerate(assignment) if assigned == surface_index]
+            if not indices:
+                continue
+            surface_positions = [positions[i] for i in indices]
+            if self.settings["useProxyMesh"] and cmds.nodeType(surface_shape) == "mesh":
+                # the proxy keeps the UVs of its source mesh, mirrored ones included
+                surface_shape = self.create_proxy_mesh(surface_shape, surface_positions, surface_index)
+                surface_shapes[surface_index] = surface_shape
+            if surface_index in mirrored:
+                surface_uv_list = mirrored[surface_index]
+            elif self.settings["useUVCache"]:
+                from . import cache
+                surface_uv_list = cache.cached_surface_uvs(surface_shape, surface_positions, solver=solver)
             else:
-                cmds.connectAttr("{}.worldMatrix".format(surface_shape), "{}.inputMatrix".format(closest_point_node), force=True)
-                cmds.connectAttr("{}.outMesh".format(surface_shape), "{}.inMesh".format(closest_point_node), force=True)
+                surface_uv_list = closest.surface_uvs(surface_shape, surface_positions, solver)
+            for i, uv in zip(indices, surface_uv_list):
+                uv_list[i] = uv
 
+        # kept for the component of the other side, see mirror_surface_uvs
+        self.uv_solution = (positions, [source_shapes[assigned] for assigned in assignment], uv_list)
+        return [surface_shapes[assigned] for assigned in assignment], uv_list
 
+    def get_mirror_component(self):
+        """
+        Component of the other side with the same name and index.
 
-            # Connect locator to closestPointOnSurface node
-            cmds.connectAttr(loc + ".translate", closest_point_node + ".inPosition")
+        :return: the component, None when the component is in the center or
+            the other side was not built before it
+        """
+        from . import mirror
+        mirror_side = mirror.MIRROR_SIDES.get(self.side)
+        if mirror_side is None:
+            return None
+        return getattr(self.rig, "components", {}).get("{}_{}{}".format(self.name, mirror_side, self.index))
+
+    @profiler.profiled("mirror_surface_uvs")
+    def mirror_surface_uvs(self, surface_shapes, assignment, positions):
+        """
+        Mirror the U/V parameters solved by the component of the other side.
+
+        Only the surfaces the mirrored positions are assigned to on both sides
+        and that are symmetric across the YZ plane are mirrored, with the
+        mirror map of the surface, see mirror.surface_mirror. No closest point
+        is searched for them.
+
+        :param surface_shapes: list of the surface shapes
+        :param assignment: index of the surface of every position
+        :param positions: list of world space positions as (x, y, z)
+        :return: dict of surface index: list of (u, v) tuples, in the order of
+            the positions assigned to the surface
+        """
+        from follicle_kernels import symmetry
+
+        from . import mirror
+        mirror_component = self.get_mirror_component()
+        solution = getattr(mirror_component, "uv_solution", None)
+        if solution is None:
+            return {}
+        mirror_positions, mirror_shapes, mirror_uv_list = solution
+        if not symmetry.positions_mirrored(positions, mirror_positions):
+            return {}
+
+        mirrored = {}
+        for surface_index, surface_shape in enumerate(surface_shapes):
+            indices = [i for i, assigned in enumerate(assignment) if assigned == surface_index]
+            if not indices or any(mirror_shapes[i] != surface_shape for i in indices):
+                continue
+            surface_mirror = mirror.surface_mirror(surface_shape)
+            if surface_mirror is None:
+                continue
+            mirrored[surface_index] = [tuple(uv) for uv in
+                                       surface_mirror.mirror([mirror_uv_list[i] for i in indices]).tolist()]
+            self.build_profiler.add_record("mirrored", {"surface": surface_shape, "positions": len(indices),
+                                                        "from": mirror_component.fullName})
+        return mirrored
+
+    @profiler.profiled("create_proxy_mesh")
+    def create_proxy_mesh(self, surface_shape, positions, surface_index):
+        """
+        Create the proxy of a mesh the follicles ride instead of the mesh itself.
+
+        The proxy only keeps the faces within the proxyRadius setting of the
+        positions, the face list is cached until the mesh or the positions
+        change, see proxy.cached_proxy_faces.
+
+        :param surface_shape: mesh shape node name
+        :param positions: list of world space positions as (x, y, z)
+        :param surface_index: index of the surface in the surfaceName setting
+        :return: name of the proxy mesh shape, the source shape when the proxy
+            would keep every face
+        """
+        from . import proxy
+        faces, face_count = proxy.cached_proxy_faces(surface_shape, positions, self.settings["proxyRadius"])
+        if len(faces) == face_count:
+            return surface_shape
+        proxy_transform, proxy_shape, delete_faces = proxy.create_proxy_mesh(
+            surface_shape, faces, face_count, self.getName("{}_proxy".format(surface_index)),
+            self.node_registry.name("setup"))
+        self.node_registry.add(("proxy", surface_index), proxy_transform)
+        self.node_registry.add(("proxy_deleteComponent", surface_index), delete_faces)
+        return proxy_shape
+
+    @profiler.profiled("create_follicles")
+    def create_follicles(self, surface_name, positions):
+        """
+        Create one follicle on the surface for each position.
+
+        :param surface_name: transform of the nurbsSurface or mesh, or several
+            of them separated by commas
+        :param positions: list of world space positions as (x, y, z)
 
-            # Get UV parameters from closestPointOnSurface node
-            parameter_u = cmds.getAttr(closest_point_node + ".parameterU")
-            parameter_v = cmds.getAttr(closest_point_node + ".parameterV")
-            print("Closest Point UV Parameters {}: (U={}, V={})".format(n, parameter_u, parameter_v))
+        Returns a list of the follicle's transform names as String
+        """
 
-            # Create follicle on surface
-            follicle_data = self.create_one_follicle(input_surface=[surface_shape], parent_grp=fol_grp, hide=0,
-                                                     name="{}_{}".format(self.settings["comp_name"], n))
-            follicle_trans_list.append(follicle_data['transform'])
+        surface_data = self.solve_surface_uvs(surface_name, positions)
+        if surface_data is None:
+            return []
+        surface_shapes, uv_list = surface_data
+
+        # Create the follicle group, then queue the follicles and create them one chunk at a time
+        builder = build.FollicleBuilder()
+        fol_grp = builder.add_group(self.getName("follicle_grp"), self.node_registry.get("setup"))
+        builder.commit()
+        follicle_data_list = []
+        for chunk in progress.chunks(len(uv_list), self.settings["buildChunkSize"]):
+            builder = build.FollicleBuilder()
+            for n in chunk:
+                parameter_u, parameter_v = uv_list[n]
+                builder.add_follicle(surface_shapes[n], fol_grp, self.getName("{}_fol".format(n)),
+                                     u_val=parameter_u, v_val=parameter_v, hide=0)
+            follicle_data_list.extend(builder.commit())
+            self.report_progress(len(chunk), "follicles")
+
+        self.node_registry.add("follicle_grp", fol_grp)
+        for n, follicle_data in enumerate(follicle_data_list):
+            self.node_registry.add(("follicle", n), follicle_data['object'])
+        return [follicle_data['transform'] for follicle_data in follicle_data_list]
+
+    @profiler.profiled("create_uv_pin")
+    def create_uv_pin(self, surface_name, positions):
+        """
+        Create a single uvPin node per surface with one coordinate for each position.
 
-            # Print UV parameters used for follicle creation
-            print("Follicle UV Parameters {}: (U={}, V={})".format(n, parameter_u, parameter_v))
+        All the attachment points of a surface share its evaluation through
+        the outputMatrix array of the pin.
 
-            # Connect closestPointOnSurface to follicle
-            cmds.connectAttr("{}.parameterV".format(closest_point_node),
-                             "{}.parameterV".format(follicle_data['shape']), force=True)
-            cmds.connectAttr("{}.parameterU".format(closest_point_node),
-                             "{}.parameterU".format(follicle_data['shape']), force=True)
+        :param surface_name: transform of the nurbsSurface or mesh, or several
+            of them separated by commas
+        :param positions: list of world space positions as (x, y, z)
 
-            # Disconnect closestPointOnSurface from follicle
-            cmds.disconnectAttr("{}.parameterV".format(closest_point_node),
-                                "{}.parameterV".format(follicle_data['shape']))
-            cmds.disconnectAttr("{}.parameterU".format(closest_point_node),
-                                "{}.parameterU".format(follicle_data['shape']))
+        Returns a list of the uvPin outputMatrix plugs as String
+        """
+        surface_data = self.solve_surface_uvs(surface_name, positions)
+        if surface_data is None:
+            return []
+        surface_shapes, uv_list = surface_data
+
+        # positions of every surface, in the order of the pin coordinates
+        surface_indices = collections.OrderedDict()
+        for i, surface_shape in enumerate(surface_shapes):
+            surface_indices.setdefault(surface_shape, []).append(i)
+
+        builder = build.FollicleBuilder()
+        uv_pins = []
+        for pin_index, (surface_shape, indices) in enumerate(surface_indices.items()):
+            if len(surface_indices) == 1:
+                pin_name = self.getName("uvPin")
+            else:
+                pin_name = self.getName("{}_uvPin".format(pin_index))
+            uv_pins.append(builder.add_uv_pin(surface_shape, pin_name, [uv_list[i] for i in indices]))
+        builder.commit()
+        self.report_progress(len(uv_list), "uvPins")
+        for pin_index, uv_pin in enumerate(uv_pins):
+            self.node_registry.add(("uvPin", pin_index), uv_pin)
+
+        plug_list = [None] * len(uv_list)
+        for uv_pin, indices in zip(uv_pins, surface_indices.values()):
+            uv_pin = build.node_name(uv_pin)
+            for coordinate, i in enumerate(indices):
+                plug_list[i] = "{}.outputMatrix[{}]".format(uv_pin, coordinate)
+        return plug_list
+
+    @profiler.profiled("create_rivets")
+    def create_rivets(self, surface_name, positions):
+        """
+        Create a triangle rivet on the mesh for each position.
 
-            # Remove closestPointOnSurface node
-            cmds.delete(closest_point_node)
+        The host triangle and the barycentric weights of every position are
+        solved once here and give its point on the geometry before the
+        deformers. proximityPin nodes, one per chunk of positions, bind those
+        points to their triangles and follow the deformed mesh, see
+        build.FollicleBuilder.add_proximity_pin. A pin holds many rivets, so
+        the graph stays at one node per chunk. NURBS surfaces have no
+        triangles, their positions go on a uvPin like in the uvPin mode.
 
-        return follicle_trans_list
+        :param surface_name: transform of the mesh, or several of them
+            separated by commas
+        :param positions: list of world space positions as (x, y, z)
 
+        Returns a list of the world matrix plugs of the rivets as String
+        """
+        surface_shapes = self.get_surface_shapes(surface_name)
+        if not surface_shapes:
+            return []
+        assignment = closest.assign_surfaces(surface_shapes, positions)
+
+        drivers = []
+        for surface_index, surface_shape in enumerate(surface_shapes):
+            indices = [i for i, assigned in enumerate(assignment) if assigned == surface_index]
+            if not indices:
+                continue
+            surface_positions = [positions[i] for i in indices]
+            if cmds.nodeType(surface_shape) == "nurbsSurface":
+                builder = build.FollicleBuilder()
+                uv_list = closest.surface_uvs(surface_shape, surface_positions,
+                                              constants.UV_SOLVERS[self.settings["uvSolver"]])
+                uv_pin = builder.add_uv_pin(surface_shape, self.getName("{}_uvPin".format(surface_index)), uv_list)
+                builder.commit()
+                self.node_registry.add(("uvPin", surface_index), uv_pin)
+                drivers.extend((i, uv_pin, "outputMatrix[{}]".format(coordinate))
+                               for coordinate, i in enumerate(indices))
+                self.report_progress(len(indices), "uvPins")
+                continue
+
+            # the solved triangles are located on the geometry before the deformers
+            binding = closest.triangle_bindings(surface_shape, surface_positions)
+            original_shape, points = closest.rest_points(surface_shape, binding)
+
+            for chunk_index, chunk in enumerate(progress.chunks(len(indices), self.settings["buildChunkSize"])):
+                builder = build.FollicleBuilder()
+                pin = builder.add_proximity_pin(
+                    surface_shape, self.getName("{}_{}_proximityPin".format(surface_index, chunk_index)),
+                    points[chunk.start:chunk.stop], original_shape)
+                builder.commit()
+                self.node_registry.add(("proximityPin", surface_index, chunk_index), pin)
+                drivers.extend((indices[k], pin, "outputMatrix[{}]".format(coordinate))
+                               for coordinate, k in enumerate(chunk))
+                self.report_progress(len(chunk), "rivets")
+
+        plug_list = [None] * len(positions)
+        for i, driver_node, attr_name in drivers:
+            plug_list[i] = "{}.{}".format(build.node_name(driver_node), attr_name)
+        return plug_list
+
+    @profiler.profiled("freeze_static_drivers")
+    def freeze_static_drivers(self, surface_name, positions, driver_lst, matrix_drivers):
+        """
+        Replace the drivers riding a surface that never deforms by fixed matrices.
+
+        A surface is static when its history only holds construction history
+        and intermediate shapes, see freeze.deforming_nodes. The drivers on it
+        become a multMatrix of their rest matrix in the space of the surface by
+        the surface worldMatrix, and the follicles, uvPins, proximityPins and
+        proxy mesh built for it are deleted, and so is the follicle group once
+        it holds no follicle. Every frozen surface is recorded in the
+        frozen records of the build report, with its number of drivers, and
+        every other one in the deforming records, with the nodes that may
+        deform it.
+
+        :param surface_name: transform of the nurbsSurface or mesh, or several
+            of them separated by commas
+        :param positions: list of world space positions as (x, y, z), one per driver
+        :param driver_lst: follicle transforms or world matrix plugs
+        :param matrix_drivers: True when the drivers are world matrix plugs
+        :return: (list of drivers, True when they are world matrix plugs), the
+            given ones when no surface is static
+        """
+        from . import freeze
+        surface_shapes = self.get_surface_shapes(surface_name, record_failures=False)
+        static = []
+        for surface_shape in surface_shapes:
+            deforming = freeze.deforming_nodes(surface_shape)
+            static.append(not deforming)
+            if deforming:
+                self.build_profiler.add_record("deforming", {"surface": surface_shape, "nodes": deforming})
+        if not any(static):
+            return driver_lst, matrix_drivers
+
+        if matrix_drivers:
+            plug_list = list(driver_lst)
+        else:
+            plug_list = [driver + ".worldMatrix[0]" for driver in driver_lst]
+        assignment = closest.assign_surfaces(surface_shapes, positions)
+        surface_matrices = {}
+
+        builder = build.FollicleBuilder()
+        frozen = []
+        for i, surface_index in enumerate(assignment):
+            if not static[surface_index]:
+                continue
+            surface_shape = surface_shapes[surface_index]
+            if surface_shape not in surface_matrices:
+                surface_matrices[surface_shape] = cmds.getAttr(surface_shape + ".worldMatrix[0]")
+            local_matrix = freeze.local_matrix(cmds.getAttr(plug_list[i]), surface_matrices[surface_shape])
+            frozen.append((i, builder.add_frozen_matrix(
+                surface_shape, self.getName("{}_frozen".format(i)), local_matrix)))
+        # the static surfaces have no driver
+        if not frozen:
+            return driver_lst, matrix_drivers
+
+        # the frozen drivers are read before their nodes are deleted
+        cmds.delete(freeze.driver_nodes([driver_lst[i] for i, _ in frozen]))
+        builder.commit()
+        if "follicle_grp" in self.node_registry:
+            follicle_grp = self.node_registry.name("follicle_grp")
+            if not cmds.listRelatives(follicle_grp, children=True):
+                cmds.delete(follicle_grp)
+                self.node_registry.discard("follicle_grp")
+        for i, frozen_matrix in frozen:
+            self.node_registry.add(("frozen", i), frozen_matrix)
+            plug_list[i] = build.node_name(frozen_matrix) + ".matrixSum"
+
+        for surface_index, surface_shape in enumerate(surface_shapes):
+            if not static[surface_index]:
+                continue
+            proxy_keys = [("proxy", surface_index), ("proxy_deleteComponent", surface_index)]
+            proxy_nodes = [self.node_registry.name(key) for key in proxy_keys if key in self.node_registry]
+            if proxy_nodes:
+                cmds.delete(proxy_nodes)
+            self.build_profiler.add_record("frozen", {
+                "surface": surface_shape,
+                "drivers": sum(1 for assigned in assignment if assigned == surface_index)})
+        return plug_list, True
+
+    @profiler.profiled("create_secondaries")
+    def create_secondaries(self, positions, primaries, primary_drivers, matrix_drivers):
+        """
+        Drive the positions that are not primaries from their nearest primaries.
+
+        Every secondary point blends the world matrices of the lod.NEIGHBORS
+        nearest primaries with inverse distance weights, see
+        lod.interpolation_weights, and keeps its guide position through an
+        offset solved on the rest matrices of the primaries.
+
+        :param positions: list of world space positions as (x, y, z)
+        :param primaries: indices of the primary positions
+        :param primary_drivers: drivers of the primaries, in the order of primaries
+        :param matrix_drivers: True when the drivers are world matrix plugs,
+            False for follicle transforms
+        :return: list of world matrix plugs, one per position
+        """
+        from follicle_kernels import lod
+        if not matrix_drivers:
+            primary_drivers = [driver + ".worldMatrix[0]" for driver in primary_drivers]
+        points = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+        secondaries = np.setdiff1d(np.arange(len(points)), primaries)
+
+        indices, weights = lod.interpolation_weights(points[secondaries], points[primaries])
+        primary_matrices = [cmds.getAttr(plug) for plug in primary_drivers]
+        offsets = lod.secondary_offsets(lod.blend_matrices(primary_matrices, indices, weights),
+                                        points[secondaries])
+
+        primary_plugs = self.node_registry.plugs(primary_drivers)
+        builder = build.FollicleBuilder()
+        blends = []
+        for i, row, row_weights, offset in zip(secondaries.tolist(), indices, weights, offsets):
+            blends.append(builder.add_blend(self.getName("{}_lod".format(i)),
+                                            [primary_plugs[j] for j in row], row_weights, offset))
+        builder.commit()
+
+        plug_list = [None] * len(positions)
+        for i, primary_driver in zip(primaries.tolist(), primary_drivers):
+            plug_list[i] = primary_driver
+        for i, blend in zip(secondaries.tolist(), blends):
+            self.node_registry.add(("lod", i), blend)
+            plug_list[i] = build.node_name(blend) + ".matrixSum"
+        return plug_list
+
+    @profiler.profiled("create_one_follicle")
     def create_one_follicle(self, input_surface, parent_grp, scale_grp='', u_val=0.5, v_val=0.5, hide=1, name='follicle'):
         """
         Creates one follicle on nurbs surface or geo
@@ -173,48 +638,10 @@ class Component(component.Main):
             dict {'transform': follicle transform,
                 'shape': follicle shape}
         """
-        # Create a follicle
-        follicle_shape = cmds.createNode('follicle')
-        # Get the transform of the follicle
-        follicle = cmds.listRelatives(follicle_shape, parent=True)[0]
-        # Rename the follicle
-        follicle = cmds.rename(follicle, name)
-        follicle_shape = cmds.rename(cmds.listRelatives(follicle, c=True)[0], (name + 'Shape'))
-
-        # If the inputSurface is of type 'nurbsSurface', connect the surface to the follicle
-        if cmds.objectType(input_surface[0]) == 'nurbsSurface':
-            cmds.connectAttr((input_surface[0] + '.local'), (follicle_shape + '.inputSurface'))
-        # If the inputSurface is of type 'mesh', connect the surface to the follicle
-        if cmds.objectType(input_surface[0]) == 'mesh':
-            cmds.connectAttr((input_surface[0] + '.outMesh'), (follicle_shape + '.inputMesh'))
-
-        # Connect the worldMatrix of the surface into the follicleShape
-        cmds.connectAttr((input_surface[0] + '.worldMatrix[0]'), (follicle_shape + '.inputWorldMatrix'))
-        # Connect the follicleShape to it's transform
-        cmds.connectAttr((follicle_shape + '.outRotate'), (follicle + '.rotate'))
-        cmds.connectAttr((follicle_shape + '.outTranslate'), (follicle + '.translate'))
-        # Set the uValue and vValue for the current follicle
-        cmds.setAttr((follicle_shape + '.parameterU'), u_val)
-        cmds.setAttr((follicle_shape + '.parameterV'), v_val)
-        # Lock the translate/rotate of the follicle
-        cmds.setAttr((follicle + '.translate'), lock=True)
-        cmds.setAttr((follicle + '.rotate'), lock=True)
-
-        # If it was set to be hidden, hide the follicle
-        if hide:
-            cmds.setAttr((follicle_shape + '.visibility'), 0)
-        # If a scale-group was defined and exists
-        if scale_grp and cmds.objExists(scale_grp):
-            # Connect the scale-group to the follicle
-            cmds.connectAttr((scale_grp + '.scale'), (follicle + '.scale'))
-            # Lock the scale of the follicle
-            cmds.setAttr((follicle + '.scale'), lock=True)
-
-        cmds.parent(follicle, parent_grp)
-
-        return {'transform': follicle,
-                'shape': follicle_shape}
-
+        builder = build.FollicleBuilder()
+        builder.add_follicle(input_surface[0], parent_grp, name,
+                             u_val=u_val, v_val=v_val, hide=hide, scale_grp=scale_grp)
+        return builder.commit()[0]
 
     # =====================================================
     # CONNECTOR
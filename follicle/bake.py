@@ -0,0 +1,237 @@
+"""Baked follicle matrices for playback without surface evaluation
+
+bake_component evaluates the world matrix of every driver of a built
+component over a frame range and writes them in a (frames, drivers, 16)
+float32 .npy file, with a .json next to it holding the frame range and the
+drivers. The file is opened memory mapped, so loading it reads no more than
+the pages that are used.
+
+enable_playback switches a component to the cache: every driver gets a
+transform keyed from the baked matrices, and the controls are connected to it
+instead of the driver, so the follicles, uvPins and rivets are no longer
+evaluated. disable_playback restores the live drivers.
+
+    from follicle import bake
+    bake.bake_component("follicle_C0_root", "shot010_follicle_C0.npy", 1001, 1100)
+    group = bake.enable_playback("shot010_follicle_C0.npy")
+    bake.disable_playback(group)
+"""
+
+import json
+import os
+
+import numpy as np
+
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+
+import follicle_undo
+
+from .build import decompose, get_object, get_plug, suspended_build
+
+
+# string attribute of the component root listing its drivers, see store_drivers
+DRIVERS_ATTR = "follicleDrivers"
+
+# string attribute of the playback group holding the live connections it replaced
+LIVE_CONNECTIONS_ATTR = "liveConnections"
+
+_CURVE_TYPES = (("translate", om.MFnAnimCurve.kAnimCurveTL),
+                ("rotate", om.MFnAnimCurve.kAnimCurveTA),
+                ("scale", om.MFnAnimCurve.kAnimCurveTU))
+
+
+def store_drivers(root, drivers):
+    """
+    Record the drivers of a component on its root.
+
+    The nodes are stored by UUID, so they are still found once renamed.
+
+    :param root: name of the component root
+    :param drivers: follicle transforms or world matrix plugs, one per control
+    """
+    uuids = {}
+    entries = []
+    for driver in drivers:
+        node, _, attr_name = driver.partition(".")
+        if node not in uuids:
+            uuids[node] = om.MFnDependencyNode(get_object(node)).uuid().asString()
+        entries.append([uuids[node], attr_name])
+    if not cmds.attributeQuery(DRIVERS_ATTR, node=root, exists=True):
+        cmds.addAttr(root, longName=DRIVERS_ATTR, dataType="string")
+    cmds.setAttr("{}.{}".format(root, DRIVERS_ATTR), json.dumps(entries), type="string")
+
+
+def stored_drivers(root):
+    """
+    Drivers recorded on a component root, see store_drivers.
+
+    :param root: name of the component root
+    :return: list of follicle transform names or world matrix plugs
+    """
+    names = {}
+    drivers = []
+    for uuid, attr_name in json.loads(cmds.getAttr("{}.{}".format(root, DRIVERS_ATTR)) or "[]"):
+        if uuid not in names:
+            names[uuid] = cmds.ls(uuid)[0]
+        drivers.append("{}.{}".format(names[uuid], attr_name) if attr_name else names[uuid])
+    return drivers
+
+
+def driver_plug(driver):
+    """World matrix plug of a follicle transform or world matrix plug driver"""
+    return driver if "." in driver else driver + ".worldMatrix[0]"
+
+
+def metadata_path(path):
+    """Path of the .json describing a baked cache"""
+    return os.path.splitext(path)[0] + ".json"
+
+
+def bake_matrices(plugs, path, start, end):
+    """
+    Write the values of matrix plugs over a frame range to a .npy file.
+
+    The scene goes to every frame once, without viewport refresh, and all the
+    plugs are read at that time. The current time is restored at the end.
+
+    :param plugs: list of matrix plug names
+    :param path: path of the .npy file
+    :param start: first frame
+    :param end: last frame, included
+    :return: (frames, plugs, 16) float32 memory mapped array
+    """
+    frames = range(int(start), int(end) + 1)
+    matrices = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(len(frames), len(plugs), 16))
+    current_time = cmds.currentTime(query=True)
+    with suspended_build():
+        try:
+            for frame_index, frame in enumerate(frames):
+                cmds.currentTime(frame, update=True)
+                matrices[frame_index] = [cmds.getAttr(plug) for plug in plugs]
+        finally:
+            cmds.currentTime(current_time, update=True)
+    matrices.flush()
+    return matrices
+
+
+def bake_component(root, path, start=None, end=None):
+    """
+    Bake the world matrices of the drivers of a built component.
+
+    :param root: name of the component root
+    :param path: path of the .npy file, the metadata goes in a .json next to it
+    :param start: first frame, defaults to the start of the playback range
+    :param end: last frame, defaults to the end of the playback range
+    :return: (frames, drivers, 16) float32 memory mapped array
+    """
+    if start is None:
+        start = cmds.playbackOptions(query=True, minTime=True)
+    if end is None:
+        end = cmds.playbackOptions(query=True, maxTime=True)
+    drivers = stored_drivers(root)
+    matrices = bake_matrices([driver_plug(driver) for driver in drivers], path, start, end)
+    with open(metadata_path(path), "w") as metadata_file:
+        json.dump({"component": root, "drivers": drivers, "start": int(start), "end": int(end)},
+                  metadata_file, indent=2)
+    return matrices
+
+
+def load_cache(path):
+    """
+    Open a baked cache.
+
+    :param path: path of the .npy file
+    :return: ((frames, drivers, 16) read only memory mapped array, metadata
+        dict with the component, drivers, start and end)
+    """
+    with open(metadata_path(path)) as metadata_file:
+        metadata = json.load(metadata_file)
+    return np.load(path, mmap_mode="r"), metadata
+
+
+def _queue_curves(modifier, node, channels):
+    # curves of the translate, rotate and scale of a node, created by the modifier
+    node_object = get_object(node)
+    curve_fn = om.MFnAnimCurve()
+    curves = []
+    for (attr_name, curve_type), values in zip(_CURVE_TYPES, channels):
+        for axis_index, axis in enumerate("XYZ"):
+            curve = curve_fn.create(get_plug(node_object, attr_name + axis), curve_type, modifier)
+            curves.append((curve, values[:, axis_index]))
+    return curves
+
+
+def _driver_connections(driver):
+    # (source, destination) plugs of the connections leaving a driver
+    if "." in driver:
+        destinations = cmds.listConnections(driver, source=False, destination=True, plugs=True) or []
+        return [(driver, destination) for destination in destinations]
+    pairs = cmds.listConnections(driver, source=False, destination=True, plugs=True, connections=True) or []
+    return list(zip(pairs[::2], pairs[1::2]))
+
+
+def enable_playback(path):
+    """
+    Drive the controls of a component from a baked cache.
+
+    Every driver gets a transform under a playback group, keyed on every
+    frame of the cache. The connections leaving the driver are moved to the
+    transform: from the same attribute for a follicle transform, from its
+    worldMatrix for a world matrix plug.
+
+    The keys are the translate, rotate and scale of the baked matrices, see
+    decompose, so a driver matrix with shear or a negative scale does not
+    play back exactly.
+
+    The switch is a single undo chunk. The live connections are stored on the
+    group before any of them is moved, and on failure they are restored and
+    the group deleted, see disable_playback.
+
+    :param path: path of the .npy file, see bake_component
+    :return: name of the playback group
+    """
+    matrices, metadata = load_cache(path)
+    translate, rotate, scale = decompose(matrices)
+    time_unit = om.MTime.uiUnit()
+    times = om.MTimeArray([om.MTime(frame, time_unit) for frame in range(metadata["start"], metadata["end"] + 1)])
+
+    component = metadata["component"]
+    drivers = metadata["drivers"]
+    with suspended_build("folliclePlayback"):
+        driver_connections = [_driver_connections(driver) for driver in drivers]
+        group = cmds.createNode("transform", name=component + "_playback_grp")
+        cmds.addAttr(group, longName=LIVE_CONNECTIONS_ATTR, dataType="string")
+        cmds.setAttr("{}.{}".format(group, LIVE_CONNECTIONS_ATTR),
+                     json.dumps([connection for connections in driver_connections for connection in connections]),
+                     type="string")
+        try:
+            modifier = om.MDGModifier()
+            curves = []
+            for i, (driver, connections) in enumerate(zip(drivers, driver_connections)):
+                playback = cmds.createNode("transform", name="{}_{}_playback".format(component, i), parent=group)
+                curves.extend(_queue_curves(modifier, playback, (translate[:, i], rotate[:, i], scale[:, i])))
+                for source, destination in connections:
+                    attr_name = "worldMatrix[0]" if "." in driver else source.split(".", 1)[1]
+                    cmds.connectAttr("{}.{}".format(playback, attr_name), destination, force=True)
+            follicle_undo.execute(modifier)
+            for curve, values in curves:
+                om.MFnAnimCurve(curve).addKeys(times, om.MDoubleArray(values.tolist()),
+                                               om.MFnAnimCurve.kTangentLinear, om.MFnAnimCurve.kTangentLinear)
+        except Exception:
+            disable_playback(group)
+            raise
+    return group
+
+
+def disable_playback(group):
+    """
+    Reconnect the live drivers and delete a playback group with its keys.
+
+    :param group: playback group, see enable_playback
+    """
+    for source, destination in json.loads(cmds.getAttr("{}.{}".format(group, LIVE_CONNECTIONS_ATTR))):
+        cmds.connectAttr(source, destination, force=True)
+    playbacks = cmds.listRelatives(group, children=True, type="transform") or []
+    curves = cmds.listConnections(playbacks, source=True, destination=False, type="animCurve") if playbacks else []
+    cmds.delete((curves or []) + [group])
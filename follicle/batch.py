@@ -0,0 +1,229 @@
+"""Headless batch build of mGear guides using the follicle component
+
+Every guide file (.sgt template, .ma or .mb scene) is built in its own mayapy
+process. A pool of them runs at once, and each job has a timeout. The
+follicle components of a job write their build reports (see
+profiler.BuildProfiler) to the job directory. Those reports, together with
+the status of the job, are gathered in a summary.json in the output directory.
+
+This file runs as a script, so the controller does not need Maya:
+
+    mayapy follicle/batch.py guides/*.sgt --workers 8 --timeout 1800 --output-dir build_reports
+
+It exits with 1 when a job failed, timed out, or a follicle component
+reported a failure, such as a surface that is neither a NURBS surface nor a
+mesh.
+"""
+
+import argparse
+import concurrent.futures
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+import traceback
+
+
+# same as profiler.REPORT_DIR_ENV, not imported so the controller runs without Maya
+REPORT_DIR_ENV = "FOLLICLE_BUILD_REPORT_DIR"
+
+JOB_FILE = "job.json"
+LOG_FILE = "worker.log"
+SUMMARY_FILE = "summary.json"
+
+# name of the guide root mGear builds from in a scene
+GUIDE_ROOT = "guide"
+
+# outermost phases of the component build, their sum is the component total
+TOP_PHASES = ("addObjects", "jnt_pos")
+
+
+def default_mayapy():
+    """mayapy of MAYA_LOCATION, next to the running interpreter or on the PATH"""
+    executable = "mayapy.exe" if os.name == "nt" else "mayapy"
+    for directory in (os.path.join(os.environ.get("MAYA_LOCATION", ""), "bin"),
+                      os.path.dirname(sys.executable)):
+        candidate = os.path.join(directory, executable)
+        if os.path.isfile(candidate):
+            return candidate
+    return executable
+
+
+# ---------------------------------------------------------------
+# worker, runs in mayapy
+# ---------------------------------------------------------------
+def build_guide(guide_path):
+    """Build the rig of a guide file in the current Maya session"""
+    from maya import cmds
+    from mgear import shifter
+    from mgear.shifter import io
+
+    cmds.loadPlugin("mgear_solvers", quiet=True)
+    if os.path.splitext(guide_path)[1].lower() == ".sgt":
+        io.build_from_file(guide_path)
+    else:
+        cmds.file(guide_path, open=True, force=True)
+        cmds.select(GUIDE_ROOT, replace=True)
+        shifter.Rig().buildFromSelection()
+
+
+def run_worker(guide_path, job_dir, save_scene=False):
+    """
+    Build one guide in a standalone Maya session and write the job file.
+
+    :param guide_path: .sgt, .ma or .mb guide file
+    :param job_dir: directory of the job file and the component build reports
+    :param save_scene: save the built rig as a Maya ASCII scene in job_dir
+    :return: process exit code
+    """
+    import maya.standalone
+    maya.standalone.initialize(name="python")
+
+    result = {"guide": guide_path, "status": "ok", "error": None}
+    start = time.time()
+    try:
+        build_guide(guide_path)
+        if save_scene:
+            from maya import cmds
+            scene_name = os.path.splitext(os.path.basename(guide_path))[0] + "_rig.ma"
+            cmds.file(rename=os.path.join(job_dir, scene_name))
+            cmds.file(save=True, type="mayaAscii", force=True)
+    except Exception:
+        result["status"] = "error"
+        result["error"] = traceback.format_exc()
+    result["seconds"] = time.time() - start
+
+    with open(os.path.join(job_dir, JOB_FILE), "w") as job_file:
+        json.dump(result, job_file, indent=2)
+    maya.standalone.uninitialize()
+    return 0 if result["status"] == "ok" else 1
+
+
+# ---------------------------------------------------------------
+# controller
+# ---------------------------------------------------------------
+def job_directory(output_dir, index, guide_path):
+    name = os.path.splitext(os.path.basename(guide_path))[0]
+    return os.path.join(output_dir, "{:04d}_{}".format(index, name))
+
+
+def read_reports(job_dir):
+    """Build reports written by the follicle components of a job"""
+    reports = []
+    for path in sorted(glob.glob(os.path.join(job_dir, "*_build.json"))):
+        with open(path) as report_file:
+            reports.append(json.load(report_file))
+    return reports
+
+
+def run_job(guide_path, job_dir, mayapy, timeout=None, save_scene=False):
+    """
+    Build one guide in a mayapy subprocess.
+
+    :param guide_path: .sgt, .ma or .mb guide file
+    :param job_dir: directory of the job, created if needed
+    :param mayapy: mayapy executable
+    :param timeout: seconds before the worker is killed, None for no limit
+    :param save_scene: save the built rig in job_dir
+    :return: dict with the guide, status (ok, failed, error or timeout),
+        seconds, nodes, commands, the component reports, failures and error
+    """
+    if not os.path.isdir(job_dir):
+        os.makedirs(job_dir)
+    command = [mayapy, os.path.abspath(__file__), "--worker", guide_path, "--output-dir", job_dir]
+    if save_scene:
+        command.append("--save-scene")
+    environment = dict(os.environ)
+    environment[REPORT_DIR_ENV] = job_dir
+
+    job = {"guide": guide_path, "status": "ok", "error": None}
+    start = time.time()
+    with open(os.path.join(job_dir, LOG_FILE), "w") as log_file:
+        try:
+            subprocess.run(command, stdout=log_file, stderr=subprocess.STDOUT, env=environment, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            job["status"] = "timeout"
+            job["error"] = "killed after {} seconds".format(timeout)
+    job["seconds"] = time.time() - start
+
+    job_path = os.path.join(job_dir, JOB_FILE)
+    if os.path.isfile(job_path):
+        with open(job_path) as job_file:
+            worker_result = json.load(job_file)
+        if worker_result["status"] != "ok":
+            job["status"], job["error"] = worker_result["status"], worker_result["error"]
+    elif job["status"] == "ok":
+        job["status"] = "error"
+        job["error"] = "the worker exited without a result, see {}".format(LOG_FILE)
+
+    job["components"] = read_reports(job_dir)
+    job["failures"] = [failure for report in job["components"] for failure in report.get("failures", [])]
+    if job["failures"] and job["status"] == "ok":
+        job["status"] = "failed"
+    for counter in ("nodes", "commands"):
+        job[counter] = sum(report["phases"].get(phase_name, {}).get(counter, 0)
+                           for report in job["components"] for phase_name in TOP_PHASES)
+    return job
+
+
+def run_batch(guide_paths, output_dir, workers=1, timeout=None, mayapy=None, save_scene=False):
+    """
+    Build guide files in parallel mayapy workers.
+
+    :param guide_paths: list of guide files
+    :param output_dir: directory of the job directories and the summary
+    :param workers: number of builds running at once
+    :param timeout: seconds allowed per build, None for no limit
+    :param mayapy: mayapy executable, see default_mayapy
+    :param save_scene: save every built rig in its job directory
+    :return: list of job dicts, see run_job, in the order of guide_paths
+    """
+    mayapy = mayapy or default_mayapy()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_job, guide_path, job_directory(output_dir, index, guide_path),
+                                   mayapy, timeout, save_scene)
+                   for index, guide_path in enumerate(guide_paths)]
+        jobs = [future.result() for future in futures]
+
+    with open(os.path.join(output_dir, SUMMARY_FILE), "w") as summary_file:
+        json.dump({"jobs": jobs}, summary_file, indent=2)
+    return jobs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("guides", nargs="+", help="guide files, .sgt, .ma or .mb")
+    parser.add_argument("--output-dir", default="follicle_batch",
+                        help="directory of the job reports and summary.json")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="number of mayapy processes building at once")
+    parser.add_argument("--timeout", type=float, help="seconds allowed per build")
+    parser.add_argument("--mayapy", help="mayapy executable, found from MAYA_LOCATION by default")
+    parser.add_argument("--save-scene", action="store_true", help="save every built rig as a .ma")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        return run_worker(args.guides[0], args.output_dir, args.save_scene)
+
+    if not os.path.isdir(args.output_dir):
+        os.makedirs(args.output_dir)
+    jobs = run_batch([os.path.abspath(guide) for guide in args.guides], args.output_dir,
+                     workers=args.workers, timeout=args.timeout, mayapy=args.mayapy,
+                     save_scene=args.save_scene)
+
+    print("{:<10} {:>10} {:>10} {:>10}  {}".format("status", "seconds", "nodes", "commands", "guide"))
+    for job in jobs:
+        print("{status:<10} {seconds:>10.1f} {nodes:>10} {commands:>10}  {guide}".format(**job))
+        for failure in job["failures"]:
+            print("    " + failure)
+    failed = [job for job in jobs if job["status"] != "ok"]
+    print("{} built, {} failed, summary in {}".format(len(jobs) - len(failed), len(failed),
+                                                      os.path.join(args.output_dir, SUMMARY_FILE)))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""Export of follicle bindings for evaluation outside of Maya
+
+The drivers of a built component are bound to the points of their surfaces,
+see follicle_kernels.bindings, and saved in a compressed .npz that is read
+and evaluated with NumPy alone:
+
+    from follicle import binding
+    binding.export_component("follicle_C0_root", "body_geo", "follicle_C0_binding.npz")
+
+    from follicle_kernels import bindings
+    follicle_bindings = bindings.load_bindings("follicle_C0_binding.npz")
+    matrices = bindings.evaluate(follicle_bindings, [body_points])  # (F, V, 3) -> (F, N, 4, 4)
+"""
+
+import numpy as np
+
+import maya.cmds as cmds
+
+from follicle_kernels import bindings as kernel_bindings, nurbs_solver
+
+from . import bake, closest, surface_data
+
+
+def mesh_bindings(surface_shape, positions):
+    """
+    Triangle weights of positions on a mesh.
+
+    :param surface_shape: mesh shape node name
+    :param positions: list of world space positions as (x, y, z)
+    :return: ((N, 3) vertex ids, (N, 3) point weights, (N, 3) tangent weights,
+        (N, 2, 3) edge weights)
+    """
+    vertices, barycentric, tangent_weights = closest.triangle_bindings(surface_shape, positions)
+    edge_weights = kernel_bindings.triangle_edge_weights(len(vertices))
+    return vertices, barycentric, tangent_weights, edge_weights
+
+
+def nurbs_bindings(surface_shape, positions):
+    """
+    Span weights of positions on a NURBS surface.
+
+    The CVs of the span are weighted by the basis functions at the closest
+    point, and by their rational weight, so the position and the partial
+    derivatives are linear in the CV positions.
+
+    :param surface_shape: nurbsSurface shape node name
+    :param positions: list of world space positions as (x, y, z)
+    :return: ((N, M) CV ids, in the order of the flattened (U, V) CV grid,
+        (N, M) point weights, (N, M) U tangent weights, (N, 2, M) weights of
+        dP/du and dP/dv), with M = (degree_u + 1) * (degree_v + 1)
+    """
+    solver = closest.get_nurbs_solver(surface_shape)
+    parameters = solver.closest(np.asarray(positions, dtype=np.float64).reshape(-1, 3))
+    count_u, count_v = solver.cvs.shape[:2]
+    p, q = solver.degree_u, solver.degree_v
+
+    span_u = nurbs_solver.find_spans(solver.knots_u, p, count_u, parameters.u)
+    span_v = nurbs_solver.find_spans(solver.knots_v, q, count_v, parameters.v)
+    basis_u = nurbs_solver.basis_derivatives(solver.knots_u, p, span_u, parameters.u, 1)
+    basis_v = nurbs_solver.basis_derivatives(solver.knots_v, q, span_v, parameters.v, 1)
+
+    rows = (span_u - p)[:, None, None] + np.arange(p + 1)[None, :, None]
+    cols = (span_v - q)[:, None, None] + np.arange(q + 1)[None, None, :]
+    rows, cols = np.broadcast_arrays(rows, cols)
+    cv_weights = solver.cvs[rows, cols, 3]
+
+    # N_i(u) N_j(v) w_ij and its derivatives along U and V
+    products = np.stack([np.einsum("in,jn->nij", basis_u[0], basis_v[0]),
+                         np.einsum("in,jn->nij", basis_u[1], basis_v[0]),
+                         np.einsum("in,jn->nij", basis_u[0], basis_v[1])]) * cv_weights
+    point_count = len(parameters.u)
+    products = products.reshape(3, point_count, -1)
+    weight_sum = products.sum(axis=2, keepdims=True)
+
+    # quotient rule, P = sum(a P_i) / W gives dP = sum((da - a dW / W) P_i) / W
+    point_weights = products[0] / weight_sum[0]
+    derivative_weights = (products[1:] - point_weights * weight_sum[1:]) / weight_sum[0]
+    vertices = (rows * count_v + cols).reshape(point_count, -1)
+    return vertices, point_weights, derivative_weights[0], np.swapaxes(derivative_weights, 0, 1)
+
+
+def rest_points(surface_shape):
+    """
+    World space points a binding weights: mesh vertices or NURBS CVs.
+
+    :param surface_shape: nurbsSurface or mesh shape node name
+    :return: (V, 3) array
+    """
+    data = surface_data.surface_data(surface_shape)
+    if isinstance(data, surface_data.MeshData):
+        return surface_data.world_points(data.points, data.matrix)
+    return surface_data.world_points(data.cvs, data.matrix).reshape(-1, 3)
+
+
+def surface_bindings(surface_shapes, positions, rest_matrices):
+    """
+    Bind world matrices to the nearest of several surfaces.
+
+    :param surface_shapes: list of nurbsSurface or mesh shape node names
+    :param positions: list of world space positions as (x, y, z)
+    :param rest_matrices: (N, 16) rest world matrices, the offsets give them
+        back on the rest surfaces
+    :return: follicle_kernels.bindings.Bindings, the weights of every driver
+        padded with zeros to the widest binding
+    """
+    assignment = np.asarray(closest.assign_surfaces(surface_shapes, positions), dtype=np.int64)
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+
+    parts = []
+    for surface, surface_shape in enumerate(surface_shapes):
+        mask = assignment == surface
+        if not mask.any():
+            parts.append(None)
+        elif cmds.nodeType(surface_shape) == "nurbsSurface":
+            parts.append(nurbs_bindings(surface_shape, positions[mask]))
+        else:
+            parts.append(mesh_bindings(surface_shape, positions[mask]))
+    width = max([part[0].shape[1] for part in parts if part is not None] or [3])
+
+    point_count = len(positions)
+    vertices = np.zeros((point_count, width), dtype=np.int32)
+    point_weights = np.zeros((point_count, width))
+    tangent_weights = np.zeros((point_count, width))
+    edge_weights = np.zeros((point_count, 2, width))
+    for surface, part in enumerate(parts):
+        if part is None:
+            continue
+        mask = assignment == surface
+        part_width = part[0].shape[1]
+        vertices[mask, :part_width] = part[0]
+        point_weights[mask, :part_width] = part[1]
+        tangent_weights[mask, :part_width] = part[2]
+        edge_weights[mask, :, :part_width] = part[3]
+
+    all_points = [rest_points(surface_shape) for surface_shape in surface_shapes]
+    bindings = kernel_bindings.Bindings(
+        surfaces=list(surface_shapes),
+        vertex_counts=np.array([len(points) for points in all_points], dtype=np.int64),
+        surface_index=assignment,
+        vertices=vertices,
+        point_weights=point_weights,
+        tangent_weights=tangent_weights,
+        edge_weights=edge_weights,
+        offsets=np.tile(np.eye(4), (point_count, 1, 1)))
+    return kernel_bindings.bind_offsets(bindings, all_points, rest_matrices)
+
+
+def export_component(root, surface_name, path):
+    """
+    Bind the drivers of a built component to its surfaces and save them.
+
+    The drivers are bound at their current world matrices, see
+    bake.store_drivers.
+
+    :param root: name of the component root
+    :param surface_name: transform of the nurbsSurface or mesh, or several of
+        them separated by commas, like the surfaceName setting
+    :param path: path of the .npz file
+    :return: follicle_kernels.bindings.Bindings
+    """
+    surface_shapes = [cmds.listRelatives(name, type="shape")[0] for name in closest.surface_names(surface_name)]
+    rest_matrices = np.array([cmds.getAttr(bake.driver_plug(driver)) for driver in bake.stored_drivers(root)],
+                             dtype=np.float64).reshape(-1, 4, 4)
+    bindings = surface_bindings(surface_shapes, rest_matrices[:, 3, :3], rest_matrices)
+    kernel_bindings.save_bindings(bindings, path)
+    return bindings
@@ -0,0 +1,410 @@
+"""Batched node construction for the follicle component
+
+Follicles, uvPin and proximityPin nodes are queued on a FollicleBuilder and created,
+renamed, parented and connected with a single MDagModifier commit instead of
+one maya.cmds call per step.
+"""
+
+import contextlib
+
+import numpy as np
+
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+
+import follicle_undo
+
+from . import surface_data
+
+
+# local channels of a transform, in the order decompose returns them
+TRANSFORM_CHANNELS = ["translateX", "translateY", "translateZ", "rotateX", "rotateY", "rotateZ",
+                      "scaleX", "scaleY", "scaleZ"]
+
+_suspend_depth = [0]
+
+
+@contextlib.contextmanager
+def suspended_build(chunk_name="follicleBuild"):
+    """Build in a single undo chunk with the viewport refresh suspended
+
+    The API modifiers have to run through follicle_undo.execute to be part of
+    the chunk. The surfaces are only read and hashed once until the build
+    ends, see surface_data.start_build_cache. Nested uses only close the
+    chunk when the outermost one exits.
+
+    :param chunk_name: name of the undo chunk
+    """
+    _suspend_depth[0] += 1
+    if _suspend_depth[0] == 1:
+        cmds.undoInfo(openChunk=True, chunkName=chunk_name)
+        cmds.refresh(suspend=True)
+        surface_data.start_build_cache()
+    try:
+        yield
+    finally:
+        _suspend_depth[0] -= 1
+        if not _suspend_depth[0]:
+            surface_data.stop_build_cache()
+            cmds.refresh(suspend=False)
+            cmds.undoInfo(closeChunk=True)
+
+
+def get_object(node_name):
+    """MObject of a node from its name"""
+    selection = om.MSelectionList()
+    selection.add(node_name)
+    return selection.getDependNode(0)
+
+
+def get_plug(node_object, attr_path):
+    """Non networked plug of a node from an attribute path like coordinate[2].coordinateU"""
+    node_fn = om.MFnDependencyNode(node_object)
+    plug = None
+    for attr_name in attr_path.split("."):
+        index = None
+        if attr_name.endswith("]"):
+            attr_name, index = attr_name[:-1].split("[")
+        if plug is None:
+            plug = node_fn.findPlug(attr_name, False)
+        else:
+            plug = plug.child(node_fn.attribute(attr_name))
+        if index is not None:
+            plug = plug.elementByLogicalIndex(int(index))
+    return plug
+
+
+def decompose(matrices):
+    """
+    Translate, rotate and scale of Maya world matrices, in the xyz rotate order.
+
+    The rotations are unwrapped along the first axis, so consecutive frames do
+    not jump by a full turn.
+
+    :param matrices: (frames, drivers, 16) array
+    :return: (translate, rotate in radians, scale), (frames, drivers, 3) arrays
+    """
+    matrices = np.asarray(matrices, dtype=np.float64).reshape(matrices.shape[:2] + (4, 4))
+    translate = matrices[..., 3, :3]
+    scale = np.linalg.norm(matrices[..., :3, :3], axis=-1)
+    rows = matrices[..., :3, :3] / np.where(scale > 0.0, scale, 1.0)[..., None]
+    # rows = Rx Ry Rz with row vectors
+    rotate = np.stack([np.arctan2(rows[..., 1, 2], rows[..., 2, 2]),
+                       np.arcsin(np.clip(-rows[..., 0, 2], -1.0, 1.0)),
+                       np.arctan2(rows[..., 0, 1], rows[..., 0, 0])], axis=-1)
+    return translate, np.unwrap(rotate, axis=0), scale
+
+
+def node_name(node_object):
+    """Shortest unique name of a DAG or DG node"""
+    if node_object.hasFn(om.MFn.kDagNode):
+        return om.MFnDagNode(node_object).partialPathName()
+    return om.MFnDependencyNode(node_object).name()
+
+
+class FollicleBuilder(object):
+    """Queue follicles and create them all in one modifier commit"""
+
+    def __init__(self):
+        self.modifier = om.MDagModifier()
+        self._surfaces = {}
+        self._follicles = []
+
+    def _as_object(self, node):
+        if isinstance(node, om.MObject):
+            return node
+        return get_object(node)
+
+    def _source_plug(self, plug):
+        # (MObject or name, attribute path), or a node.attribute string
+        if isinstance(plug, tuple):
+            node, attr_path = plug
+        else:
+            node, attr_path = plug.split(".", 1)
+        return get_plug(self._as_object(node), attr_path)
+
+    def _surface(self, surface_shape):
+        if surface_shape not in self._surfaces:
+            surface_object = get_object(surface_shape)
+            self._surfaces[surface_shape] = (surface_object, surface_object.hasFn(om.MFn.kNurbsSurface))
+        return self._surfaces[surface_shape]
+
+    def add_node(self, node_type, name):
+        """
+        Queue a DG node, MDagModifier.createNode only creates DAG nodes.
+
+        :param node_type: type of the node
+        :param name: name of the node
+        :return: MObject of the queued node
+        """
+        node = om.MDGModifier.createNode(self.modifier, node_type)
+        self.modifier.renameNode(node, name)
+        return node
+
+    def add_group(self, name, parent=None):
+        """
+        Queue an empty transform.
+
+        :param name: name of the group
+        :param parent: parent node name or queued MObject, None for the world
+        :return: MObject of the queued group
+        """
+        parent_object = om.MObject.kNullObj if parent is None else self._as_object(parent)
+        group = self.modifier.createNode("transform", parent_object)
+        self.modifier.renameNode(group, name)
+        return group
+
+    def add_transform(self, name, parent, matrix, parent_matrix):
+        """
+        Queue a transform at a world matrix.
+
+        Only the channels away from their default value are set.
+
+        :param name: name of the transform
+        :param parent: parent node name or queued MObject
+        :param matrix: 16 floats, world matrix of the transform
+        :param parent_matrix: 16 floats, world matrix of the parent
+        :return: MObject of the queued transform
+        """
+        transform = self.add_group(name, parent)
+        local_matrix = np.matmul(np.asarray(matrix, dtype=np.float64).reshape(4, 4),
+                                 np.linalg.inv(np.asarray(parent_matrix, dtype=np.float64).reshape(4, 4)))
+        translate, rotate, scale = decompose(local_matrix.reshape(1, 1, 16))
+        values = np.concatenate([translate, rotate, scale], axis=-1).reshape(-1)
+        for attr_name, value, default in zip(TRANSFORM_CHANNELS, values, (0.0,) * 6 + (1.0,) * 3):
+            if abs(value - default) > 1e-9:
+                self.modifier.newPlugValueDouble(get_plug(transform, attr_name), float(value))
+        return transform
+
+    def add_follicle(self, surface_shape, parent, name, u_val=0.5, v_val=0.5, hide=1, scale_grp=''):
+        """
+        Queue one follicle on a nurbs surface or geo.
+
+        :param surface_shape: nurbsSurface or mesh shape node name
+        :param parent: parent node name or queued MObject
+        :param name: name of the follicle transform, the shape gets a Shape suffix
+        :param u_val:
+        :param v_val:
+        :param hide:
+        :param scale_grp: name of a node driving the follicle scale
+        :return: index of the follicle in the list returned by commit
+        """
+        surface_object, is_nurbs = self._surface(surface_shape)
+        modifier = self.modifier
+
+        follicle = modifier.createNode("transform", self._as_object(parent))
+        follicle_shape = modifier.createNode("follicle", follicle)
+        modifier.renameNode(follicle, name)
+        modifier.renameNode(follicle_shape, name + "Shape")
+
+        # Connect the surface, its worldMatrix and the follicleShape to it's transform
+        if is_nurbs:
+            modifier.connect(get_plug(surface_object, "local"), get_plug(follicle_shape, "inputSurface"))
+        else:
+            modifier.connect(get_plug(surface_object, "outMesh"), get_plug(follicle_shape, "inputMesh"))
+        modifier.connect(get_plug(surface_object, "worldMatrix[0]"), get_plug(follicle_shape, "inputWorldMatrix"))
+        modifier.connect(get_plug(follicle_shape, "outRotate"), get_plug(follicle, "rotate"))
+        modifier.connect(get_plug(follicle_shape, "outTranslate"), get_plug(follicle, "translate"))
+
+        modifier.newPlugValueDouble(get_plug(follicle_shape, "parameterU"), u_val)
+        modifier.newPlugValueDouble(get_plug(follicle_shape, "parameterV"), v_val)
+        if hide:
+            modifier.newPlugValueBool(get_plug(follicle_shape, "visibility"), False)
+
+        lock_scale = bool(scale_grp) and cmds.objExists(scale_grp)
+        if lock_scale:
+            modifier.connect(get_plug(get_object(scale_grp), "scale"), get_plug(follicle, "scale"))
+
+        self._follicles.append((follicle, follicle_shape, lock_scale))
+        return len(self._follicles) - 1
+
+    def add_uv_pin(self, surface_shape, name, uv_list):
+        """
+        Queue one uvPin node holding a coordinate for every (u, v).
+
+        The pin reads the world space geometry, so outputMatrix[i] is the world
+        matrix of the i-th coordinate, oriented like a follicle: X along U and
+        Z along the surface normal.
+
+        :param surface_shape: nurbsSurface or mesh shape node name
+        :param name: name of the uvPin node
+        :param uv_list: list of (u, v) tuples, 0-1 range on NURBS surfaces
+        :return: MObject of the queued uvPin node
+        """
+        surface_object, is_nurbs = self._surface(surface_shape)
+        modifier = self.modifier
+
+        uv_pin = self.add_node("uvPin", name)
+        geometry_plug = "worldSpace[0]" if is_nurbs else "worldMesh[0]"
+        modifier.connect(get_plug(surface_object, geometry_plug), get_plug(uv_pin, "deformedGeometry"))
+        modifier.newPlugValueInt(get_plug(uv_pin, "normalAxis"), 2)
+        modifier.newPlugValueInt(get_plug(uv_pin, "tangentAxis"), 0)
+        if is_nurbs:
+            modifier.newPlugValueBool(get_plug(uv_pin, "normalizedIsoParms"), True)
+
+        for i, (u_val, v_val) in enumerate(uv_list):
+            modifier.newPlugValueDouble(get_plug(uv_pin, "coordinate[{}].coordinateU".format(i)), u_val)
+            modifier.newPlugValueDouble(get_plug(uv_pin, "coordinate[{}].coordinateV".format(i)), v_val)
+
+        return uv_pin
+
+    def _set_matrix(self, node, attr_name, matrix):
+        matrix_data = om.MFnMatrixData().create(om.MMatrix([float(value) for value in matrix.reshape(-1)]))
+        self.modifier.newPlugValue(get_plug(node, attr_name), matrix_data)
+
+    def add_proximity_pin(self, surface_shape, name, points, original_shape=None):
+        """
+        Queue one proximityPin node holding a rivet for every point.
+
+        The pin binds every input point to its triangle and barycentric
+        weights on the original geometry once, then reads the three deformed
+        vertices of that triangle on every evaluation, so its cost follows the
+        number of points and not the mesh resolution. The deformed geometry is
+        the world space mesh, so outputMatrix[i] is the world matrix of the
+        i-th point, oriented like a follicle: X along U and Z along the normal.
+
+        :param surface_shape: mesh shape node name
+        :param name: name of the proximityPin node
+        :param points: (N, 3) positions on the original geometry, in its object space
+        :param original_shape: intermediate mesh upstream of the deformers of
+            the surface, the surface itself when None
+        :return: MObject of the queued proximityPin node
+        """
+        surface_object = self._surface(surface_shape)[0]
+        original_object = surface_object if original_shape is None else get_object(original_shape)
+        modifier = self.modifier
+
+        proximity_pin = self.add_node("proximityPin", name)
+        modifier.connect(get_plug(original_object, "outMesh"), get_plug(proximity_pin, "originalGeometry"))
+        modifier.connect(get_plug(surface_object, "worldMesh[0]"), get_plug(proximity_pin, "deformedGeometry"))
+        # Z along the normal, X along U, the axis enums as documented for proximityPin
+        # (this wiring was written from the node reference, it was not checked in a Maya session)
+        modifier.newPlugValueInt(get_plug(proximity_pin, "normalAxis"), 2)
+        modifier.newPlugValueInt(get_plug(proximity_pin, "tangentAxis"), 0)
+        # the outputs sit on the deformed surface, in its frame, whatever the input orientation
+        modifier.newPlugValueBool(get_plug(proximity_pin, "offsetTranslation"), False)
+        modifier.newPlugValueBool(get_plug(proximity_pin, "offsetOrientation"), False)
+
+        matrix = np.identity(4)
+        for i, point in enumerate(np.asarray(points, dtype=np.float64).reshape(-1, 3)):
+            matrix[3, :3] = point
+            self._set_matrix(proximity_pin, "inputMatrix[{}]".format(i), matrix)
+        return proximity_pin
+
+    def add_blend(self, name, matrix_plugs, weights, offset):
+        """
+        Queue a point driven by a weighted sum of world matrices.
+
+        A wtAddMatrix node blends the matrices, and a multMatrix applies the
+        offset before the blended matrix, see lod.secondary_offsets. The plugs
+        with a zero weight are not connected.
+
+        :param name: prefix of the nodes
+        :param matrix_plugs: world matrix plugs as (MObject, attribute path)
+            tuples or node.attribute strings, see registry.NodeRegistry.plugs
+        :param weights: weight of every plug
+        :param offset: (4, 4) array
+        :return: MObject of the multMatrix, its matrixSum is the world matrix
+        """
+        modifier = self.modifier
+
+        blend = self.add_node("wtAddMatrix", name + "_wtAddMatrix")
+        index = 0
+        for matrix_plug, weight in zip(matrix_plugs, weights):
+            if not weight:
+                continue
+            modifier.connect(self._source_plug(matrix_plug), get_plug(blend, "wtMatrix[{}].matrixIn".format(index)))
+            modifier.newPlugValueDouble(get_plug(blend, "wtMatrix[{}].weightIn".format(index)), float(weight))
+            index += 1
+
+        world_matrix = self.add_node("multMatrix", name + "_multMatrix")
+        self._set_matrix(world_matrix, "matrixIn[0]", offset)
+        modifier.connect(get_plug(blend, "matrixSum"), get_plug(world_matrix, "matrixIn[1]"))
+        return world_matrix
+
+    def add_frozen_matrix(self, surface_shape, name, local_matrix):
+        """
+        Queue a point fixed in the space of a surface.
+
+        :param surface_shape: nurbsSurface or mesh shape node name
+        :param name: name of the multMatrix node
+        :param local_matrix: (4, 4) array, matrix in the space of the surface
+        :return: MObject of the multMatrix, its matrixSum is the world matrix
+        """
+        surface_object = self._surface(surface_shape)[0]
+        world_matrix = self.add_node("multMatrix", name)
+        self._set_matrix(world_matrix, "matrixIn[0]", local_matrix)
+        self.modifier.connect(get_plug(surface_object, "worldMatrix[0]"), get_plug(world_matrix, "matrixIn[1]"))
+        return world_matrix
+
+    def add_matrix_driver(self, matrix_plug, target):
+        """
+        Queue the nodes driving the translate and rotate of a transform from a world matrix plug.
+
+        :param matrix_plug: world matrix plug as an (MObject, attribute path)
+            tuple or a node.attribute string
+        :param target: name or MObject of the driven transform
+        :return: (multMatrix, decomposeMatrix) MObjects
+        """
+        modifier = self.modifier
+        target = self._as_object(target)
+        target_name = node_name(target)
+
+        mult_matrix = self.add_node("multMatrix", target_name + "_multMatrix")
+        modifier.connect(self._source_plug(matrix_plug), get_plug(mult_matrix, "matrixIn[0]"))
+        modifier.connect(get_plug(target, "parentInverseMatrix[0]"), get_plug(mult_matrix, "matrixIn[1]"))
+        decompose_matrix = self.add_node("decomposeMatrix", target_name + "_decomposeMatrix")
+        modifier.connect(get_plug(mult_matrix, "matrixSum"), get_plug(decompose_matrix, "inputMatrix"))
+        modifier.connect(get_plug(decompose_matrix, "outputTranslate"), get_plug(target, "translate"))
+        modifier.connect(get_plug(decompose_matrix, "outputRotate"), get_plug(target, "rotate"))
+        return mult_matrix, decompose_matrix
+
+    def add_offset_parent_driver(self, matrix_plug, target, root):
+        """
+        Queue the multMatrix driving a transform through its offsetParentMatrix.
+
+        The controls are built on the driver matrix, so the root
+        worldInverseMatrix is the only offset needed and the local transform of
+        the target is reset to identity.
+
+        :param matrix_plug: world matrix plug as an (MObject, attribute path)
+            tuple or a node.attribute string
+        :param target: name or MObject of the driven transform, a child of root
+        :param root: name or MObject of the parent of the target
+        :return: MObject of the multMatrix
+        """
+        modifier = self.modifier
+        target = self._as_object(target)
+
+        mult_matrix = self.add_node("multMatrix", node_name(target) + "_multMatrix")
+        modifier.connect(self._source_plug(matrix_plug), get_plug(mult_matrix, "matrixIn[0]"))
+        modifier.connect(get_plug(self._as_object(root), "worldInverseMatrix[0]"), get_plug(mult_matrix, "matrixIn[1]"))
+        modifier.connect(get_plug(mult_matrix, "matrixSum"), get_plug(target, "offsetParentMatrix"))
+        for attr_name, value in (("translate", 0.0), ("rotate", 0.0), ("scale", 1.0)):
+            for axis in "XYZ":
+                modifier.newPlugValueDouble(get_plug(target, attr_name + axis), value)
+        return mult_matrix
+
+    def commit(self):
+        """
+        Create every queued node and lock the follicle channels.
+
+        :return follicle_data_list: list of dict {'transform': follicle transform,
+            'shape': follicle shape, 'object': MObject of the transform}, in the
+            order the follicles were queued
+        """
+        follicle_undo.execute(self.modifier)
+
+        follicle_data_list = []
+        for follicle, follicle_shape, lock_scale in self._follicles:
+            # Lock the translate/rotate of the follicle
+            locked_attrs = ["translate", "rotate", "scale"] if lock_scale else ["translate", "rotate"]
+            for attr_name in locked_attrs:
+                get_plug(follicle, attr_name).isLocked = True
+
+            follicle_data_list.append({'transform': node_name(follicle),
+                                       'shape': node_name(follicle_shape),
+                                       'object': follicle})
+
+        self._follicles = []
+        return follicle_data_list
@@ -0,0 +1,207 @@
+"""Disk cache of the solved follicle U/V parameters
+
+Rebuilding a rig solves the closest point of every guide locator again, even
+when neither the surface nor the guide changed. The cache stores the solved
+(u, v) of every locator in a compressed .npz file, keyed by
+the content hash of the surface (topology, points and UVs, or CVs and knots,
+see surface_data.surface_hash) and the locator position, so only the locators
+that moved, or the ones on an edited surface, are solved again.
+
+The cache is only used when the useUVCache setting is on. The files go to the
+directory of the FOLLICLE_CACHE_DIR environment variable, named after the
+scene, or next to the scene file when it is not set.
+
+The file keeps at most FOLLICLE_UV_CACHE_SIZE entries (MAX_ENTRIES by default),
+the least recently used ones are evicted first.
+"""
+
+import hashlib
+import os
+
+import numpy as np
+
+import maya.cmds as cmds
+
+from . import closest, surface_data
+
+
+# number of entries kept in a cache file, overridden by the environment variable
+MAX_ENTRIES = 200000
+MAX_ENTRIES_ENV = "FOLLICLE_UV_CACHE_SIZE"
+
+# locator positions are rounded to this number of decimals before hashing
+POSITION_DECIMALS = 6
+
+KEY_SIZE = surface_data.HASH_SIZE
+
+UV_CACHE_SUFFIX = "_follicle_uv.npz"
+
+# directory of the cache files, the scene folder when the variable is not set
+CACHE_DIR_ENV = "FOLLICLE_CACHE_DIR"
+
+
+def cache_path(suffix=UV_CACHE_SUFFIX):
+    """
+    Path of a cache file of the current scene.
+
+    :param suffix: end of the file name, after the scene name
+    :return: path in the FOLLICLE_CACHE_DIR directory, or next to the scene
+        file when the variable is not set, None when the scene is not saved
+        or the directory can not be created
+    """
+    scene_path = cmds.file(query=True, sceneName=True)
+    if not scene_path:
+        return None
+    cache_dir = os.environ.get(CACHE_DIR_ENV)
+    if not cache_dir:
+        return os.path.splitext(scene_path)[0] + suffix
+    if not os.path.isdir(cache_dir):
+        try:
+            os.makedirs(cache_dir)
+        except (IOError, OSError) as error:
+            cmds.warning("Could not create the follicle cache directory {}: {}".format(cache_dir, error))
+            return None
+    # scenes of the same name in different folders get different files
+    scene_digest = hashlib.blake2b(os.path.abspath(scene_path).encode("utf-8"), digest_size=4).hexdigest()
+    scene_name = os.path.splitext(os.path.basename(scene_path))[0]
+    return os.path.join(cache_dir, "{}_{}{}".format(scene_name, scene_digest, suffix))
+
+
+def position_keys(surface_digest, positions):
+    """
+    Cache keys of a batch of positions on one surface.
+
+    :param surface_digest: surface_data.surface_hash of the surface
+    :param positions: list of world space positions as (x, y, z)
+    :return: list of bytes keys, in the same order as positions
+    """
+    # adding 0.0 turns -0.0 into 0.0 so both hash the same
+    rounded = np.round(np.asarray(positions, dtype=np.float64).reshape(-1, 3), POSITION_DECIMALS) + 0.0
+    return [hashlib.blake2b(surface_digest + row.tobytes(), digest_size=KEY_SIZE).digest()
+            for row in rounded]
+
+
+class UVCache(object):
+    """U/V parameters of locators, stored in an .npz file"""
+
+    def __init__(self, path, max_entries=None):
+        """
+        :param path: path of the .npz file, it does not need to exist
+        :param max_entries: number of entries kept on save, defaults to the
+            FOLLICLE_UV_CACHE_SIZE environment variable or MAX_ENTRIES
+        """
+        self.path = path
+        if max_entries is None:
+            max_entries = int(os.environ.get(MAX_ENTRIES_ENV, MAX_ENTRIES))
+        self.max_entries = max_entries
+        self.clock = 0
+        # key -> [u, v, last used clock]
+        self.entries = {}
+        # True when entries were added since the file was read or written
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        """Read the cache file, an unreadable file is treated as empty"""
+        self.entries = {}
+        self.dirty = False
+        if not os.path.isfile(self.path):
+            return
+        try:
+            with np.load(self.path) as data:
+                keys, uvs, used = data["keys"], data["uvs"], data["used"]
+        except (IOError, OSError, ValueError, KeyError):
+            return
+        for key, (u_val, v_val), last_used in zip(keys, uvs.tolist(), used.tolist()):
+            self.entries[key.tobytes()] = [u_val, v_val, last_used]
+        self.clock = int(used.max()) + 1 if len(used) else 0
+
+    def get(self, keys):
+        """
+        Look up a batch of keys and mark the hits as used.
+
+        :param keys: list of bytes keys
+        :return: list of (u, v) tuples, None for the keys not in the cache
+        """
+        uv_list = []
+        for key in keys:
+            entry = self.entries.get(key)
+            if entry is None:
+                uv_list.append(None)
+            else:
+                entry[2] = self.clock
+                uv_list.append((entry[0], entry[1]))
+        return uv_list
+
+    def put(self, keys, uv_list):
+        """
+        Add or update entries.
+
+        :param keys: list of bytes keys
+        :param uv_list: list of (u, v) tuples, in the same order as keys
+        """
+        for key, (u_val, v_val) in zip(keys, uv_list):
+            self.entries[key] = [u_val, v_val, self.clock]
+            self.dirty = True
+
+    def save(self):
+        """
+        Evict the least recently used entries over max_entries and write the file.
+
+        Nothing is written when no entry was added or evicted, the use of the
+        hits is then only kept in memory.
+
+        :return: True when the file was written
+        """
+        if not self.dirty and len(self.entries) <= self.max_entries:
+            return False
+        items = sorted(self.entries.items(), key=lambda item: item[1][2], reverse=True)[:self.max_entries]
+        self.entries = dict(items)
+
+        keys = np.frombuffer(b"".join(key for key, _ in items), dtype=np.uint8).reshape(-1, KEY_SIZE)
+        uvs = np.array([entry[:2] for _, entry in items], dtype=np.float64).reshape(-1, 2)
+        used = np.array([entry[2] for _, entry in items], dtype=np.int64)
+
+        # write next to the file then swap, an interrupted save keeps the old cache
+        temp_path = self.path + ".tmp.npz"
+        np.savez_compressed(temp_path, keys=keys, uvs=uvs, used=used)
+        os.replace(temp_path, self.path)
+        self.clock += 1
+        self.dirty = False
+        return True
+
+
+def cached_surface_uvs(surface_shape, positions, path=None, solver="serial", workers=None):
+    """
+    Solve the follicle U/V parameters of the positions that are not cached yet.
+
+    Works like closest.surface_uvs, without a cache file (unsaved scene) every
+    position is solved.
+
+    :param surface_shape: nurbsSurface or mesh shape node name
+    :param positions: list of world space positions as (x, y, z)
+    :param path: cache file, defaults to cache_path
+    :param solver: solver of the missing positions, one of constants.UV_SOLVERS
+    :param workers: number of processes of the solver
+    :return uv_list: list of (u, v) tuples, in the same order as positions
+    """
+    path = path or cache_path()
+    if not path or not len(positions):
+        return closest.surface_uvs(surface_shape, positions, solver, workers)
+
+    uv_cache = UVCache(path)
+    keys = position_keys(surface_data.surface_hash(surface_shape), positions)
+    uv_list = uv_cache.get(keys)
+
+    missing = [i for i, uv in enumerate(uv_list) if uv is None]
+    if missing:
+        solved = closest.surface_uvs(surface_shape, [positions[i] for i in missing], solver, workers)
+        for i, uv in zip(missing, solved):
+            uv_list[i] = uv
+        uv_cache.put([keys[i] for i in missing], solved)
+
+    try:
+        uv_cache.save()
+    except (IOError, OSError) as error:
+        cmds.warning("Could not write the follicle U/V cache {}: {}".format(path, error))
+    return uv_list
@@ -0,0 +1,305 @@
+"""Closest point queries used to place the follicles on the input surface"""
+
+import collections
+import concurrent.futures
+import multiprocessing
+import os
+import sys
+
+import numpy as np
+
+import maya.cmds as cmds
+
+from follicle_kernels import nurbs_solver, workers as solver_workers
+from follicle_kernels.surface_index import SurfaceIndex
+
+from . import surface_data
+
+
+# separator of the surfaces listed in the surfaceName setting
+SURFACE_SEPARATOR = ","
+
+# chunks per worker, smaller chunks balance the load of uneven queries
+CHUNKS_PER_WORKER = 4
+
+# most processes of the processes solver, overridden by the environment variable
+MAX_WORKERS = 8
+MAX_WORKERS_ENV = "FOLLICLE_UV_WORKERS"
+
+# under this many positions the processes solver runs in the current process,
+# starting the pool would take longer than the solve
+POOL_MIN_POSITIONS = 4096
+
+TriangleBinding = collections.namedtuple("TriangleBinding", ["vertices", "barycentric", "tangent_weights"])
+
+
+def closest_uvs(surface_shape, positions):
+    """
+    Solve the closest U/V parameters on a mesh for a batch of positions.
+
+    A single closestPointOnMesh node is created for the whole batch. Its
+    inPosition is set for every position and it is deleted once all the
+    parameters are read, so the number of temporary nodes stays the same
+    whatever the number of positions. NURBS surfaces go through the NumPy
+    solver instead, see surface_uvs.
+
+    :param surface_shape: mesh shape node name
+    :param positions: list of world space positions as (x, y, z)
+    :return uv_list: list of (u, v) tuples, in the same order as positions
+    """
+    if cmds.nodeType(surface_shape) != "mesh":
+        raise ValueError("{} is not a mesh".format(surface_shape))
+    closest_point_node = cmds.createNode("closestPointOnMesh", n="cpm")
+    cmds.connectAttr("{}.worldMatrix".format(surface_shape),
+                     "{}.inputMatrix".format(closest_point_node), force=True)
+    cmds.connectAttr("{}.outMesh".format(surface_shape),
+                     "{}.inMesh".format(closest_point_node), force=True)
+
+    uv_list = []
+    try:
+        for position in positions:
+            cmds.setAttr("{}.inPosition".format(closest_point_node),
+                         position[0], position[1], position[2], type="double3")
+            uv_list.append((cmds.getAttr("{}.parameterU".format(closest_point_node)),
+                            cmds.getAttr("{}.parameterV".format(closest_point_node))))
+    finally:
+        cmds.delete(closest_point_node)
+    return uv_list
+
+
+def nurbs_solver_arrays(surface_shape):
+    """
+    Arguments of the NumPy solver of a nurbsSurface shape, in world space.
+
+    :param surface_shape: nurbsSurface shape node name
+    :return: dict of the keyword arguments of nurbs_solver.NurbsSolver
+    """
+    data = surface_data.nurbs_data(surface_shape)
+    return {"cvs": surface_data.world_points(data.cvs, data.matrix),
+            "knots_u": nurbs_solver.maya_knots(data.knots_u),
+            "knots_v": nurbs_solver.maya_knots(data.knots_v),
+            "degree_u": data.degree_u,
+            "degree_v": data.degree_v,
+            "weights": data.weights,
+            "periodic_u": bool(data.periodic_u),
+            "periodic_v": bool(data.periodic_v)}
+
+
+def mesh_solver_arrays(surface_shape):
+    """
+    Arguments of the NumPy solver of a mesh shape, in world space.
+
+    :param surface_shape: mesh shape node name
+    :return: dict of the keyword arguments of mesh_solver.MeshSolver
+    """
+    data = surface_data.mesh_data(surface_shape)
+    _, triangles, uv_triangles = surface_data.mesh_triangles(surface_shape, data)
+    return {"vertices": surface_data.world_points(data.points, data.matrix),
+            "triangles": triangles,
+            "uvs": data.uvs,
+            "uv_triangles": uv_triangles}
+
+
+def solver_arrays(surface_shape):
+    """
+    Kind and arguments of the NumPy solver of a surface, see follicle_kernels.workers.build_solver.
+
+    :param surface_shape: nurbsSurface or mesh shape node name
+    :return: ("nurbs" or "mesh", dict of arrays)
+    """
+    if cmds.nodeType(surface_shape) == "nurbsSurface":
+        return "nurbs", nurbs_solver_arrays(surface_shape)
+    return "mesh", mesh_solver_arrays(surface_shape)
+
+
+def get_nurbs_solver(surface_shape):
+    """
+    Build a NumPy solver from a nurbsSurface shape, in world space.
+
+    :param surface_shape: nurbsSurface shape node name
+    :return: nurbs_solver.NurbsSolver
+    """
+    return solver_workers.build_solver("nurbs", nurbs_solver_arrays(surface_shape))
+
+
+def get_mesh_solver(surface_shape):
+    """
+    Build a NumPy solver from a mesh shape, in world space.
+
+    :param surface_shape: mesh shape node name
+    :return: mesh_solver.MeshSolver
+    """
+    return solver_workers.build_solver("mesh", mesh_solver_arrays(surface_shape))
+
+
+def triangle_bindings(surface_shape, positions):
+    """
+    Host triangle of every position on a mesh.
+
+    :param surface_shape: mesh shape node name
+    :param positions: list of world space positions as (x, y, z)
+    :return: TriangleBinding with the (N, 3) vertex ids of the closest
+        triangles, the (N, 3) barycentric weights of the closest points and the
+        (N, 3) corner weights of the U tangents, see MeshSolver.tangent_weights
+    """
+    solver = get_mesh_solver(surface_shape)
+    result = solver.closest(np.asarray(positions, dtype=np.float64))
+    return TriangleBinding(solver.triangles[result.triangle], result.barycentric,
+                           solver.tangent_weights(result.triangle))
+
+
+def original_shape(surface_shape):
+    """
+    Intermediate shape holding the geometry of a surface before its deformers.
+
+    :param surface_shape: nurbsSurface or mesh shape node name
+    :return: name of the most upstream intermediate shape of the same type,
+        None when the surface has none
+    """
+    history = cmds.listHistory(surface_shape) or []
+    intermediates = [shape for shape in cmds.ls(history, type=cmds.nodeType(surface_shape),
+                                                intermediateObjects=True) or []
+                     if shape != surface_shape]
+    # the history lists the upstream nodes last
+    return intermediates[-1] if intermediates else None
+
+
+def rest_points(surface_shape, binding):
+    """
+    Points of triangle bindings on the geometry of a mesh before its deformers.
+
+    :param surface_shape: mesh shape node name
+    :param binding: TriangleBinding of the points, see triangle_bindings
+    :return: (original shape, (N, 3) object space points on it), the original
+        shape is None when the mesh has none or when its deformers change the
+        vertex count, the points are then on the mesh itself
+    """
+    points = surface_data.raw_mesh_points(surface_shape)
+    original = original_shape(surface_shape)
+    if original is not None:
+        original_points = surface_data.raw_mesh_points(original)
+        if len(original_points) == len(points):
+            points = original_points
+        else:
+            original = None
+    corners = points[binding.vertices].astype(np.float64)
+    return original, np.einsum("ij,ijk->ik", binding.barycentric, corners)
+
+
+def get_solver(surface_shape):
+    """NumPy solver of a nurbsSurface or mesh shape, see get_nurbs_solver and get_mesh_solver"""
+    return solver_workers.build_solver(*solver_arrays(surface_shape))
+
+
+def surface_names(surface_setting):
+    """
+    Surfaces listed in the surfaceName setting.
+
+    :param surface_setting: one surface name, or several separated by commas
+    :return: list of surface names
+    """
+    return [name.strip() for name in surface_setting.split(SURFACE_SEPARATOR) if name.strip()]
+
+
+def surface_bounds(surface_shape):
+    """
+    World space box holding a surface.
+
+    The box of the CVs of a NURBS surface holds the whole surface.
+
+    :param surface_shape: nurbsSurface or mesh shape node name
+    :return: ((3,) lower corner, (3,) upper corner)
+    """
+    data = surface_data.surface_data(surface_shape)
+    points = data.points if isinstance(data, surface_data.MeshData) else data.cvs.reshape(-1, 3)
+    points = surface_data.world_points(points, data.matrix)
+    return points.min(axis=0), points.max(axis=0)
+
+
+def assign_surfaces(surface_shapes, positions):
+    """
+    Nearest surface of every position.
+
+    A SurfaceIndex over the surface boxes only measures the distance to the
+    surfaces that can still be the nearest one, and only builds the NumPy
+    solver of those surfaces.
+
+    :param surface_shapes: list of nurbsSurface or mesh shape node names
+    :param positions: list of world space positions as (x, y, z)
+    :return: list of indices in surface_shapes, in the same order as positions
+    """
+    if len(surface_shapes) == 1 or not len(positions):
+        return [0] * len(positions)
+    box_min, box_max = zip(*[surface_bounds(surface_shape) for surface_shape in surface_shapes])
+    index = SurfaceIndex(box_min, box_max, lambda surface: get_solver(surface_shapes[surface]))
+    return index.nearest(positions)[0].tolist()
+
+
+def _split(positions, workers):
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    return [chunk for chunk in np.array_split(positions, workers * CHUNKS_PER_WORKER) if len(chunk)]
+
+
+def _process_context():
+    context = multiprocessing.get_context("spawn")
+    # in an interactive session sys.executable is Maya itself, the workers run in mayapy
+    mayapy = os.path.join(os.path.dirname(sys.executable), "mayapy.exe" if os.name == "nt" else "mayapy")
+    if os.path.isfile(mayapy):
+        context.set_executable(mayapy)
+    return context
+
+
+def process_uvs(surface_shape, positions, workers=None):
+    """
+    Solve the follicle U/V parameters with the NumPy solvers on a process pool.
+
+    The surface is read once into the arrays of its MeshSolver or
+    NurbsSolver. Only these arrays and the chunks of positions are sent to the
+    worker processes, which build the solver themselves and import nothing but
+    follicle_kernels, see follicle_kernels.workers. Without Maya to import,
+    a worker starts in the time of a NumPy import.
+
+    :param surface_shape: nurbsSurface or mesh shape node name
+    :param positions: list of world space positions as (x, y, z)
+    :param workers: number of processes, defaults to the number of cores, at
+        most FOLLICLE_UV_WORKERS or MAX_WORKERS
+    :return uv_list: list of (u, v) tuples, in the same order as positions
+    """
+    workers = min(workers or os.cpu_count() or 1, int(os.environ.get(MAX_WORKERS_ENV, MAX_WORKERS)))
+    kind, arrays = solver_arrays(surface_shape)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=_process_context(),
+                                                initializer=solver_workers.init_worker,
+                                                initargs=(kind, arrays)) as executor:
+        uvs = np.concatenate(list(executor.map(solver_workers.closest_uvs, _split(positions, workers))))
+    return [tuple(uv) for uv in uvs.tolist()]
+
+
+def surface_uvs(surface_shape, positions, solver="serial", workers=None):
+    """
+    Solve the follicle U/V parameters on a surface for a batch of positions.
+
+    With the serial solver NURBS surfaces are projected all at once with the
+    NumPy solver and meshes go through closest_uvs. The processes solver
+    spreads the positions over worker processes, see process_uvs, from
+    POOL_MIN_POSITIONS positions on, fewer are solved with the same NumPy
+    solver in the current process. There is no
+    thread pool: the API 2.0 closest point queries hold the GIL, so threads
+    run them one after the other.
+
+    :param surface_shape: nurbsSurface or mesh shape node name
+    :param positions: list of world space positions as (x, y, z)
+    :param solver: one of constants.UV_SOLVERS
+    :param workers: number of processes, defaults to the number of cores
+    :return uv_list: list of (u, v) tuples, in the same order as positions
+    """
+    if not len(positions):
+        return []
+    if solver == "processes":
+        if len(positions) >= POOL_MIN_POSITIONS:
+            return process_uvs(surface_shape, positions, workers)
+        result = get_solver(surface_shape).closest(np.asarray(positions, dtype=np.float64))
+        return [tuple(uv) for uv in result.uv.tolist()]
+    if cmds.nodeType(surface_shape) == "nurbsSurface":
+        result = get_nurbs_solver(surface_shape).closest(np.asarray(positions, dtype=np.float64))
+        return [tuple(uv) for uv in result.uv.tolist()]
+    return closest_uvs(surface_shape, positions)
@@ -0,0 +1,17 @@
+"""Values of the follicle component settings
+
+The guide reads them to declare its parameters, so this module imports
+nothing, not even Maya.
+"""
+
+# values of the attachMode enum setting
+ATTACH_MODES = ["follicle", "uvPin", "rivet"]
+
+# attach modes whose drivers are world matrix plugs instead of transforms
+MATRIX_ATTACH_MODES = ("uvPin", "rivet")
+
+# values of the uvSolver enum setting
+UV_SOLVERS = ["serial", "processes"]
+
+# default number of locators built between two progress updates
+CHUNK_SIZE = 256
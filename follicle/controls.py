@@ -0,0 +1,129 @@
+"""Batched creation of the component controls from a template control
+
+Every control still goes through addCtl, which keeps the metadata, tags,
+attributes and colors mGear gives its controls. ControlFactory only batches
+what addCtl does not own: the transforms between a control and its parent,
+like the os_grp and ik_cns groups, are created in one modifier commit, and
+with instance_shapes the icon curves of the controls are replaced by
+instances of the shapes of the first control, the template, so the saved rig
+holds one set of icon curves.
+
+A control with a <name>_controlBuffer in the guide keeps its custom shapes.
+
+    factory = controls.ControlFactory(self, "cube", self.color_ik, w=0.2, h=0.2, d=0.2)
+    for i, matrix in enumerate(matrices):
+        os_grp, ik_cns = factory.add(parent, "{}_ctl".format(i), matrix,
+                                     groups=["{}_os_grp".format(i), "{}_ik_cns".format(i)])
+    ctl_lst = factory.commit(tp=self.parentCtlTag, guide_loc_ref="root")
+"""
+
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+
+from .build import FollicleBuilder, node_name
+
+
+class ControlFactory(object):
+    """Queue controls sharing one icon and create them in a batch"""
+
+    def __init__(self, component, icon_shape, color, instance_shapes=False, **icon_kwargs):
+        """
+        :param component: shifter component the controls belong to
+        :param icon_shape: mGear icon of the controls, like "cube"
+        :param color: color of the controls
+        :param instance_shapes: instance the template shapes under every
+            control instead of keeping the shapes addCtl built, editing one
+            then edits all
+        :param icon_kwargs: other addCtl options, like the icon size
+        """
+        self.component = component
+        self.icon_shape = icon_shape
+        self.color = color
+        self.instance_shapes = instance_shapes
+        self.icon_kwargs = icon_kwargs
+        self.template = None
+        self._builder = FollicleBuilder()
+        self._queued = []
+        self._parent_matrices = {}
+
+        # the custom shapes of the guide, stored as <full name>_controlBuffer
+        guide = getattr(component.rig, "guide", None)
+        self._buffers = set(getattr(guide, "controllers", None) or {})
+
+    def _has_buffer(self, name):
+        return self.component.getName(name) + "_controlBuffer" in self._buffers
+
+    def _parent_matrix(self, parent):
+        parent_name = str(parent)
+        if parent_name not in self._parent_matrices:
+            selection = om.MSelectionList()
+            selection.add(parent_name)
+            self._parent_matrices[parent_name] = list(selection.getDagPath(0).inclusiveMatrix())
+        return self._parent_matrices[parent_name]
+
+    def add(self, parent, name, matrix, groups=(), parent_matrix=None):
+        """
+        Queue a control.
+
+        :param parent: parent transform of the control, or of its first group
+        :param name: name of the control, without the component prefix
+        :param matrix: 16 floats, world matrix of the control
+        :param groups: names of the transforms between the parent and the
+            control, without the component prefix, each one the child of the
+            previous one and at the matrix of the control
+        :param parent_matrix: 16 floats, world matrix of the parent when it is
+            known, it is read from the parent otherwise
+        :return: list of the MObjects of the groups, they exist once commit is called
+        """
+        group_objects = []
+        if groups:
+            parent_matrix = parent_matrix if parent_matrix is not None else self._parent_matrix(parent)
+            group_parent = parent if isinstance(parent, om.MObject) else str(parent)
+            for group_name in groups:
+                group_parent = self._builder.add_transform(self.component.getName(group_name), group_parent,
+                                                           matrix, parent_matrix)
+                parent_matrix = matrix
+                group_objects.append(group_parent)
+        self._queued.append((parent, name, matrix, group_objects))
+        return group_objects
+
+    def commit(self, tp=None, guide_loc_ref=None):
+        """
+        Create the groups and the controls queued since the last commit.
+
+        :param tp: parent of the controller tags, see component.Main.addCtl
+        :param guide_loc_ref: guide locator of the controls
+        :return: list of the controls, in the order they were queued
+        """
+        queued, self._queued = self._queued, []
+        builder, self._builder = self._builder, FollicleBuilder()
+        builder.commit()
+
+        ctl_lst = []
+        shared = []
+        for parent, name, matrix, group_objects in queued:
+            if group_objects:
+                # mGear expects PyNode parents, PyMEL is only loaded once there are groups to wrap
+                from pymel import core as pm
+                parent = pm.PyNode(node_name(group_objects[-1]))
+            ctl = self.component.addCtl(parent, name, matrix, self.color, self.icon_shape,
+                                        tp=tp, guide_loc_ref=guide_loc_ref, **self.icon_kwargs)
+            ctl_lst.append(ctl)
+            if self.instance_shapes and not self._has_buffer(name):
+                if self.template is None:
+                    self.template = ctl
+                else:
+                    shared.append(ctl)
+        if shared:
+            self._instance_shapes(shared)
+        return ctl_lst
+
+    def _instance_shapes(self, ctl_lst):
+        # the curves addCtl built are deleted at once, the template shapes are instanced in their place
+        template_shapes = cmds.listRelatives(self.template.name(), shapes=True, fullPath=True) or []
+        ctl_names = [ctl.name() for ctl in ctl_lst]
+        own_shapes = cmds.listRelatives(ctl_names, shapes=True, fullPath=True) or []
+        if own_shapes:
+            cmds.delete(own_shapes)
+        for ctl_name in ctl_names:
+            cmds.parent(template_shapes + [ctl_name], addObject=True, shape=True)
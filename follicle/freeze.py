@@ -0,0 +1,66 @@
+"""Frozen attachments on surfaces that never deform
+
+A surface whose history is static only moves with its transform, so the
+matrix of an attachment is constant in the space of the surface. Such
+attachments are replaced by that local matrix times the surface worldMatrix,
+and the surface geometry is no longer evaluated for them.
+
+The history is static when every upstream node is construction history, like
+polyCube or rebuildSurface, or an intermediate shape. Anything else, a
+deformer, an animCurve, an expression, an AlembicNode, a cacheFile, a
+utility node or another visible shape, may change the geometry on some
+frame or when a control moves, and the surface is not frozen.
+"""
+
+import numpy as np
+
+import maya.cmds as cmds
+
+
+# node types computing their geometry once from static inputs, the base types of the poly and NURBS history
+STATIC_TYPES = ["polyBase", "abstractBaseCreate", "groupParts", "groupId"]
+
+
+def deforming_nodes(surface_shape):
+    """
+    Nodes in the history of a surface that are not known to be static.
+
+    :param surface_shape: nurbsSurface or mesh shape node name
+    :return: list of node names, empty when the surface can only move with
+        its transform
+    """
+    history = cmds.listHistory(surface_shape) or []
+    static = set(cmds.ls(history, type=STATIC_TYPES) or [])
+    # orig shapes only hold the geometry of the history above them, which is checked too
+    static.update(cmds.ls(history, intermediateObjects=True) or [])
+    static.update(cmds.ls(surface_shape) or [])
+    return [node for node in cmds.ls(history) or [] if node not in static]
+
+
+def local_matrix(world_matrix, surface_matrix):
+    """
+    Matrix of an attachment in the space of its surface.
+
+    :param world_matrix: 16 floats, world matrix of the attachment
+    :param surface_matrix: 16 floats, world matrix of the surface
+    :return: (4, 4) array, local * surface_matrix (Maya row vectors) gives
+        world_matrix back
+    """
+    world_matrix = np.asarray(world_matrix, dtype=np.float64).reshape(4, 4)
+    surface_matrix = np.asarray(surface_matrix, dtype=np.float64).reshape(4, 4)
+    return world_matrix.dot(np.linalg.inv(surface_matrix))
+
+
+def driver_nodes(drivers):
+    """
+    Nodes built for attachment drivers, without the surfaces they read.
+
+    :param drivers: follicle transforms or world matrix plugs
+    :return: list of node names
+    """
+    transforms = [driver for driver in drivers if "." not in driver]
+    nodes = sorted(set(driver.split(".", 1)[0] for driver in drivers if "." in driver))
+    if not nodes:
+        return transforms
+    # the history stops at the DAG nodes, the surfaces and their deformers stay out
+    return transforms + (cmds.listHistory(nodes, pruneDagObjects=True) or [])
@@ -0,0 +1,7 @@
+"""NumPy kernels of the follicle component
+
+Nothing in this package imports Maya, mGear or PyMEL, so it runs on machines
+without a Maya license and in the process pool workers, which would otherwise
+start a Maya session just to import the component. The follicle package puts
+the lib directory holding it on sys.path, see follicle.KERNELS_PATH.
+"""
@@ -0,0 +1,150 @@
+"""Follicle bindings and their evaluation, on plain NumPy arrays
+
+Every driver of a component is bound to a fixed linear combination of the
+points of its surface: the three corners of its triangle on a mesh, the
+(degree_u + 1) * (degree_v + 1) CVs of its span on a NURBS surface. Three sets
+of weights give the position, the U tangent and the two vectors whose cross
+product is the normal (two triangle edges, or dP/du and dP/dv), and the rest
+offset brings that frame back to the matrix of the driver. The weights do not
+change when the surface deforms, so evaluate computes every driver on every
+frame with a few einsum calls, from the surface points alone.
+
+The bindings are exported from Maya by follicle.binding.export_component, and
+read anywhere NumPy runs:
+
+    from follicle_kernels import bindings
+
+    follicle_bindings = bindings.load_bindings("follicle_C0_binding.npz")
+    matrices = bindings.evaluate(follicle_bindings, [body_points])  # (F, V, 3) -> (F, N, 4, 4)
+"""
+
+import collections
+
+import numpy as np
+
+
+# corner weights of the two edges of a triangle, b - a and c - a
+EDGE_WEIGHTS = ((-1.0, 1.0, 0.0), (-1.0, 0.0, 1.0))
+
+
+Bindings = collections.namedtuple(
+    "Bindings", ["surfaces", "vertex_counts", "surface_index", "vertices",
+                 "point_weights", "tangent_weights", "edge_weights", "offsets"])
+
+
+def triangle_edge_weights(count):
+    """
+    Edge weights of triangle bindings.
+
+    :param count: number of bound points
+    :return: (count, 2, 3) read only array, the same EDGE_WEIGHTS for every point
+    """
+    return np.broadcast_to(np.array(EDGE_WEIGHTS), (count, 2, 3))
+
+
+def frames(points, tangents, edge_a, edge_b):
+    """
+    Orthonormal matrices oriented like a follicle, X along U and Z along the normal.
+
+    :param points: (..., 3) positions
+    :param tangents: (..., 3) U tangents
+    :param edge_a: (..., 3) first vector of the normal
+    :param edge_b: (..., 3) second vector of the normal, normal = edge_a x edge_b
+    :return: (..., 4, 4) Maya (row vector) matrices
+    """
+    def normalized(vectors):
+        length = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(length > 0.0, length, 1.0)
+
+    normal = normalized(np.cross(edge_a, edge_b))
+    binormal = normalized(np.cross(normal, tangents))
+    tangent = np.cross(binormal, normal)
+
+    matrices = np.zeros(points.shape[:-1] + (4, 4), dtype=points.dtype)
+    matrices[..., 0, :3] = tangent
+    matrices[..., 1, :3] = binormal
+    matrices[..., 2, :3] = normal
+    matrices[..., 3, :3] = points
+    matrices[..., 3, 3] = 1.0
+    return matrices
+
+
+def _surface_frames(bindings, surface, points):
+    # points: (F, V, 3), returns the frames of the drivers of one surface as (F, n, 4, 4)
+    mask = bindings.surface_index == surface
+    corners = points[:, bindings.vertices[mask]]
+    weigh = lambda weights: np.einsum("nm,fnmc->fnc", weights, corners)
+    edge_weights = bindings.edge_weights[mask]
+    return mask, frames(weigh(bindings.point_weights[mask]), weigh(bindings.tangent_weights[mask]),
+                        weigh(edge_weights[:, 0]), weigh(edge_weights[:, 1]))
+
+
+def evaluate(bindings, surface_points):
+    """
+    World matrices of every driver on every frame.
+
+    :param bindings: Bindings, see load_bindings
+    :param surface_points: one (F, V, 3) array per surface of the bindings, in
+        the order of bindings.surfaces, in the space the bindings were
+        exported in (world space). V is the vertex count of a mesh or the
+        flattened (U, V) CV count of a NURBS surface.
+    :return: (F, N, 4, 4) array
+    """
+    surface_points = [np.asarray(points) for points in surface_points]
+    if len(surface_points) != len(bindings.surfaces):
+        raise ValueError("{} surfaces are bound, got points for {}".format(
+            len(bindings.surfaces), len(surface_points)))
+    frame_count = surface_points[0].shape[0] if surface_points else 0
+    dtype = np.result_type(bindings.offsets, *surface_points)
+
+    matrices = np.zeros((frame_count, len(bindings.surface_index), 4, 4), dtype=dtype)
+    for surface, points in enumerate(surface_points):
+        if points.shape[1] != bindings.vertex_counts[surface]:
+            raise ValueError("{} has {} points, {} were bound".format(
+                bindings.surfaces[surface], points.shape[1], bindings.vertex_counts[surface]))
+        mask, surface_frames = _surface_frames(bindings, surface, points)
+        matrices[:, mask] = np.matmul(bindings.offsets[mask], surface_frames)
+    return matrices
+
+
+def bind_offsets(bindings, surface_points, rest_matrices):
+    """
+    Set the offsets giving back the rest matrices on the rest surfaces.
+
+    :param bindings: Bindings, their offsets are overwritten
+    :param surface_points: one (V, 3) array of rest points per surface of the
+        bindings, in the order of bindings.surfaces
+    :param rest_matrices: (N, 16) or (N, 4, 4) rest world matrices
+    :return: the bindings
+    """
+    # rest * inverse(frame on the rest surface), so evaluate gives the rest matrices back
+    rest_matrices = np.asarray(rest_matrices, dtype=np.float64).reshape(-1, 4, 4)
+    for surface, points in enumerate(surface_points):
+        mask, rest_frames = _surface_frames(bindings, surface, np.asarray(points)[None])
+        bindings.offsets[mask] = np.matmul(rest_matrices[mask], np.linalg.inv(rest_frames[0]))
+    return bindings
+
+
+def save_bindings(bindings, path):
+    """
+    Write bindings to a compressed .npz, weights and offsets in float32.
+
+    :param bindings: Bindings
+    :param path: path of the .npz file
+    """
+    np.savez_compressed(path,
+                        surfaces=np.array(bindings.surfaces, dtype=str),
+                        vertex_counts=bindings.vertex_counts.astype(np.int64),
+                        surface_index=bindings.surface_index.astype(np.int32),
+                        vertices=bindings.vertices.astype(np.int32),
+                        point_weights=bindings.point_weights.astype(np.float32),
+                        tangent_weights=bindings.tangent_weights.astype(np.float32),
+                        edge_weights=bindings.edge_weights.astype(np.float32),
+                        offsets=bindings.offsets.astype(np.float32))
+
+
+def load_bindings(path):
+    """Read bindings written by save_bindings, needs NumPy only"""
+    with np.load(path) as data:
+        return Bindings(surfaces=data["surfaces"].tolist(),
+                        **dict((field, data[field]) for field in Bindings._fields if field != "surfaces"))
@@ -0,0 +1,110 @@
+"""Primary and secondary attachment points, on plain NumPy arrays
+
+With thousands of guide locators only a few primary points are attached to
+the surface. They are picked by farthest point sampling so they spread evenly
+over the locators. Every other locator is a secondary point: a weighted sum of
+the world matrices of its nearest primaries, with inverse distance weights
+solved once at build time, so the runtime cost follows the number of
+primaries instead of the number of locators.
+"""
+
+import numpy as np
+
+
+# primaries blended into every secondary point
+NEIGHBORS = 4
+
+# exponent of the inverse distance weights
+POWER = 2.0
+
+# rows of the secondary x primary distance matrix computed at once
+CHUNK_SIZE = 4096
+
+
+def farthest_point_sampling(points, count):
+    """
+    Indices of points spread as evenly as possible.
+
+    The first point is the farthest from the centroid, every next one the
+    farthest from the points already picked.
+
+    :param points: (N, 3) array
+    :param count: number of points to pick, clamped to N
+    :return: (count,) array of indices into points, in picking order
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    count = min(int(count), len(points))
+    picked = np.zeros(count, dtype=np.int64)
+    if not count:
+        return picked
+
+    picked[0] = np.argmax(((points - points.mean(axis=0)) ** 2).sum(axis=1))
+    nearest_d2 = ((points - points[picked[0]]) ** 2).sum(axis=1)
+    for i in range(1, count):
+        picked[i] = np.argmax(nearest_d2)
+        np.minimum(nearest_d2, ((points - points[picked[i]]) ** 2).sum(axis=1), out=nearest_d2)
+    return picked
+
+
+def interpolation_weights(points, primary_points, neighbors=NEIGHBORS, power=POWER):
+    """
+    Nearest primaries of every point and their inverse distance weights.
+
+    A point lying on a primary only takes that primary.
+
+    :param points: (N, 3) array
+    :param primary_points: (K, 3) array
+    :param neighbors: number of primaries per point, clamped to K
+    :param power: exponent of the inverse distance
+    :return: ((N, neighbors) primary indices, (N, neighbors) weights summing to 1)
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    primary_points = np.asarray(primary_points, dtype=np.float64).reshape(-1, 3)
+    neighbors = min(int(neighbors), len(primary_points))
+
+    indices = np.zeros((len(points), neighbors), dtype=np.int64)
+    distances = np.zeros((len(points), neighbors))
+    for start in range(0, len(points), CHUNK_SIZE):
+        chunk = points[start:start + CHUNK_SIZE]
+        d2 = ((chunk[:, None, :] - primary_points[None, :, :]) ** 2).sum(axis=2)
+        nearest = np.argpartition(d2, neighbors - 1, axis=1)[:, :neighbors] \
+            if neighbors < len(primary_points) else np.tile(np.arange(neighbors), (len(chunk), 1))
+        indices[start:start + len(chunk)] = nearest
+        distances[start:start + len(chunk)] = np.sqrt(np.take_along_axis(d2, nearest, axis=1))
+
+    with np.errstate(divide="ignore"):
+        weights = 1.0 / distances ** power
+    on_primary = ~np.isfinite(weights).all(axis=1)
+    weights[on_primary] = distances[on_primary] == 0.0
+    weights /= weights.sum(axis=1, keepdims=True)
+    return indices, weights
+
+
+def blend_matrices(matrices, indices, weights):
+    """
+    Weighted sums of matrices, like a wtAddMatrix node.
+
+    :param matrices: (K, 4, 4) array
+    :param indices: (N, M) indices into matrices
+    :param weights: (N, M) weights
+    :return: (N, 4, 4) array
+    """
+    matrices = np.asarray(matrices, dtype=np.float64).reshape(-1, 4, 4)
+    return np.einsum("nm,nmij->nij", weights, matrices[indices])
+
+
+def secondary_offsets(blended, positions):
+    """
+    Offsets bringing blended matrices to the secondary points.
+
+    The secondary matrix keeps the orientation of its blended matrix and
+    moves it to the guide position, the offset is that matrix in the space of
+    the blended one, so offset * blended (Maya row vectors) gives it back.
+
+    :param blended: (N, 4, 4) blended rest matrices, see blend_matrices
+    :param positions: (N, 3) world positions of the secondary points
+    :return: (N, 4, 4) array
+    """
+    rest = np.array(blended, dtype=np.float64)
+    rest[:, 3, :3] = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    return np.matmul(rest, np.linalg.inv(blended))
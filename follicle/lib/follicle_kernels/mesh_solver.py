@@ -0,0 +1,327 @@
+"""Closest point on mesh solver working on plain NumPy arrays
+
+Nothing in this module talks to Maya. The mesh is given as vertex positions,
+triangles and a UV set, the query as an (N, 3) array of points. A bounding
+volume hierarchy is built once per mesh and every query walks it for all the
+points together.
+"""
+
+import collections
+
+import numpy as np
+
+
+ClosestPoints = collections.namedtuple(
+    "ClosestPoints", ["triangle", "barycentric", "uv", "point", "distance"])
+
+
+class BVH(object):
+    """Bounding volume hierarchy over a set of axis aligned boxes
+
+    Nodes are stored as flat arrays. An internal node has two children in
+    ``left``/``right``, a leaf has ``left == -1`` and owns
+    ``order[start:start + count]``.
+    """
+
+    def __init__(self, box_min, box_max, leaf_size=8):
+        """
+        :param box_min: (M, 3) array, lower corner of every item
+        :param box_max: (M, 3) array, upper corner of every item
+        :param leaf_size: maximum number of items per leaf
+        """
+        box_min = np.asarray(box_min, dtype=np.float64)
+        box_max = np.asarray(box_max, dtype=np.float64)
+        item_count = len(box_min)
+        if not item_count:
+            raise ValueError("Can not build a BVH without any item")
+
+        centers = (box_min + box_max) * 0.5
+        order = np.arange(item_count)
+
+        max_nodes = 2 * int(np.ceil(item_count / float(max(leaf_size, 1)))) + 1
+        node_min = np.empty((max_nodes, 3))
+        node_max = np.empty((max_nodes, 3))
+        left = np.full(max_nodes, -1, dtype=np.int64)
+        right = np.full(max_nodes, -1, dtype=np.int64)
+        start = np.zeros(max_nodes, dtype=np.int64)
+        count = np.zeros(max_nodes, dtype=np.int64)
+
+        node_count = 1
+        stack = [(0, 0, item_count)]
+        while stack:
+            node_id, first, last = stack.pop()
+            items = order[first:last]
+            node_min[node_id] = box_min[items].min(axis=0)
+            node_max[node_id] = box_max[items].max(axis=0)
+            start[node_id] = first
+            count[node_id] = last - first
+            if last - first <= leaf_size:
+                continue
+
+            # Median split along the longest axis of the item centers
+            item_centers = centers[items]
+            axis = int(np.argmax(item_centers.max(axis=0) - item_centers.min(axis=0)))
+            half = (last - first) // 2
+            split = np.argpartition(item_centers[:, axis], half)
+            order[first:last] = items[split]
+
+            if node_count + 2 > max_nodes:
+                grow = max_nodes
+                node_min = np.concatenate([node_min, np.empty((grow, 3))])
+                node_max = np.concatenate([node_max, np.empty((grow, 3))])
+                left = np.concatenate([left, np.full(grow, -1, dtype=np.int64)])
+                right = np.concatenate([right, np.full(grow, -1, dtype=np.int64)])
+                start = np.concatenate([start, np.zeros(grow, dtype=np.int64)])
+                count = np.concatenate([count, np.zeros(grow, dtype=np.int64)])
+                max_nodes += grow
+
+            left[node_id] = node_count
+            right[node_id] = node_count + 1
+            stack.append((node_count, first, first + half))
+            stack.append((node_count + 1, first + half, last))
+            node_count += 2
+
+        self.node_min = node_min[:node_count]
+        self.node_max = node_max[:node_count]
+        self.left = left[:node_count]
+        self.right = right[:node_count]
+        self.start = start[:node_count]
+        self.count = count[:node_count]
+        self.order = order
+
+    def box_distance2(self, points, nodes):
+        """Squared distance from every point to the box of the matching node"""
+        delta = np.maximum(self.node_min[nodes] - points, 0.0)
+        delta = np.maximum(delta, points - self.node_max[nodes])
+        return np.einsum("ij,ij->i", delta, delta)
+
+    def descend(self, points):
+        """Greedy walk to the leaf whose box is the closest at every level
+
+        :param points: (N, 3) array
+        :return: (N,) array of leaf node indices
+        """
+        nodes = np.zeros(len(points), dtype=np.int64)
+        active = np.flatnonzero(self.left[nodes] >= 0)
+        while len(active):
+            point_sub = points[active]
+            left_nodes = self.left[nodes[active]]
+            right_nodes = self.right[nodes[active]]
+            go_left = self.box_distance2(point_sub, left_nodes) <= self.box_distance2(point_sub, right_nodes)
+            nodes[active] = np.where(go_left, left_nodes, right_nodes)
+            active = active[self.left[nodes[active]] >= 0]
+        return nodes
+
+    def leaf_items(self, pair_points, pair_nodes):
+        """Expand (point, leaf) pairs into (point, item) pairs"""
+        counts = self.count[pair_nodes]
+        total = int(counts.sum())
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        items = self.order[np.repeat(self.start[pair_nodes], counts) + offsets]
+        return np.repeat(pair_points, counts), items
+
+
+def closest_point_on_triangles(points, tri_a, tri_b, tri_c):
+    """
+    Closest point on each triangle for each point, vectorised.
+
+    Follows the Voronoi region tests from Ericson, Real-Time Collision Detection.
+
+    :param points: (M, 3) array
+    :param tri_a: (M, 3) array, first corner of the matching triangle
+    :param tri_b: (M, 3) array
+    :param tri_c: (M, 3) array
+    :return (closest, barycentric): (M, 3) closest points and (M, 3) weights
+        for the three corners
+    """
+    ab = tri_b - tri_a
+    ac = tri_c - tri_a
+    ap = points - tri_a
+    bp = points - tri_b
+    cp = points - tri_c
+
+    d1 = np.einsum("ij,ij->i", ab, ap)
+    d2 = np.einsum("ij,ij->i", ac, ap)
+    d3 = np.einsum("ij,ij->i", ab, bp)
+    d4 = np.einsum("ij,ij->i", ac, bp)
+    d5 = np.einsum("ij,ij->i", ab, cp)
+    d6 = np.einsum("ij,ij->i", ac, cp)
+
+    va = d3 * d6 - d5 * d4
+    vb = d5 * d2 - d1 * d6
+    vc = d1 * d4 - d3 * d2
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Inside the face
+        denom = va + vb + vc
+        v = np.where(denom != 0.0, vb / denom, 0.0)
+        w = np.where(denom != 0.0, vc / denom, 0.0)
+        bary = np.stack([1.0 - v - w, v, w], axis=1)
+
+        # The tests are applied from the last region to the first one, so the
+        # first matching region wins like in the scalar version
+        edge_bc = (va <= 0.0) & (d4 - d3 >= 0.0) & (d5 - d6 >= 0.0)
+        t = (d4 - d3) / ((d4 - d3) + (d5 - d6))
+        bary[edge_bc] = np.stack([np.zeros_like(t), 1.0 - t, t], axis=1)[edge_bc]
+
+        edge_ac = (vb <= 0.0) & (d2 >= 0.0) & (d6 <= 0.0)
+        t = d2 / (d2 - d6)
+        bary[edge_ac] = np.stack([1.0 - t, np.zeros_like(t), t], axis=1)[edge_ac]
+
+        bary[(d6 >= 0.0) & (d5 <= d6)] = (0.0, 0.0, 1.0)
+
+        edge_ab = (vc <= 0.0) & (d1 >= 0.0) & (d3 <= 0.0)
+        t = d1 / (d1 - d3)
+        bary[edge_ab] = np.stack([1.0 - t, t, np.zeros_like(t)], axis=1)[edge_ab]
+
+        bary[(d3 >= 0.0) & (d4 <= d3)] = (0.0, 1.0, 0.0)
+        bary[(d1 <= 0.0) & (d2 <= 0.0)] = (1.0, 0.0, 0.0)
+
+    # Degenerated triangles fall back to their first corner
+    bary[~np.isfinite(bary).all(axis=1)] = (1.0, 0.0, 0.0)
+
+    closest = bary[:, :1] * tri_a + bary[:, 1:2] * tri_b + bary[:, 2:] * tri_c
+    return closest, bary
+
+
+class MeshSolver(object):
+    """Closest point, barycentric and UV queries against one triangle mesh"""
+
+    def __init__(self, vertices, triangles, uvs, uv_triangles=None, leaf_size=8):
+        """
+        :param vertices: (V, 3) array of vertex positions
+        :param triangles: (T, 3) array of vertex indices
+        :param uvs: (U, 2) array of UV coordinates
+        :param uv_triangles: (T, 3) array of indices into uvs for every
+            triangle corner. When None the UVs are indexed like the vertices.
+        :param leaf_size: maximum number of triangles per BVH leaf
+        """
+        self.vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+        self.triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+        self.uvs = np.asarray(uvs, dtype=np.float64).reshape(-1, 2)
+        if uv_triangles is None:
+            self.uv_triangles = self.triangles
+        else:
+            self.uv_triangles = np.asarray(uv_triangles, dtype=np.int64).reshape(-1, 3)
+
+        corners = self.vertices[self.triangles]
+        self.bvh = BVH(corners.min(axis=1), corners.max(axis=1), leaf_size=leaf_size)
+
+    def _triangle_candidates(self, pair_points, pair_tris, points):
+        closest, bary = closest_point_on_triangles(
+            points[pair_points],
+            self.vertices[self.triangles[pair_tris, 0]],
+            self.vertices[self.triangles[pair_tris, 1]],
+            self.vertices[self.triangles[pair_tris, 2]])
+        delta = closest - points[pair_points]
+        return np.einsum("ij,ij->i", delta, delta), closest, bary
+
+    def _closest_chunk(self, points):
+        point_count = len(points)
+        best_d2 = np.full(point_count, np.inf)
+        best_tri = np.zeros(point_count, dtype=np.int64)
+        best_point = np.zeros((point_count, 3))
+        best_bary = np.zeros((point_count, 3))
+
+        def update(pair_points, pair_tris):
+            if not len(pair_points):
+                return
+            d2, closest, bary = self._triangle_candidates(pair_points, pair_tris, points)
+            # Keep the nearest candidate of every point
+            sort = np.lexsort((d2, pair_points))
+            first = np.ones(len(sort), dtype=bool)
+            first[1:] = pair_points[sort][1:] != pair_points[sort][:-1]
+            pick = sort[first]
+            owner = pair_points[pick]
+            better = d2[pick] < best_d2[owner]
+            pick, owner = pick[better], owner[better]
+            best_d2[owner] = d2[pick]
+            best_tri[owner] = pair_tris[pick]
+            best_point[owner] = closest[pick]
+            best_bary[owner] = bary[pick]
+
+        # A greedy descent gives a tight upper bound to prune the full walk
+        bvh = self.bvh
+        update(*bvh.leaf_items(np.arange(point_count), bvh.descend(points)))
+
+        pair_points = np.arange(point_count)
+        pair_nodes = np.zeros(point_count, dtype=np.int64)
+        while len(pair_points):
+            keep = bvh.box_distance2(points[pair_points], pair_nodes) <= best_d2[pair_points]
+            pair_points, pair_nodes = pair_points[keep], pair_nodes[keep]
+
+            is_leaf = bvh.left[pair_nodes] < 0
+            update(*bvh.leaf_items(pair_points[is_leaf], pair_nodes[is_leaf]))
+
+            inner_points = pair_points[~is_leaf]
+            inner_nodes = pair_nodes[~is_leaf]
+            pair_points = np.concatenate([inner_points, inner_points])
+            pair_nodes = np.concatenate([bvh.left[inner_nodes], bvh.right[inner_nodes]])
+
+        return best_tri, best_bary, best_point, np.sqrt(best_d2)
+
+    def closest(self, points, chunk_size=4096):
+        """
+        Closest point on the mesh for every query point.
+
+        :param points: (N, 3) array of query positions
+        :param chunk_size: number of points walked through the BVH together
+        :return: ClosestPoints with the (N,) triangle indices, (N, 3)
+            barycentric weights, (N, 2) interpolated UVs, (N, 3) closest
+            positions and (N,) distances
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        triangle = np.zeros(len(points), dtype=np.int64)
+        barycentric = np.zeros((len(points), 3))
+        point = np.zeros((len(points), 3))
+        distance = np.zeros(len(points))
+        for first in range(0, len(points), chunk_size):
+            chunk = slice(first, first + chunk_size)
+            triangle[chunk], barycentric[chunk], point[chunk], distance[chunk] = \
+                self._closest_chunk(points[chunk])
+
+        corner_uvs = self.uvs[self.uv_triangles[triangle]]
+        uv = np.einsum("ij,ijk->ik", barycentric, corner_uvs)
+        return ClosestPoints(triangle, barycentric, uv, point, distance)
+
+    def tangent_weights(self, triangle):
+        """
+        Corner weights giving the U tangent of triangles from their corners.
+
+        The U tangent dP/du of a triangle is a fixed combination of its two
+        edges, so weighting the corner positions by these values gives a vector
+        along U even once the mesh is deformed. Triangles without usable UVs
+        fall back to their first edge.
+
+        :param triangle: (M,) array of triangle indices
+        :return: (M, 3) array of weights, one per corner, up to a positive scale
+        """
+        corner_uvs = self.uvs[self.uv_triangles[np.asarray(triangle, dtype=np.int64)]]
+        du1, dv1 = (corner_uvs[:, 1] - corner_uvs[:, 0]).T
+        du2, dv2 = (corner_uvs[:, 2] - corner_uvs[:, 0]).T
+        det = du1 * dv2 - du2 * dv1
+
+        # dP/du = (dv2 * e1 - dv1 * e2) / det, with e1 = b - a and e2 = c - a
+        valid = np.abs(det) > 1e-12
+        safe_det = np.where(valid, det, 1.0)
+        edge_weights = np.stack([dv2 / safe_det, -dv1 / safe_det], axis=1)
+        edge_weights[~valid] = (1.0, 0.0)
+        edge_weights /= np.abs(edge_weights).max(axis=1, keepdims=True)
+        return np.column_stack([-edge_weights.sum(axis=1), edge_weights])
+
+
+def solve_uvs(vertices, triangles, uvs, points, uv_triangles=None):
+    """
+    Interpolated UVs of the closest point on a mesh, for every query point.
+
+    Convenience wrapper building a throwaway MeshSolver. Keep the solver
+    around instead when the same mesh is queried more than once.
+
+    :param vertices: (V, 3) array of vertex positions
+    :param triangles: (T, 3) array of vertex indices
+    :param uvs: (U, 2) array of UV coordinates
+    :param points: (N, 3) array of query positions
+    :param uv_triangles: (T, 3) array of indices into uvs, see MeshSolver
+    :return: (N, 2) array of UVs
+    """
+    return MeshSolver(vertices, triangles, uvs, uv_triangles).closest(points).uv
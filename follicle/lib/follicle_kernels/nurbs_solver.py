@@ -0,0 +1,307 @@
+"""Closest point on NURBS surface solver working on plain NumPy arrays
+
+The surface is given as a grid of control points, two knot vectors and two
+degrees. Query points are projected all together: every point is seeded from
+the nearest samples of a coarse parameter grid, then refined with Newton
+iterations run on the whole batch at once.
+"""
+
+import collections
+
+import numpy as np
+
+
+SurfaceParameters = collections.namedtuple(
+    "SurfaceParameters", ["u", "v", "uv", "point", "distance"])
+
+
+def maya_knots(knots):
+    """
+    Complete a Maya knot vector with its two implicit end knots.
+
+    Maya stores numCVs + degree - 1 knots, the usual definition needs two more
+    at both ends that do not change the curve.
+
+    :param knots: knot values as returned by MFnNurbsSurface.knotsInU/V
+    :return: (numCVs + degree + 1,) array
+    """
+    knots = np.asarray(knots, dtype=np.float64)
+    return np.concatenate([knots[:1], knots, knots[-1:]])
+
+
+def find_spans(knots, degree, cv_count, params):
+    """Index of the knot span holding each parameter"""
+    spans = np.searchsorted(knots, params, side="right") - 1
+    return np.clip(spans, degree, cv_count - 1)
+
+
+def basis_derivatives(knots, degree, spans, params, order):
+    """
+    Non zero B-spline basis functions and their derivatives, vectorised.
+
+    Piegl and Tiller, The NURBS Book, algorithm A2.3, run for many parameters
+    at once.
+
+    :param knots: full knot vector
+    :param degree: degree of the basis
+    :param spans: (N,) span indices, see find_spans
+    :param params: (N,) parameter values
+    :param order: highest derivative to compute
+    :return: (order + 1, degree + 1, N) array, ders[k, j] is the k-th
+        derivative of the basis function spans - degree + j
+    """
+    p = degree
+    count = len(params)
+    ndu = np.zeros((p + 1, p + 1, count))
+    ndu[0, 0] = 1.0
+    left = np.zeros((p + 1, count))
+    right = np.zeros((p + 1, count))
+    for j in range(1, p + 1):
+        left[j] = params - knots[spans + 1 - j]
+        right[j] = knots[spans + j] - params
+        saved = np.zeros(count)
+        for r in range(j):
+            ndu[j, r] = right[r + 1] + left[j - r]
+            temp = ndu[r, j - 1] / ndu[j, r]
+            ndu[r, j] = saved + right[r + 1] * temp
+            saved = left[j - r] * temp
+        ndu[j, j] = saved
+
+    ders = np.zeros((order + 1, p + 1, count))
+    ders[0] = ndu[:, p]
+    top = min(order, p)
+    a = np.zeros((2, p + 1, count))
+    for r in range(p + 1):
+        s1, s2 = 0, 1
+        a[0, 0] = 1.0
+        for k in range(1, top + 1):
+            d = np.zeros(count)
+            rk = r - k
+            pk = p - k
+            if r >= k:
+                a[s2, 0] = a[s1, 0] / ndu[pk + 1, rk]
+                d = a[s2, 0] * ndu[rk, pk]
+            j1 = 1 if rk >= -1 else -rk
+            j2 = k - 1 if r - 1 <= pk else p - r
+            for j in range(j1, j2 + 1):
+                a[s2, j] = (a[s1, j] - a[s1, j - 1]) / ndu[pk + 1, rk + j]
+                d = d + a[s2, j] * ndu[rk + j, pk]
+            if r <= pk:
+                a[s2, k] = -a[s1, k - 1] / ndu[pk + 1, r]
+                d = d + a[s2, k] * ndu[r, pk]
+            ders[k, r] = d
+            s1, s2 = s2, s1
+
+    factor = p
+    for k in range(1, top + 1):
+        ders[k] *= factor
+        factor *= p - k
+    return ders
+
+
+class NurbsSolver(object):
+    """Evaluation and closest point queries on one NURBS surface"""
+
+    def __init__(self, cvs, knots_u, knots_v, degree_u, degree_v,
+                 weights=None, periodic_u=False, periodic_v=False):
+        """
+        :param cvs: (numCVsInU, numCVsInV, 3) array of control points
+        :param knots_u: full knot vector in U, see maya_knots
+        :param knots_v: full knot vector in V
+        :param degree_u: degree in U
+        :param degree_v: degree in V
+        :param weights: (numCVsInU, numCVsInV) array of weights, None for a
+            non rational surface
+        :param periodic_u: wrap the parameters around in U instead of
+            clamping them
+        :param periodic_v: wrap the parameters around in V
+        """
+        cvs = np.asarray(cvs, dtype=np.float64)
+        if weights is None:
+            weights = np.ones(cvs.shape[:2])
+        weights = np.asarray(weights, dtype=np.float64)
+        self.rational = not np.allclose(weights, 1.0)
+        # Homogeneous control points
+        self.cvs = np.concatenate([cvs * weights[..., None], weights[..., None]], axis=-1)
+
+        self.knots_u = np.asarray(knots_u, dtype=np.float64)
+        self.knots_v = np.asarray(knots_v, dtype=np.float64)
+        self.degree_u = int(degree_u)
+        self.degree_v = int(degree_v)
+        self.periodic_u = periodic_u
+        self.periodic_v = periodic_v
+
+        count_u, count_v = self.cvs.shape[:2]
+        if len(self.knots_u) != count_u + self.degree_u + 1 or len(self.knots_v) != count_v + self.degree_v + 1:
+            raise ValueError("Knot vectors do not match the control points and degrees")
+        self.domain_u = (self.knots_u[self.degree_u], self.knots_u[count_u])
+        self.domain_v = (self.knots_v[self.degree_v], self.knots_v[count_v])
+
+    def _limit(self, params, domain, periodic):
+        if periodic:
+            return domain[0] + np.mod(params - domain[0], domain[1] - domain[0])
+        return np.clip(params, domain[0], domain[1])
+
+    def _held(self, params, steps, domain, periodic):
+        if periodic:
+            return np.zeros(len(params), dtype=bool)
+        return ((params <= domain[0]) & (steps < 0.0)) | ((params >= domain[1]) & (steps > 0.0))
+
+    def normalize(self, u, v):
+        """Map parameters to the 0-1 range a follicle expects, as an (N, 2) array"""
+        return np.stack([(u - self.domain_u[0]) / (self.domain_u[1] - self.domain_u[0]),
+                         (v - self.domain_v[0]) / (self.domain_v[1] - self.domain_v[0])], axis=1)
+
+    def evaluate(self, u, v, order=0):
+        """
+        Surface position and partial derivatives.
+
+        :param u: (N,) array of U parameters
+        :param v: (N,) array of V parameters
+        :param order: highest derivative to compute, 0 to 2
+        :return: (order + 1, order + 1, N, 3) array, result[k, l] is the
+            derivative k times along U and l times along V
+        """
+        u = np.atleast_1d(np.asarray(u, dtype=np.float64))
+        v = np.atleast_1d(np.asarray(v, dtype=np.float64))
+        count_u, count_v = self.cvs.shape[:2]
+        p, q = self.degree_u, self.degree_v
+
+        span_u = find_spans(self.knots_u, p, count_u, u)
+        span_v = find_spans(self.knots_v, q, count_v, v)
+        basis_u = basis_derivatives(self.knots_u, p, span_u, u, order)
+        basis_v = basis_derivatives(self.knots_v, q, span_v, v, order)
+
+        rows = (span_u - p)[:, None] + np.arange(p + 1)
+        cols = (span_v - q)[:, None] + np.arange(q + 1)
+        local_cvs = self.cvs[rows[:, :, None], cols[:, None, :]]
+        homogeneous = np.einsum("kin,ljn,nijc->klnc", basis_u, basis_v, local_cvs)
+
+        if not self.rational:
+            return homogeneous[..., :3]
+
+        # Quotient rule on the homogeneous derivatives
+        point = homogeneous[..., :3]
+        weight = homogeneous[..., 3:]
+        result = np.zeros_like(point)
+        binomial = [[1], [1, 1], [1, 2, 1]]
+        for k in range(order + 1):
+            for l in range(order + 1 - k):
+                value = point[k, l].copy()
+                for j in range(1, l + 1):
+                    value -= binomial[l][j] * weight[0, j] * result[k, l - j]
+                for i in range(1, k + 1):
+                    value -= binomial[k][i] * weight[i, 0] * result[k - i, l]
+                    for j in range(1, l + 1):
+                        value -= binomial[k][i] * binomial[l][j] * weight[i, j] * result[k - i, l - j]
+                result[k, l] = value / weight[0, 0]
+        return result
+
+    def _seed(self, points, density, count):
+        # Sample every knot span of the surface a few times
+        def samples(knots, domain):
+            distinct = np.unique(knots[(knots >= domain[0]) & (knots <= domain[1])])
+            steps = np.linspace(0.0, 1.0, density, endpoint=False)
+            values = (distinct[:-1, None] + np.diff(distinct)[:, None] * steps).ravel()
+            return np.append(values, domain[1])
+
+        grid_u, grid_v = np.meshgrid(samples(self.knots_u, self.domain_u),
+                                     samples(self.knots_v, self.domain_v), indexing="ij")
+        grid_u = grid_u.ravel()
+        grid_v = grid_v.ravel()
+        grid_points = self.evaluate(grid_u, grid_v)[0, 0]
+        count = min(count, len(grid_points))
+
+        nearest = np.empty((len(points), count), dtype=np.int64)
+        chunk_size = max(1, 2 ** 22 // len(grid_points))
+        for first in range(0, len(points), chunk_size):
+            chunk = points[first:first + chunk_size]
+            delta = chunk[:, None, :] - grid_points[None, :, :]
+            distance2 = np.einsum("ijk,ijk->ij", delta, delta)
+            if count < len(grid_points):
+                nearest[first:first + chunk_size] = np.argpartition(distance2, count - 1, axis=1)[:, :count]
+            else:
+                nearest[first:first + chunk_size] = np.argsort(distance2, axis=1)
+        return grid_u[nearest], grid_v[nearest]
+
+    def closest(self, points, seed_density=4, seed_count=3, iterations=16, tolerance=1e-9):
+        """
+        Closest point on the surface for every query point.
+
+        :param points: (N, 3) array of query positions
+        :param seed_density: grid samples per knot span used for the seeds
+        :param seed_count: number of seeds refined per point, the closest
+            result is kept. More seeds make it less likely to stop in a
+            local minimum on wavy surfaces.
+        :param iterations: maximum number of Newton iterations
+        :param tolerance: stop refining a point once its step moves the
+            surface point by less than this distance
+        :return: SurfaceParameters with the raw (N,) U and V parameters, the
+            (N, 2) normalized UVs, the (N, 3) closest positions and the (N,)
+            distances
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        point_count = len(points)
+        u, v = self._seed(points, seed_density, seed_count)
+        seed_count = u.shape[1]
+        u, v = u.ravel(), v.ravel()
+        seed_u, seed_v = u.copy(), v.copy()
+        # Every seed is refined as its own query
+        points = np.repeat(points, seed_count, axis=0)
+
+        active = np.arange(len(points))
+        for _ in range(iterations):
+            if not len(active):
+                break
+            ders = self.evaluate(u[active], v[active], order=2)
+            delta = ders[0, 0] - points[active]
+            s_u, s_v = ders[1, 0], ders[0, 1]
+            grad_u = np.einsum("ij,ij->i", s_u, delta)
+            grad_v = np.einsum("ij,ij->i", s_v, delta)
+            h_uu = np.einsum("ij,ij->i", s_u, s_u)
+            h_uv = np.einsum("ij,ij->i", s_u, s_v)
+            h_vv = np.einsum("ij,ij->i", s_v, s_v)
+
+            # Full Newton where the Hessian is positive definite, Gauss-Newton otherwise
+            n_uu = h_uu + np.einsum("ij,ij->i", ders[2, 0], delta)
+            n_uv = h_uv + np.einsum("ij,ij->i", ders[1, 1], delta)
+            n_vv = h_vv + np.einsum("ij,ij->i", ders[0, 2], delta)
+            newton = (n_uu > 0.0) & (n_uu * n_vv - n_uv * n_uv > 0.0)
+            h_uu = np.where(newton, n_uu, h_uu)
+            h_uv = np.where(newton, n_uv, h_uv)
+            h_vv = np.where(newton, n_vv, h_vv)
+
+            det = h_uu * h_vv - h_uv * h_uv
+            with np.errstate(divide="ignore", invalid="ignore"):
+                step_u = np.where(det > 0.0, -(h_vv * grad_u - h_uv * grad_v) / det, 0.0)
+                step_v = np.where(det > 0.0, -(h_uu * grad_v - h_uv * grad_u) / det, 0.0)
+
+                # Points held on a border only slide along it
+                held_u = self._held(u[active], step_u, self.domain_u, self.periodic_u)
+                held_v = self._held(v[active], step_v, self.domain_v, self.periodic_v)
+                step_u = np.where(held_u, 0.0, np.where(held_v, -grad_u / h_uu, step_u))
+                step_v = np.where(held_v, 0.0, np.where(held_u, -grad_v / h_vv, step_v))
+                step_u = np.where(np.isfinite(step_u), step_u, 0.0)
+                step_v = np.where(np.isfinite(step_v), step_v, 0.0)
+
+            new_u = self._limit(u[active] + step_u, self.domain_u, self.periodic_u)
+            new_v = self._limit(v[active] + step_v, self.domain_v, self.periodic_v)
+            moved = (np.linalg.norm(s_u, axis=1) * np.abs(new_u - u[active])
+                     + np.linalg.norm(s_v, axis=1) * np.abs(new_v - v[active]))
+            u[active] = new_u
+            v[active] = new_v
+            active = active[moved > tolerance]
+
+        point = self.evaluate(u, v)[0, 0]
+        distance = np.linalg.norm(point - points, axis=1)
+
+        # Never end up further than the seed
+        seed_point = self.evaluate(seed_u, seed_v)[0, 0]
+        seed_distance = np.linalg.norm(seed_point - points, axis=1)
+        worse = seed_distance < distance
+        u[worse], v[worse] = seed_u[worse], seed_v[worse]
+        point[worse], distance[worse] = seed_point[worse], seed_distance[worse]
+
+        pick = np.arange(point_count) * seed_count + distance.reshape(point_count, seed_count).argmin(axis=1)
+        u, v, point, distance = u[pick], v[pick], point[pick], distance[pick]
+        return SurfaceParameters(u, v, self.normalize(u, v), point, distance)
@@ -0,0 +1,90 @@
+"""Nearest surface of a batch of points, on plain NumPy arrays
+
+A BVH is built over the bounding boxes of the candidate surfaces. Every point
+walks it and an exact distance is only computed against the surfaces whose
+box is closer than the nearest surface found so far, so most of the surfaces
+are never queried for most of the points.
+"""
+
+import numpy as np
+
+from .mesh_solver import BVH
+
+
+class SurfaceIndex(object):
+    """Branch and bound search of the nearest surface among many"""
+
+    def __init__(self, box_min, box_max, get_solver, leaf_size=1):
+        """
+        :param box_min: (S, 3) array, lower corner of the box of every surface.
+            The boxes must hold their whole surface for the search to be exact.
+        :param box_max: (S, 3) array, upper corner of the box of every surface
+        :param get_solver: callable returning the solver of a surface index,
+            an object with a closest(points) method returning a result with a
+            distance array, like MeshSolver or NurbsSolver. It is only called
+            for the surfaces a point has to be measured against.
+        :param leaf_size: maximum number of surfaces per BVH leaf
+        """
+        self.box_min = np.asarray(box_min, dtype=np.float64).reshape(-1, 3)
+        self.box_max = np.asarray(box_max, dtype=np.float64).reshape(-1, 3)
+        self.bvh = BVH(self.box_min, self.box_max, leaf_size=leaf_size)
+        self._get_solver = get_solver
+        self._solvers = {}
+
+    @property
+    def count(self):
+        return len(self.box_min)
+
+    def solver(self, surface):
+        """Solver of a surface, built on first use"""
+        if surface not in self._solvers:
+            self._solvers[surface] = self._get_solver(surface)
+        return self._solvers[surface]
+
+    def nearest(self, points):
+        """
+        Nearest surface of every point.
+
+        :param points: (N, 3) array of query positions
+        :return: ((N,) surface indices, (N,) distances)
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        point_count = len(points)
+        best_d2 = np.full(point_count, np.inf)
+        best_surface = np.zeros(point_count, dtype=np.int64)
+        measured = np.zeros((point_count, self.count), dtype=bool)
+
+        def update(pair_points, pair_surfaces):
+            keep = ~measured[pair_points, pair_surfaces]
+            pair_points, pair_surfaces = pair_points[keep], pair_surfaces[keep]
+            measured[pair_points, pair_surfaces] = True
+            # one batched query per surface
+            for surface in np.unique(pair_surfaces):
+                owners = pair_points[pair_surfaces == surface]
+                d2 = self.solver(int(surface)).closest(points[owners]).distance ** 2
+                better = d2 < best_d2[owners]
+                best_d2[owners[better]] = d2[better]
+                best_surface[owners[better]] = surface
+
+        if not point_count:
+            return best_surface, np.sqrt(best_d2)
+
+        # the surfaces of the leaf holding each point give a first upper bound
+        bvh = self.bvh
+        update(*bvh.leaf_items(np.arange(point_count), bvh.descend(points)))
+
+        pair_points = np.arange(point_count)
+        pair_nodes = np.zeros(point_count, dtype=np.int64)
+        while len(pair_points):
+            keep = bvh.box_distance2(points[pair_points], pair_nodes) <= best_d2[pair_points]
+            pair_points, pair_nodes = pair_points[keep], pair_nodes[keep]
+
+            is_leaf = bvh.left[pair_nodes] < 0
+            update(*bvh.leaf_items(pair_points[is_leaf], pair_nodes[is_leaf]))
+
+            inner_points = pair_points[~is_leaf]
+            inner_nodes = pair_nodes[~is_leaf]
+            pair_points = np.concatenate([inner_points, inner_points])
+            pair_nodes = np.concatenate([bvh.left[inner_nodes], bvh.right[inner_nodes]])
+
+        return best_surface, np.sqrt(best_d2)
@@ -0,0 +1,202 @@
+"""Mirror maps of surfaces symmetric across the world YZ plane, on plain NumPy arrays
+
+On a mesh every vertex is paired with the vertex at its mirrored position,
+which pairs every face with its mirror face. A U/V is located in the UV layout
+and its barycentric weights are applied to the UVs the mirrored corners have
+in the mirror face. On a NURBS surface the mirror flips the normalized U
+and/or V parameters, found by comparing the mirrored CV grid with its flipped
+copies.
+"""
+
+import numpy as np
+
+from . import mesh_solver
+
+
+# distance under which two points are mirrors, relative to the size of the surface
+MIRROR_TOLERANCE = 1e-5
+
+
+def mirror_points(points):
+    """Mirror world space points across the YZ plane"""
+    points = np.array(points, dtype=np.float64).reshape(-1, 3)
+    points[:, 0] *= -1.0
+    return points
+
+
+def mirror_tolerance(points):
+    """Distance under which two points are mirrors, MIRROR_TOLERANCE scaled by the size of the points"""
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    if not len(points):
+        return MIRROR_TOLERANCE
+    return MIRROR_TOLERANCE * max(1.0, float(np.linalg.norm(points.max(axis=0) - points.min(axis=0))))
+
+
+def positions_mirrored(positions, mirror_positions):
+    """True when every position is the mirror of the mirror position of the same index"""
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    mirror_positions = np.asarray(mirror_positions, dtype=np.float64).reshape(-1, 3)
+    if positions.shape != mirror_positions.shape:
+        return False
+    return bool(np.abs(mirror_points(mirror_positions) - positions).max(initial=0.0) <= mirror_tolerance(positions))
+
+
+def vertex_mirror_map(points):
+    """
+    Mirror vertex of every vertex.
+
+    The points are snapped to a grid of the mirror tolerance, twice with a
+    half cell shift so that two points on both sides of a cell border are
+    still paired.
+
+    :param points: (V, 3) world space points
+    :return: (V,) array of vertex ids, None when a vertex has no mirror
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    tolerance = mirror_tolerance(points)
+    mirrored = mirror_points(points)
+    mirror_map = np.full(len(points), -1, dtype=np.int64)
+    for shift in (0.0, 0.5):
+        cells = np.floor(points / tolerance + shift).astype(np.int64)
+        mirrored_cells = np.floor(mirrored / tolerance + shift).astype(np.int64)
+        low = np.minimum(cells.min(axis=0), mirrored_cells.min(axis=0))
+        size = np.maximum(cells.max(axis=0), mirrored_cells.max(axis=0)) - low + 1
+
+        def cell_keys(grid):
+            grid = grid - low
+            return (grid[:, 0] * size[1] + grid[:, 1]) * size[2] + grid[:, 2]
+
+        keys = cell_keys(cells)
+        order = np.argsort(keys, kind="stable")
+        found = np.minimum(np.searchsorted(keys[order], cell_keys(mirrored_cells)), len(keys) - 1)
+        candidates = order[found]
+        close = np.abs(points[candidates] - mirrored).max(axis=1) <= tolerance
+        missing = mirror_map < 0
+        mirror_map[missing & close] = candidates[missing & close]
+    if (mirror_map < 0).any():
+        return None
+    return mirror_map
+
+
+class MeshMirror(object):
+    """U/V mirror of a symmetric mesh"""
+
+    def __init__(self, uvs, uv_triangles, mirror_uv_triangles):
+        """
+        :param uvs: (U, 2) array of UV coordinates
+        :param uv_triangles: (T, 3) UV ids of the triangle corners
+        :param mirror_uv_triangles: (T, 3) UV ids of the mirrors of the
+            triangle corners, in their mirror face
+        """
+        self.uvs = np.asarray(uvs, dtype=np.float64).reshape(-1, 2)
+        self.mirror_uv_triangles = np.asarray(mirror_uv_triangles, dtype=np.int64).reshape(-1, 3)
+        # the UV layout as a flat mesh, to locate a U/V in its triangle
+        uv_points = np.column_stack([self.uvs, np.zeros(len(self.uvs))])
+        self.uv_solver = mesh_solver.MeshSolver(uv_points, uv_triangles, self.uvs)
+
+    def mirror(self, uv_list):
+        """
+        U/V of the mirrors of points given by their U/V.
+
+        :param uv_list: list of (u, v) tuples
+        :return: (N, 2) array
+        """
+        uv = np.asarray(uv_list, dtype=np.float64).reshape(-1, 2)
+        located = self.uv_solver.closest(np.column_stack([uv, np.zeros(len(uv))]))
+        return np.einsum("ij,ijk->ik", located.barycentric, self.uvs[self.mirror_uv_triangles[located.triangle]])
+
+
+class NurbsMirror(object):
+    """U/V mirror of a symmetric NURBS surface, a flip of the normalized parameters"""
+
+    def __init__(self, flip_u, flip_v):
+        self.flip_u = flip_u
+        self.flip_v = flip_v
+
+    def mirror(self, uv_list):
+        """
+        :param uv_list: list of (u, v) tuples, normalized to the 0-1 range
+        :return: (N, 2) array
+        """
+        uv = np.array(uv_list, dtype=np.float64).reshape(-1, 2)
+        if self.flip_u:
+            uv[:, 0] = 1.0 - uv[:, 0]
+        if self.flip_v:
+            uv[:, 1] = 1.0 - uv[:, 1]
+        return uv
+
+
+def mesh_uv_mirror(points, face_counts, face_vertices, uv_counts, uv_ids, uvs,
+                   triangle_offsets, triangles, uv_triangles):
+    """
+    Mirror map of a mesh.
+
+    :param points: (V, 3) world space points
+    :param face_counts: (F,) array, number of vertices of every face
+    :param face_vertices: vertex ids of all the faces, one after the other
+    :param uv_counts: (F,) array, number of UVs of every face
+    :param uv_ids: UV ids of all the face corners, in the order of face_vertices
+    :param uvs: (U, 2) array of UV coordinates
+    :param triangle_offsets: (F,) index of the first triangle of every face
+    :param triangles: (T, 3) vertex ids of the triangle corners
+    :param uv_triangles: (T, 3) UV ids of the triangle corners
+    :return: MeshMirror, None when the mesh is not symmetric or some faces
+        have no UVs
+    """
+    vertex_map = vertex_mirror_map(points)
+    if vertex_map is None or not np.array_equal(uv_counts, face_counts):
+        return None
+    face_counts = np.asarray(face_counts, dtype=np.int64)
+    face_vertices = np.asarray(face_vertices, dtype=np.int64)
+    triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+
+    # faces are paired through their sorted vertex ids, whatever their triangulation
+    face_lists = np.split(face_vertices, np.cumsum(face_counts)[:-1])
+    face_ids = dict((tuple(sorted(vertices.tolist())), face) for face, vertices in enumerate(face_lists))
+    mirror_faces = np.array([face_ids.get(tuple(sorted(vertex_map[vertices].tolist())), -1)
+                             for vertices in face_lists], dtype=np.int64)
+    if (mirror_faces < 0).any():
+        return None
+
+    # UV id of every (face, vertex) corner, found by binary search on face * V + vertex
+    vertex_count = len(vertex_map)
+    corner_faces = np.repeat(np.arange(len(face_lists)), face_counts)
+    corner_keys = corner_faces * vertex_count + face_vertices
+    order = np.argsort(corner_keys, kind="stable")
+
+    triangle_counts = np.diff(np.append(triangle_offsets, len(triangles)))
+    triangle_faces = np.repeat(np.arange(len(triangle_offsets)), triangle_counts)
+    mirror_keys = mirror_faces[triangle_faces][:, None] * vertex_count + vertex_map[triangles]
+    found = np.minimum(np.searchsorted(corner_keys[order], mirror_keys), len(order) - 1)
+    if not np.array_equal(corner_keys[order][found], mirror_keys):
+        return None
+    return MeshMirror(uvs, uv_triangles, np.asarray(uv_ids, dtype=np.int64)[order][found])
+
+
+def nurbs_uv_mirror(cvs, weights, knots_u, knots_v):
+    """
+    Mirror map of a NURBS surface.
+
+    :param cvs: (U, V, 3) world space CV grid
+    :param weights: (U, V) CV weights
+    :param knots_u: knots along U
+    :param knots_v: knots along V
+    :return: NurbsMirror, None when no flip of the CV grid matches its mirror
+    """
+    cvs = np.asarray(cvs, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    mirrored = mirror_points(cvs).reshape(cvs.shape)
+    tolerance = mirror_tolerance(cvs)
+
+    def symmetric_knots(knots):
+        knots = np.asarray(knots, dtype=np.float64)
+        return np.allclose(knots[::-1], knots[0] + knots[-1] - knots, atol=tolerance)
+
+    for flip_u, flip_v in ((True, False), (False, True), (True, True)):
+        grid = (slice(None, None, -1) if flip_u else slice(None), slice(None, None, -1) if flip_v else slice(None))
+        if (np.abs(cvs[grid] - mirrored).max() <= tolerance
+                and np.allclose(weights[grid], weights)
+                and (not flip_u or symmetric_knots(knots_u))
+                and (not flip_v or symmetric_knots(knots_v))):
+            return NurbsMirror(flip_u, flip_v)
+    return None
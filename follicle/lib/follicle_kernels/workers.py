@@ -0,0 +1,38 @@
+"""Entry points of the process pool solving follicle U/V parameters
+
+The workers only receive arrays: the surface as the keyword arguments of its
+solver and the positions by chunks. Every worker builds its solver once, in
+init_worker, and imports nothing outside of follicle_kernels.
+"""
+
+from . import mesh_solver, nurbs_solver
+
+
+# surface kind -> solver class, built from the keyword arguments of its constructor
+SOLVERS = {"mesh": mesh_solver.MeshSolver, "nurbs": nurbs_solver.NurbsSolver}
+
+_solver = []
+
+
+def build_solver(kind, arrays):
+    """
+    NumPy solver of a surface.
+
+    :param kind: "mesh" or "nurbs"
+    :param arrays: dict of the arguments of MeshSolver or NurbsSolver
+    :return: mesh_solver.MeshSolver or nurbs_solver.NurbsSolver
+    """
+    return SOLVERS[kind](**arrays)
+
+
+def init_worker(kind, arrays):
+    """Build the solver of the worker, see build_solver"""
+    _solver[:] = [build_solver(kind, arrays)]
+
+
+def closest_uvs(chunk):
+    """
+    :param chunk: (N, 3) array of world space positions
+    :return: (N, 2) array of the U/V parameters of their closest points
+    """
+    return _solver[0].closest(chunk).uv
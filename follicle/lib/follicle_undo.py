@@ -0,0 +1,99 @@
+"""Undoable API modifiers
+
+Maya only records the edits of an MDGModifier in the undo queue when a
+command runs it, a modifier run from a script is permanent. This file is also
+a Maya plugin registering the follicleModifier command, which runs the
+modifier handed to execute and undoes or redoes it with the rest of the undo
+chunk, like any command:
+
+    import follicle_undo
+
+    follicle_undo.execute(modifier)
+
+The plugin is loaded on the first call. When it can not be loaded, the
+modifier is run directly and a warning says the build can not be undone.
+"""
+
+import os
+
+import maya.api.OpenMaya as om
+import maya.cmds as cmds
+
+
+COMMAND_NAME = "follicleModifier"
+
+# modifier of the next follicleModifier call, see execute
+_pending = []
+
+# True once the plugin is loaded, False when it failed to load
+_loaded = []
+
+
+def maya_useNewAPI():
+    """The plugin uses the API 2.0"""
+
+
+class ModifierCommand(om.MPxCommand):
+    """Run the pending modifier, undo and redo it"""
+
+    def __init__(self):
+        om.MPxCommand.__init__(self)
+        self._modifier = None
+
+    @staticmethod
+    def creator():
+        return ModifierCommand()
+
+    def doIt(self, args):
+        # Maya may load this file under another module name, the queue lives in the imported module
+        import follicle_undo
+        self._modifier = follicle_undo._pending.pop()
+        self._modifier.doIt()
+
+    def redoIt(self):
+        self._modifier.doIt()
+
+    def undoIt(self):
+        self._modifier.undoIt()
+
+    def isUndoable(self):
+        return True
+
+
+def initializePlugin(plugin):
+    om.MFnPlugin(plugin).registerCommand(COMMAND_NAME, ModifierCommand.creator)
+
+
+def uninitializePlugin(plugin):
+    om.MFnPlugin(plugin).deregisterCommand(COMMAND_NAME)
+
+
+def _load_plugin():
+    if not _loaded:
+        path = os.path.splitext(os.path.abspath(__file__))[0] + ".py"
+        try:
+            if not cmds.pluginInfo(path, query=True, loaded=True):
+                cmds.loadPlugin(path, quiet=True)
+            _loaded.append(True)
+        except RuntimeError as error:
+            cmds.warning("The follicle builds can not be undone, {} did not load: {}".format(path, error))
+            _loaded.append(False)
+    return _loaded[0]
+
+
+def execute(modifier):
+    """
+    Run a modifier as one undoable command.
+
+    :param modifier: MDGModifier or MDagModifier with queued edits
+    """
+    if not _load_plugin():
+        modifier.doIt()
+        return
+    _pending.append(modifier)
+    try:
+        getattr(cmds, COMMAND_NAME)()
+    finally:
+        # the command took it, unless it failed before
+        if _pending and _pending[-1] is modifier:
+            _pending.pop()
@@ -0,0 +1,65 @@
+"""Mirror maps of symmetric surfaces
+
+The guides of a left/right pair of components are mirrored across the world
+YZ plane. On a surface symmetric across the same plane, the U/V parameters
+solved on one side give the ones of the other side through a mirror map,
+computed once per surface and kept for the session. The maps themselves are
+computed on NumPy arrays, see follicle_kernels.symmetry.
+"""
+
+import maya.cmds as cmds
+
+from follicle_kernels import symmetry
+
+from . import surface_data
+
+
+# sides of the mGear components that mirror each other
+MIRROR_SIDES = {"L": "R", "R": "L"}
+
+# surface hash -> MeshMirror, NurbsMirror or None for a surface that is not symmetric
+_surface_mirrors = {}
+
+
+def mesh_mirror(surface_shape):
+    """
+    Mirror map of a mesh, see follicle_kernels.symmetry.mesh_uv_mirror.
+
+    :param surface_shape: mesh shape node name
+    :return: MeshMirror, None when the mesh is not symmetric or some faces
+        have no UVs
+    """
+    data = surface_data.mesh_data(surface_shape)
+    triangle_offsets, triangles, uv_triangles = surface_data.mesh_triangles(surface_shape, data)
+    return symmetry.mesh_uv_mirror(surface_data.world_points(data.points, data.matrix),
+                                   data.face_counts, data.face_vertices, data.uv_counts, data.uv_ids, data.uvs,
+                                   triangle_offsets, triangles, uv_triangles)
+
+
+def nurbs_mirror(surface_shape):
+    """
+    Mirror map of a NURBS surface, see follicle_kernels.symmetry.nurbs_uv_mirror.
+
+    :param surface_shape: nurbsSurface shape node name
+    :return: NurbsMirror, None when no flip of the CV grid matches its mirror
+    """
+    data = surface_data.nurbs_data(surface_shape)
+    return symmetry.nurbs_uv_mirror(surface_data.world_points(data.cvs, data.matrix), data.weights,
+                                    data.knots_u, data.knots_v)
+
+
+def surface_mirror(surface_shape):
+    """
+    Mirror map of a surface, computed once per surface content.
+
+    :param surface_shape: nurbsSurface or mesh shape node name
+    :return: MeshMirror or NurbsMirror, None when the surface is not
+        symmetric across the YZ plane
+    """
+    digest = surface_data.surface_hash(surface_shape)
+    if digest not in _surface_mirrors:
+        if cmds.nodeType(surface_shape) == "nurbsSurface":
+            _surface_mirrors[digest] = nurbs_mirror(surface_shape)
+        else:
+            _surface_mirrors[digest] = mesh_mirror(surface_shape)
+    return _surface_mirrors[digest]
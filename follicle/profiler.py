@@ -0,0 +1,179 @@
+"""Per phase build profiling for the follicle component
+
+Every phase records its elapsed time, the number of times it ran, the
+commands executed and the nodes created while it was open. The phases are
+also tagged in the Maya profiler under a "follicle" category.
+
+Profiling is off unless FOLLICLE_BUILD_REPORT_DIR is set or set_enabled(True)
+was called, the phases then only run their code, without callbacks:
+
+    from follicle import profiler
+
+    profiler.set_enabled(True)
+"""
+
+import collections
+import contextlib
+import functools
+import json
+import os
+import time
+
+import maya.api.OpenMaya as om
+
+
+# directory the JSON build reports are written to, no report file when unset
+REPORT_DIR_ENV = "FOLLICLE_BUILD_REPORT_DIR"
+
+_enabled = [False]
+_category = []
+
+
+def set_enabled(state):
+    """Turn the profiling of the builds on or off, see enabled"""
+    _enabled[0] = bool(state)
+
+
+def enabled():
+    """True when the builds are profiled, after set_enabled(True) or with FOLLICLE_BUILD_REPORT_DIR set"""
+    return _enabled[0] or bool(os.environ.get(REPORT_DIR_ENV))
+
+
+def profiled(phase_name):
+    """Decorator timing a component method in a phase of its build profiler
+
+    :param phase_name: name of the phase in the report
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(component, *args, **kwargs):
+            if not enabled():
+                return method(component, *args, **kwargs)
+            with component.build_profiler.phase(phase_name):
+                return method(component, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _profiler_category():
+    if not _category:
+        _category.append(om.MProfiler.addCategory("follicle", "follicle component build"))
+    return _category[0]
+
+
+class BuildProfiler(object):
+    """Timings and counters of the build phases of one component"""
+
+    def __init__(self, name):
+        """
+        :param name: full name of the component, used for the report file
+        """
+        self.name = name
+        self.phases = collections.OrderedDict()
+        self.failures = []
+        self.records = collections.OrderedDict()
+        self._stack = []
+        self._callback_ids = []
+
+    def _stats(self, phase_name):
+        if phase_name not in self.phases:
+            self.phases[phase_name] = {"calls": 0, "elapsed": 0.0, "commands": 0, "nodes": 0}
+        return self.phases[phase_name]
+
+    def _count(self, counter):
+        # nested phases are inclusive, a recursive phase only counts once
+        for phase_name in set(self._stack):
+            self.phases[phase_name][counter] += 1
+
+    def _command_executed(self, message, client_data):
+        self._count("commands")
+
+    def add_failure(self, message):
+        """
+        Record a problem that stopped part of the build without raising.
+
+        :param message: description of the failure, also shown as a warning
+        """
+        self.failures.append(message)
+
+    def add_record(self, section, entry):
+        """
+        Record what a pass of the build did, like the drivers it converted.
+
+        :param section: name of the list in the records of the report
+        :param entry: JSON serializable description
+        """
+        self.records.setdefault(section, []).append(entry)
+
+    def _node_added(self, node_object, client_data):
+        self._count("nodes")
+
+    def _start(self):
+        self._callback_ids = [om.MDGMessage.addNodeAddedCallback(self._node_added, "dependNode"),
+                              om.MCommandMessage.addCommandCallback(self._command_executed)]
+
+    def _stop(self):
+        for callback_id in self._callback_ids:
+            om.MMessage.removeCallback(callback_id)
+        self._callback_ids = []
+
+    @contextlib.contextmanager
+    def phase(self, phase_name):
+        """
+        Time a phase of the build.
+
+        When the outermost phase closes the report is written, see write.
+        Nothing is recorded when profiling is off, see enabled.
+
+        :param phase_name: name of the phase in the report
+        """
+        if not self._stack:
+            if not enabled():
+                yield None
+                return
+            self._start()
+        stats = self._stats(phase_name)
+        stats["calls"] += 1
+        self._stack.append(phase_name)
+        event_id = om.MProfiler.eventBegin(_profiler_category(), om.MProfiler.kColorE_L1, phase_name)
+        start = time.perf_counter()
+        try:
+            yield stats
+        finally:
+            stats["elapsed"] += time.perf_counter() - start
+            om.MProfiler.eventEnd(event_id)
+            self._stack.pop()
+            if not self._stack:
+                self._stop()
+                self.write()
+
+    def report(self):
+        """
+        Machine readable summary of the build.
+
+        :return: dict with the component name, the list of failures, the
+            records of the build passes and a dict of phases, each one holding
+            calls, elapsed (seconds), commands and nodes
+        """
+        return {"component": self.name,
+                "failures": list(self.failures),
+                "records": dict((section, list(entries)) for section, entries in self.records.items()),
+                "phases": dict((phase_name, dict(stats)) for phase_name, stats in self.phases.items())}
+
+    def write(self, directory=None):
+        """
+        Write the report as JSON.
+
+        :param directory: output directory, defaults to the
+            FOLLICLE_BUILD_REPORT_DIR environment variable
+        :return: path of the written file, None when there is no directory
+        """
+        directory = directory or os.environ.get(REPORT_DIR_ENV)
+        if not directory:
+            return None
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        path = os.path.join(directory, "{}_build.json".format(self.name))
+        with open(path, "w") as report_file:
+            json.dump(self.report(), report_file, indent=2, sort_keys=True)
+        return path
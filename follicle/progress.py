@@ -0,0 +1,122 @@
+"""Progress, cancellation and rollback of long component builds
+
+The component builds its drivers and controls in chunks of the buildChunkSize
+setting and counts them on a BuildProgress. In an interactive session it
+drives the main progress bar of Maya, which Esc cancels. Without UI it calls
+the function given to set_callback, which cancels by returning True:
+
+    from follicle import progress
+
+    def report(done, total, status):
+        print("{}/{} {}".format(done, total, status))
+
+    progress.set_callback(report)
+
+Every node created while a BuildProgress is open is tracked. A build that is
+cancelled or fails on any other error deletes them before the exception
+leaves the component, so no half built rig stays in the scene.
+"""
+
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+
+import follicle_undo
+
+
+_callback = [None]
+
+
+class BuildCancelled(Exception):
+    """Raised when a build is cancelled, once the nodes it created are deleted"""
+
+
+def set_callback(callback):
+    """
+    Report the progress of the builds to a function when Maya has no UI.
+
+    :param callback: function(done, total, status) returning True to cancel
+        the build, None to stop reporting
+    """
+    _callback[0] = callback
+
+
+def chunks(count, chunk_size):
+    """Consecutive ranges of at most chunk_size indices covering range(count)"""
+    chunk_size = max(1, int(chunk_size))
+    return [range(start, min(start + chunk_size, count)) for start in range(0, count, chunk_size)]
+
+
+class BuildProgress(object):
+    """Progress of one component build, a context manager"""
+
+    def __init__(self, title, total, on_rollback=None):
+        """
+        :param title: shown in the progress bar, like the component name
+        :param total: number of steps of the build
+        :param on_rollback: function called once the created nodes are
+            deleted, to drop them from the lists that still hold them
+        """
+        self.title = title
+        self.total = total
+        self.on_rollback = on_rollback
+        self.done = 0
+        self.active = False
+        self._created = []
+        self._callback_id = None
+        self._progress_bar = None
+
+    def __enter__(self):
+        self._callback_id = om.MDGMessage.addNodeAddedCallback(self._node_added, "dependNode")
+        self.active = True
+        if not cmds.about(batch=True):
+            import maya.mel
+            self._progress_bar = maya.mel.eval("$tmp = $gMainProgressBar")
+            cmds.progressBar(self._progress_bar, edit=True, beginProgress=True, isInterruptable=True,
+                             status=self.title, maxValue=max(self.total, 1))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        om.MMessage.removeCallback(self._callback_id)
+        self._callback_id = None
+        self.active = False
+        if self._progress_bar is not None:
+            cmds.progressBar(self._progress_bar, edit=True, endProgress=True)
+            self._progress_bar = None
+        if exc_type is not None:
+            self.rollback()
+        self._created = []
+        return False
+
+    def _node_added(self, node_object, client_data):
+        self._created.append(om.MObjectHandle(node_object))
+
+    def step(self, count, status):
+        """
+        Count built steps and give the user a chance to cancel.
+
+        :param count: number of steps done since the last call
+        :param status: what was built, like "follicles"
+        :raise BuildCancelled: when the progress bar or the callback cancelled
+        """
+        self.done += count
+        if self._progress_bar is not None:
+            cmds.progressBar(self._progress_bar, edit=True, step=count,
+                             status="{} {} {}/{}".format(self.title, status, self.done, self.total))
+            cancelled = cmds.progressBar(self._progress_bar, query=True, isCancelled=True)
+        elif _callback[0] is not None:
+            cancelled = _callback[0](self.done, self.total, status)
+        else:
+            cancelled = False
+        if cancelled:
+            raise BuildCancelled("{} cancelled after {} of {} steps".format(self.title, self.done, self.total))
+
+    def rollback(self):
+        """Delete the nodes created since the progress was opened, the last ones first"""
+        modifier = om.MDagModifier()
+        for handle in reversed(self._created):
+            if handle.isValid():
+                modifier.deleteNode(handle.object())
+        follicle_undo.execute(modifier)
+        self._created = []
+        if self.on_rollback is not None:
+            self.on_rollback()
@@ -0,0 +1,193 @@
+"""Low resolution driver meshes for the follicles
+
+Instead of the full render mesh, the follicles can ride a proxy that only
+keeps the faces around the guide locators. The proxy is a live copy: a
+deleteComponent node removes the other faces from the outMesh of the source,
+so it deforms with it while every follicle only scans a few hundred polygons.
+
+The saving is on the follicle side only. The deleteComponent node still reads
+and filters the whole source mesh every time it deforms, so the full mesh is
+processed once per evaluation instead of once per follicle, not skipped. With
+few follicles, or a source that is cheap to copy, the proxy can cost more than
+it saves.
+
+Picking the faces needs a closest point solve of every locator, so the face
+list is cached in an .npz next to the scene, keyed by the content hash of the
+source mesh, the locator positions and the radius. It is only computed again
+when one of them changes.
+"""
+
+import hashlib
+import os
+
+import numpy as np
+
+import maya.cmds as cmds
+
+from follicle_kernels import mesh_solver
+
+from . import cache, surface_data
+
+
+PROXY_CACHE_SUFFIX = "_follicle_proxy.npz"
+
+# face lists kept in the proxy cache file, the oldest ones go first
+MAX_PROXIES = 64
+
+_NEIGHBOR_CELLS = np.stack(np.meshgrid([-1, 0, 1], [-1, 0, 1], [-1, 0, 1], indexing="ij"), axis=-1).reshape(-1, 3)
+
+
+def near_faces(points, face_counts, face_vertices, positions, radius):
+    """
+    Faces with a vertex close to one of the positions.
+
+    Space is cut in cubic cells of side radius, a vertex is close when it is in
+    the cell of a position or one of the 26 cells around it.
+
+    :param points: (V, 3) array of vertex positions
+    :param face_counts: (F,) array, number of vertices of every face
+    :param face_vertices: vertex ids of all the faces, one after the other
+    :param positions: (N, 3) array of positions
+    :param radius: side of the cells
+    :return: (F,) boolean array
+    """
+    vertex_cells = np.floor(np.asarray(points, dtype=np.float64) / radius).astype(np.int64)
+    position_cells = np.floor(np.asarray(positions, dtype=np.float64).reshape(-1, 3) / radius).astype(np.int64)
+    neighbor_cells = (position_cells[:, None, :] + _NEIGHBOR_CELLS).reshape(-1, 3)
+
+    # one integer key per cell
+    low = np.minimum(vertex_cells.min(axis=0), neighbor_cells.min(axis=0))
+    size = np.maximum(vertex_cells.max(axis=0), neighbor_cells.max(axis=0)) - low + 1
+
+    def cell_keys(cells):
+        cells = cells - low
+        return (cells[:, 0] * size[1] + cells[:, 1]) * size[2] + cells[:, 2]
+
+    near_vertices = np.isin(cell_keys(vertex_cells), cell_keys(neighbor_cells))
+    face_starts = np.cumsum(face_counts) - face_counts
+    return np.add.reduceat(near_vertices[face_vertices].astype(np.int64), face_starts) > 0
+
+
+def proxy_faces(surface_shape, positions, radius, data=None):
+    """
+    Faces of a mesh kept on its proxy.
+
+    Those are the faces near the positions, see near_faces, and the face
+    holding the closest point of every position, so each follicle still lands
+    on the proxy.
+
+    :param surface_shape: mesh shape node name
+    :param positions: list of world space positions as (x, y, z)
+    :param radius: distance around the positions, in world units
+    :param data: MeshData of the shape, read again when None
+    :return: (K,) sorted array of face ids
+    """
+    data = data or surface_data.mesh_data(surface_shape)
+    triangle_offsets, triangles, uv_triangles = surface_data.mesh_triangles(surface_shape, data)
+    points = surface_data.world_points(data.points, data.matrix)
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+
+    keep = near_faces(points, data.face_counts, data.face_vertices, positions, radius)
+    triangle = mesh_solver.MeshSolver(points, triangles, data.uvs, uv_triangles).closest(positions).triangle
+    keep[np.searchsorted(triangle_offsets, triangle, side="right") - 1] = True
+    return np.flatnonzero(keep)
+
+
+def proxy_key(surface_digest, positions, radius):
+    """Cache key of a proxy, see proxy_faces"""
+    rounded = np.round(np.asarray(positions, dtype=np.float64).reshape(-1, 3), cache.POSITION_DECIMALS) + 0.0
+    digest = hashlib.blake2b(surface_digest, digest_size=cache.KEY_SIZE)
+    digest.update(rounded.tobytes())
+    digest.update(np.float64(radius).tobytes())
+    return digest.hexdigest()
+
+
+def _load(path):
+    if not path or not os.path.isfile(path):
+        return {}
+    try:
+        with np.load(path) as data:
+            return dict((key, data[key]) for key in data.files)
+    except (IOError, OSError, ValueError):
+        return {}
+
+
+def cached_proxy_faces(surface_shape, positions, radius, path=None):
+    """
+    Faces of the proxy of a mesh, from the cache when the mesh and the
+    positions did not change.
+
+    :param surface_shape: mesh shape node name
+    :param positions: list of world space positions as (x, y, z)
+    :param radius: distance around the positions, in world units
+    :param path: cache file, defaults to the proxy cache of the scene, no
+        cache when the scene is not saved
+    :return: (face ids kept on the proxy, number of faces of the mesh)
+    """
+    data = surface_data.mesh_data(surface_shape)
+    path = path or cache.cache_path(PROXY_CACHE_SUFFIX)
+    key = proxy_key(surface_data.surface_hash(surface_shape), positions, radius)
+
+    stored = _load(path)
+    faces = stored.get(key)
+    if faces is not None:
+        return faces, len(data.face_counts)
+
+    faces = proxy_faces(surface_shape, positions, radius, data)
+    if path:
+        # the file keeps its arrays in insertion order, the oldest proxies are dropped first
+        stored[key] = faces
+        kept = list(stored.items())[-MAX_PROXIES:]
+        try:
+            np.savez_compressed(path + ".tmp.npz", **dict(kept))
+            os.replace(path + ".tmp.npz", path)
+        except (IOError, OSError) as error:
+            cmds.warning("Could not write the follicle proxy cache {}: {}".format(path, error))
+    return faces, len(data.face_counts)
+
+
+def face_ranges(face_ids):
+    """
+    Compact component strings of face ids.
+
+    :param face_ids: sorted face ids
+    :return: list of strings like f[0:12] or f[20]
+    """
+    face_ids = np.asarray(face_ids, dtype=np.int64)
+    if not len(face_ids):
+        return []
+    breaks = np.flatnonzero(np.diff(face_ids) != 1) + 1
+    starts = face_ids[np.concatenate([[0], breaks])]
+    ends = face_ids[np.concatenate([breaks - 1, [len(face_ids) - 1]])]
+    return ["f[{}]".format(start) if start == end else "f[{}:{}]".format(start, end)
+            for start, end in zip(starts.tolist(), ends.tolist())]
+
+
+def create_proxy_mesh(surface_shape, faces, face_count, name, parent=None):
+    """
+    Create a live proxy of a mesh keeping only some of its faces.
+
+    :param surface_shape: mesh shape node name
+    :param faces: ids of the faces kept on the proxy
+    :param face_count: number of faces of the source mesh
+    :param name: name of the proxy transform, the shape gets a Shape suffix
+    :param parent: parent of the proxy transform, it does not move the proxy
+    :return: (proxy transform, proxy mesh shape, deleteComponent node) names
+    """
+    deleted = np.setdiff1d(np.arange(face_count), faces)
+    ranges = face_ranges(deleted)
+
+    kwargs = {"parent": parent} if parent else {}
+    proxy = cmds.createNode("transform", name=name, **kwargs)
+    proxy_shape = cmds.createNode("mesh", name=name + "Shape", parent=proxy)
+    delete_faces = cmds.createNode("deleteComponent", name=name + "_deleteComponent")
+    cmds.setAttr(delete_faces + ".deleteComponents", len(ranges), *ranges, type="componentList")
+    cmds.connectAttr(surface_shape + ".outMesh", delete_faces + ".inputGeometry")
+    cmds.connectAttr(delete_faces + ".outputGeometry", proxy_shape + ".inMesh")
+
+    # the proxy points are in the object space of the source, its world matrix
+    # is the one of the source whatever the transform of the parent
+    cmds.setAttr(proxy + ".inheritsTransform", False)
+    cmds.connectAttr(surface_shape + ".worldMatrix[0]", proxy + ".offsetParentMatrix")
+    cmds.setAttr(proxy + ".visibility", False)
+    return proxy, proxy_shape, delete_faces
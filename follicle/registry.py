@@ -0,0 +1,83 @@
+"""Nodes created by a component build, tracked by handle instead of by name
+
+Looking a node up by name makes Maya search the scene, and with several
+follicle components in one rig a short name can match the node of another
+component. The registry keeps an MObjectHandle per node instead, so a lookup
+is a dictionary access that keeps working after a rename or a reparent, and
+tells when the node was deleted. Node names are only read back, through
+build.node_name, when a maya.cmds call needs one.
+"""
+
+import maya.api.OpenMaya as om
+
+from .build import get_object, node_name
+
+
+class NodeRegistry(object):
+    """Nodes of one component, keyed by their role in the build"""
+
+    def __init__(self):
+        self._handles = {}
+
+    def add(self, key, node):
+        """
+        Track a node.
+
+        :param key: hashable role of the node, like "setup" or ("follicle", 3)
+        :param node: MObject or name of the node, the name is resolved once
+        :return: MObject of the node
+        """
+        node_object = node if isinstance(node, om.MObject) else get_object(str(node))
+        self._handles[key] = om.MObjectHandle(node_object)
+        return node_object
+
+    def __contains__(self, key):
+        return key in self._handles and self._handles[key].isValid()
+
+    def get(self, key):
+        """
+        MObject of a tracked node.
+
+        :raise KeyError: when the key was never added or its node was deleted
+        """
+        handle = self._handles[key]
+        if not handle.isValid():
+            raise KeyError("The node of {!r} was deleted".format(key))
+        return handle.object()
+
+    def name(self, key):
+        """Shortest unique name of a tracked node"""
+        return node_name(self.get(key))
+
+    def uuid(self, key):
+        """UUID of a tracked node as a string, it survives saving the scene"""
+        return om.MFnDependencyNode(self.get(key)).uuid().asString()
+
+    def discard(self, key):
+        """Stop tracking a node, if it was tracked"""
+        self._handles.pop(key, None)
+
+    def plugs(self, plug_names):
+        """
+        Plugs of tracked nodes, to hand to a FollicleBuilder.
+
+        Every tracked node is named once, so a node shared by many plugs, like
+        a uvPin, is not looked up again for each of them.
+
+        :param plug_names: list of node.attribute strings
+        :return: list of (MObject, attribute path) tuples, the nodes that are
+            not tracked are looked up by name once
+        """
+        objects = dict((node_name(handle.object()), handle.object())
+                       for handle in self._handles.values() if handle.isValid())
+        plugs = []
+        for plug_name in plug_names:
+            name, attr_path = plug_name.split(".", 1)
+            if name not in objects:
+                objects[name] = get_object(name)
+            plugs.append((objects[name], attr_path))
+        return plugs
+
+    def keys(self):
+        """Keys of the tracked nodes that still exist"""
+        return [key for key in self._handles if key in self]
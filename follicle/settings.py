@@ -0,0 +1,172 @@
+"""Settings page of the follicle guide
+
+Kept apart from guide.py so Qt, the Maya mixins and PyMEL are only imported
+when the settings window is opened, see guide.__getattr__.
+"""
+
+from functools import partial
+import pymel.core as pm
+
+from mgear.shifter.component import guide
+from mgear.core import pyqt
+from mgear.vendor.Qt import QtWidgets, QtCore
+
+from maya.app.general.mayaMixin import MayaQWidgetDockableMixin
+from maya.app.general.mayaMixin import MayaQDockWidget
+
+from . import settingsUI as sui
+from .closest import SURFACE_SEPARATOR
+from .guide import Guide, TYPE
+
+import maya.cmds as cmds
+
+##########################################################
+# Setting Page
+##########################################################
+
+class settingsTab(QtWidgets.QDialog, sui.Ui_Form):
+    """The Component settings UI"""
+
+    def __init__(self, parent=None):
+        super(settingsTab, self).__init__(parent)
+        self.setupUi(self)
+        
+
+class componentSettings(MayaQWidgetDockableMixin, guide.componentMainSettings):
+    """Create the component setting window"""
+
+    def __init__(self, parent=None):
+        self.toolName = TYPE
+        # Delete old instances of the componet settings window.
+        pyqt.deleteInstances(self, MayaQDockWidget)
+
+        super(self.__class__, self).__init__(parent=parent)
+        self.settingsTab = settingsTab()
+
+        self.setup_componentSettingWindow()
+        self.create_componentControls()
+        self.populate_componentControls()
+        self.create_componentLayout()
+        self.create_componentConnections()
+
+    def setup_componentSettingWindow(self):
+        self.mayaMainWindow = pyqt.maya_main_window()
+
+        self.setObjectName(self.toolName)
+        self.setWindowFlags(QtCore.Qt.Window)
+        self.setWindowTitle(TYPE)
+        self.resize(280, 350)
+
+    def create_componentControls(self):
+        return
+
+    def populate_componentControls(self):
+        """Populate Controls
+
+        Populate the controls values from the custom attributes of the
+        component.
+
+        """
+        # populate tab
+        self.tabs.insertTab(1, self.settingsTab, "Component Settings")
+
+        # populate component settings
+        # self.populateCheck(self.settingsTab.useRollCtl_checkBox, "useRollCtl")
+        # self.settingsTab.rollAngle_spinBox.setValue(
+        #     self.root.attr("rollAngle").get())
+
+        # populate connections in main settings
+        for cnx in Guide.connectors:
+            self.mainSettingsTab.connector_comboBox.addItem(cnx)
+
+        cBox = self.mainSettingsTab.connector_comboBox
+        self.connector_items = [cBox.itemText(i) for i in range(cBox.count())]
+        currentConnector = self.root.attr("connector").get()
+        if currentConnector not in self.connector_items:
+            self.mainSettingsTab.connector_comboBox.addItem(currentConnector)
+            self.connector_items.append(currentConnector)
+            pm.displayWarning("The current connector: %s, is not a valid "
+                              "connector for this component. "
+                              "Build will Fail!!")
+        comboIndex = self.connector_items.index(currentConnector)
+        self.mainSettingsTab.connector_comboBox.setCurrentIndex(comboIndex)
+
+        self.settingsTab.surfaceLineEdit.setText(self.root.attr("surfaceName").get())
+        self.settingsTab.attachMode_comboBox.setCurrentIndex(self.root.attr("attachMode").get())
+        self.populateCheck(self.settingsTab.useOffsetParentMatrix_checkBox, "useOffsetParentMatrix")
+        self.populateCheck(self.settingsTab.useUVCache_checkBox, "useUVCache")
+        self.settingsTab.uvSolver_comboBox.setCurrentIndex(self.root.attr("uvSolver").get())
+        self.populateCheck(self.settingsTab.useProxyMesh_checkBox, "useProxyMesh")
+        self.settingsTab.proxyRadius_spinBox.setValue(self.root.attr("proxyRadius").get())
+        self.populateCheck(self.settingsTab.useLOD_checkBox, "useLOD")
+        self.settingsTab.primaryCount_spinBox.setValue(self.root.attr("primaryCount").get())
+        self.populateCheck(self.settingsTab.freezeStaticSurfaces_checkBox, "freezeStaticSurfaces")
+        self.populateCheck(self.settingsTab.useSymmetry_checkBox, "useSymmetry")
+        self.populateCheck(self.settingsTab.instanceControlShapes_checkBox, "instanceControlShapes")
+        self.settingsTab.buildChunkSize_spinBox.setValue(self.root.attr("buildChunkSize").get())
+
+    def create_componentLayout(self):
+
+        self.settings_layout = QtWidgets.QVBoxLayout()
+        self.settings_layout.addWidget(self.tabs)
+        self.settings_layout.addWidget(self.close_button)
+
+        self.setLayout(self.settings_layout)
+
+    def create_componentConnections(self):
+
+        def update_surface_name(surface_name):
+            validation_passed = True
+            # try:
+            #     if cmds.objectType(surface_name) != "mesh" and cmds.objectType(surface_name) != "nurbsSurface":
+            #         validation_passed = False
+            # except RuntimeError:
+            #     validation_passed = False
+            #try asking first born son https://discourse.techart.online/t/amaya-python-selecting-the-transform-of-a-shape/2690
+
+            if validation_passed:
+                self.root.attr("surfaceName").set(surface_name)
+                self.settingsTab.surfaceLineEdit.setText(self.root.attr("surfaceName").get())
+            else:
+                pm.displayWarning("Invalid selection for surface")
+                self.settingsTab.surfaceLineEdit.clear()
+
+        def update_from_button():
+            selected = cmds.ls(selection=True)
+            if not selected:
+                pm.displayWarning("Invalid selection for surface")
+                return
+            # several selected surfaces are stored as a comma separated list
+            update_surface_name(surface_name=(SURFACE_SEPARATOR + " ").join(selected))
+
+        self.settingsTab.surfaceLineEdit.editingFinished.connect(
+            lambda: update_surface_name(self.settingsTab.surfaceLineEdit.text()))
+        self.settingsTab.surfaceLoadButton.clicked.connect(update_from_button)
+        self.settingsTab.attachMode_comboBox.currentIndexChanged.connect(
+            partial(self.updateComboBox, self.settingsTab.attachMode_comboBox, "attachMode"))
+        self.settingsTab.useOffsetParentMatrix_checkBox.stateChanged.connect(
+            partial(self.updateCheck, self.settingsTab.useOffsetParentMatrix_checkBox, "useOffsetParentMatrix"))
+        self.settingsTab.useUVCache_checkBox.stateChanged.connect(
+            partial(self.updateCheck, self.settingsTab.useUVCache_checkBox, "useUVCache"))
+        self.settingsTab.uvSolver_comboBox.currentIndexChanged.connect(
+            partial(self.updateComboBox, self.settingsTab.uvSolver_comboBox, "uvSolver"))
+        self.settingsTab.useProxyMesh_checkBox.stateChanged.connect(
+            partial(self.updateCheck, self.settingsTab.useProxyMesh_checkBox, "useProxyMesh"))
+        self.settingsTab.proxyRadius_spinBox.valueChanged.connect(
+            partial(self.updateSpinBox, self.settingsTab.proxyRadius_spinBox, "proxyRadius"))
+        self.settingsTab.useLOD_checkBox.stateChanged.connect(
+            partial(self.updateCheck, self.settingsTab.useLOD_checkBox, "useLOD"))
+        self.settingsTab.primaryCount_spinBox.valueChanged.connect(
+            partial(self.updateSpinBox, self.settingsTab.primaryCount_spinBox, "primaryCount"))
+        self.settingsTab.freezeStaticSurfaces_checkBox.stateChanged.connect(
+            partial(self.updateCheck, self.settingsTab.freezeStaticSurfaces_checkBox, "freezeStaticSurfaces"))
+        self.settingsTab.useSymmetry_checkBox.stateChanged.connect(
+            partial(self.updateCheck, self.settingsTab.useSymmetry_checkBox, "useSymmetry"))
+        self.settingsTab.instanceControlShapes_checkBox.stateChanged.connect(
+            partial(self.updateCheck, self.settingsTab.instanceControlShapes_checkBox, "instanceControlShapes"))
+        self.settingsTab.buildChunkSize_spinBox.valueChanged.connect(
+            partial(self.updateSpinBox, self.settingsTab.buildChunkSize_spinBox, "buildChunkSize"))
+
+
+    def dockCloseEventTriggered(self):
+        pyqt.deleteInstances(self, MayaQDockWidget)
@@ -39,6 +39,84 @@ class Ui_Form(object):
         self.surfaceLoadButton.setObjectName("surfaceLoadButton")
         self.horizontalLayout_2.addWidget(self.surfaceLoadButton)
         self.gridLayout_2.addLayout(self.horizontalLayout_2, 0, 0, 1, 1)
+        self.horizontalLayout_3 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_3.setObjectName("horizontalLayout_3")
+        self.attachMode_label = QtWidgets.QLabel(self.groupBox)
+        self.attachMode_label.setObjectName("attachMode_label")
+        self.horizontalLayout_3.addWidget(self.attachMode_label)
+        self.attachMode_comboBox = QtWidgets.QComboBox(self.groupBox)
+        self.attachMode_comboBox.setObjectName("attachMode_comboBox")
+        self.attachMode_comboBox.addItem("")
+        self.attachMode_comboBox.addItem("")
+        self.attachMode_comboBox.addItem("")
+        self.horizontalLayout_3.addWidget(self.attachMode_comboBox)
+        self.gridLayout_2.addLayout(self.horizontalLayout_3, 1, 0, 1, 1)
+        self.useOffsetParentMatrix_checkBox = QtWidgets.QCheckBox(self.groupBox)
+        self.useOffsetParentMatrix_checkBox.setObjectName("useOffsetParentMatrix_checkBox")
+        self.gridLayout_2.addWidget(self.useOffsetParentMatrix_checkBox, 2, 0, 1, 1)
+        self.useUVCache_checkBox = QtWidgets.QCheckBox(self.groupBox)
+        self.useUVCache_checkBox.setObjectName("useUVCache_checkBox")
+        self.gridLayout_2.addWidget(self.useUVCache_checkBox, 3, 0, 1, 1)
+        self.horizontalLayout_4 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_4.setObjectName("horizontalLayout_4")
+        self.uvSolver_label = QtWidgets.QLabel(self.groupBox)
+        self.uvSolver_label.setObjectName("uvSolver_label")
+        self.horizontalLayout_4.addWidget(self.uvSolver_label)
+        self.uvSolver_comboBox = QtWidgets.QComboBox(self.groupBox)
+        self.uvSolver_comboBox.setObjectName("uvSolver_comboBox")
+        self.uvSolver_comboBox.addItem("")
+        self.uvSolver_comboBox.addItem("")
+        self.horizontalLayout_4.addWidget(self.uvSolver_comboBox)
+        self.gridLayout_2.addLayout(self.horizontalLayout_4, 4, 0, 1, 1)
+        self.horizontalLayout_5 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_5.setObjectName("horizontalLayout_5")
+        self.useProxyMesh_checkBox = QtWidgets.QCheckBox(self.groupBox)
+        self.useProxyMesh_checkBox.setObjectName("useProxyMesh_checkBox")
+        self.horizontalLayout_5.addWidget(self.useProxyMesh_checkBox)
+        self.proxyRadius_label = QtWidgets.QLabel(self.groupBox)
+        self.proxyRadius_label.setObjectName("proxyRadius_label")
+        self.horizontalLayout_5.addWidget(self.proxyRadius_label)
+        self.proxyRadius_spinBox = QtWidgets.QDoubleSpinBox(self.groupBox)
+        self.proxyRadius_spinBox.setDecimals(3)
+        self.proxyRadius_spinBox.setMinimum(0.001)
+        self.proxyRadius_spinBox.setMaximum(10000.0)
+        self.proxyRadius_spinBox.setObjectName("proxyRadius_spinBox")
+        self.horizontalLayout_5.addWidget(self.proxyRadius_spinBox)
+        self.gridLayout_2.addLayout(self.horizontalLayout_5, 5, 0, 1, 1)
+        self.horizontalLayout_6 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_6.setObjectName("horizontalLayout_6")
+        self.useLOD_checkBox = QtWidgets.QCheckBox(self.groupBox)
+        self.useLOD_checkBox.setObjectName("useLOD_checkBox")
+        self.horizontalLayout_6.addWidget(self.useLOD_checkBox)
+        self.primaryCount_label = QtWidgets.QLabel(self.groupBox)
+        self.primaryCount_label.setObjectName("primaryCount_label")
+        self.horizontalLayout_6.addWidget(self.primaryCount_label)
+        self.primaryCount_spinBox = QtWidgets.QSpinBox(self.groupBox)
+        self.primaryCount_spinBox.setMinimum(1)
+        self.primaryCount_spinBox.setMaximum(100000)
+        self.primaryCount_spinBox.setObjectName("primaryCount_spinBox")
+        self.horizontalLayout_6.addWidget(self.primaryCount_spinBox)
+        self.gridLayout_2.addLayout(self.horizontalLayout_6, 6, 0, 1, 1)
+        self.freezeStaticSurfaces_checkBox = QtWidgets.QCheckBox(self.groupBox)
+        self.freezeStaticSurfaces_checkBox.setObjectName("freezeStaticSurfaces_checkBox")
+        self.gridLayout_2.addWidget(self.freezeStaticSurfaces_checkBox, 7, 0, 1, 1)
+        self.useSymmetry_checkBox = QtWidgets.QCheckBox(self.groupBox)
+        self.useSymmetry_checkBox.setObjectName("useSymmetry_checkBox")
+        self.gridLayout_2.addWidget(self.useSymmetry_checkBox, 8, 0, 1, 1)
+        self.instanceControlShapes_checkBox = QtWidgets.QCheckBox(self.groupBox)
+        self.instanceControlShapes_checkBox.setObjectName("instanceControlShapes_checkBox")
+        self.gridLayout_2.addWidget(self.instanceControlShapes_checkBox, 9, 0, 1, 1)
+        self.horizontalLayout_7 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_7.setObjectName("horizontalLayout_7")
+        self.buildChunkSize_label = QtWidgets.QLabel(self.groupBox)
+        self.buildChunkSize_label.setObjectName("buildChunkSize_label")
+        self.horizontalLayout_7.addWidget(self.buildChunkSize_label)
+        self.buildChunkSize_spinBox = QtWidgets.QSpinBox(self.groupBox)
+        self.buildChunkSize_spinBox.setMinimum(1)
+        self.buildChunkSize_spinBox.setMaximum(100000)
+        self.buildChunkSize_spinBox.setObjectName("buildChunkSize_spinBox")
+        self.horizontalLayout_7.addWidget(self.buildChunkSize_spinBox)
+        self.gridLayout_2.addLayout(self.horizontalLayout_7, 10, 0, 1, 1)
         self.gridLayout.addWidget(self.groupBox, 0, 0, 1, 1)
 
         self.retranslateUi(Form)
@@ -50,4 +128,21 @@ class Ui_Form(object):
         self.groupBox.setTitle(_translate("Form", "Input Surface Name:"))
         self.surface_label.setText(_translate("Form", "Surface:"))
         self.surfaceLoadButton.setText(_translate("Form", "<<"))
+        self.attachMode_label.setText(_translate("Form", "Attach Mode:"))
+        self.attachMode_comboBox.setItemText(0, _translate("Form", "Follicle"))
+        self.attachMode_comboBox.setItemText(1, _translate("Form", "uvPin"))
+        self.attachMode_comboBox.setItemText(2, _translate("Form", "Triangle Rivet"))
+        self.useOffsetParentMatrix_checkBox.setText(_translate("Form", "Drive Controls with offsetParentMatrix"))
+        self.useUVCache_checkBox.setText(_translate("Form", "Cache Surface U/V on Disk"))
+        self.uvSolver_label.setText(_translate("Form", "UV Solver:"))
+        self.uvSolver_comboBox.setItemText(0, _translate("Form", "Serial"))
+        self.uvSolver_comboBox.setItemText(1, _translate("Form", "Processes"))
+        self.useProxyMesh_checkBox.setText(_translate("Form", "Follicles on a Proxy Mesh"))
+        self.proxyRadius_label.setText(_translate("Form", "Radius:"))
+        self.useLOD_checkBox.setText(_translate("Form", "Drive From Primary Points"))
+        self.primaryCount_label.setText(_translate("Form", "Primaries:"))
+        self.freezeStaticSurfaces_checkBox.setText(_translate("Form", "Freeze Follicles on Static Surfaces"))
+        self.useSymmetry_checkBox.setText(_translate("Form", "Mirror U/V From the Other Side"))
+        self.instanceControlShapes_checkBox.setText(_translate("Form", "Instance the Control Shapes"))
+        self.buildChunkSize_label.setText(_translate("Form", "Build Chunk Size:"))
 
@@ -0,0 +1,227 @@
+"""NumPy arrays and content hash of the input surface
+
+The points of a mesh are read straight from the Maya buffer: the API 1.0
+MFnMesh.getRawPoints pointer is wrapped with numpy.frombuffer, so no Python
+object is created per vertex. Such a view is only valid while the mesh is not
+edited or deleted, copy it to keep it longer.
+
+The other arrays (topology, UVs and NURBS CVs) are copied from the API 2.0
+arrays, which expose no buffer. No Python list is built, but NumPy still reads
+them one element at a time through the sequence protocol, so their cost grows
+with the element count like a Python loop, only with a smaller constant.
+
+Points and CVs are in object space, with the world matrix of the shape next
+to them, see world_points.
+
+While a build is open (build.suspended_build) every shape is read and hashed
+once, the following calls return the same arrays, see start_build_cache.
+"""
+
+import collections
+import ctypes
+import functools
+import hashlib
+
+import numpy as np
+
+import maya.api.OpenMaya as om
+
+
+MeshData = collections.namedtuple(
+    "MeshData", ["points", "matrix", "face_counts", "face_vertices", "uvs", "uv_counts", "uv_ids"])
+NurbsData = collections.namedtuple(
+    "NurbsData", ["cvs", "weights", "matrix", "knots_u", "knots_v",
+                  "degree_u", "degree_v", "periodic_u", "periodic_v"])
+
+HASH_SIZE = 16
+
+# (function name, shape) -> result, None outside a build
+_build_cache = [None]
+
+
+def start_build_cache():
+    """Keep the arrays and hashes read from now on until stop_build_cache"""
+    _build_cache[0] = {}
+
+
+def stop_build_cache():
+    """Forget the arrays and hashes read since start_build_cache"""
+    _build_cache[0] = None
+
+
+def _cached(function):
+    @functools.wraps(function)
+    def wrapper(shape, *args, **kwargs):
+        cache = _build_cache[0]
+        if cache is None:
+            return function(shape, *args, **kwargs)
+        key = (function.__name__, shape)
+        if key not in cache:
+            cache[key] = function(shape, *args, **kwargs)
+        return cache[key]
+    return wrapper
+
+
+def get_dag_path(shape):
+    """MDagPath of a shape from its name"""
+    selection = om.MSelectionList()
+    selection.add(shape)
+    return selection.getDagPath(0)
+
+
+def _to_array(values, dtype, width=None):
+    # the API 2.0 arrays are sequences, numpy.array reads every element, points included, in C
+    array = np.array(values, dtype=dtype)
+    return array.reshape(-1) if width is None else array.reshape(-1, width)
+
+
+def _world_matrix(dag_path):
+    return np.array(list(dag_path.inclusiveMatrix()), dtype=np.float64).reshape(4, 4)
+
+
+def raw_mesh_points(shape):
+    """
+    Object space points of a mesh, without a copy when the API allows it.
+
+    :param shape: mesh shape node name
+    :return: (vertex count, 3) float32 array
+    """
+    try:
+        import maya.OpenMaya as om1
+        selection = om1.MSelectionList()
+        selection.add(shape)
+        dag_path = om1.MDagPath()
+        selection.getDagPath(0, dag_path)
+        mesh_fn = om1.MFnMesh(dag_path)
+        count = mesh_fn.numVertices()
+        if not count:
+            return np.zeros((0, 3), dtype=np.float32)
+        # getRawPoints returns a float* to the point buffer of the shape
+        buffer = (ctypes.c_float * (count * 3)).from_address(int(mesh_fn.getRawPoints()))
+        return np.frombuffer(buffer, dtype=np.float32).reshape(count, 3)
+    except (ImportError, AttributeError, TypeError, RuntimeError):
+        points = om.MFnMesh(get_dag_path(shape)).getFloatPoints(om.MSpace.kObject)
+        # the MFloatPoints are (x, y, z, w)
+        return _to_array(points, np.float32, 4)[:, :3]
+
+
+@_cached
+def mesh_data(shape):
+    """
+    Arrays of a mesh shape.
+
+    :param shape: mesh shape node name
+    :return: MeshData, uvs is a (uv count, 2) array of the current UV set and
+        uv_ids the UV of every face vertex, uv_counts the number of them per face
+    """
+    dag_path = get_dag_path(shape)
+    mesh_fn = om.MFnMesh(dag_path)
+    face_counts, face_vertices = mesh_fn.getVertices()
+    u_values, v_values = mesh_fn.getUVs()
+    uv_counts, uv_ids = mesh_fn.getAssignedUVs()
+    return MeshData(points=raw_mesh_points(shape),
+                    matrix=_world_matrix(dag_path),
+                    face_counts=_to_array(face_counts, np.int32),
+                    face_vertices=_to_array(face_vertices, np.int32),
+                    uvs=np.stack([_to_array(u_values, np.float32), _to_array(v_values, np.float32)], axis=-1),
+                    uv_counts=_to_array(uv_counts, np.int32),
+                    uv_ids=_to_array(uv_ids, np.int32))
+
+
+@_cached
+def mesh_triangles(shape, data=None):
+    """
+    Triangles of a mesh, in the Maya triangulation of its faces.
+
+    :param shape: mesh shape node name
+    :param data: MeshData of the shape, read again when None
+    :return: (triangle_offsets, triangles, uv_triangles), the index of the
+        first triangle of every face, the (T, 3) vertex ids and the (T, 3) UV
+        ids of every triangle, 0 on the faces without UVs
+    """
+    data = data or mesh_data(shape)
+    triangle_counts, triangle_vertices = om.MFnMesh(get_dag_path(shape)).getTriangles()
+    triangle_counts = _to_array(triangle_counts, np.int64)
+    triangles = _to_array(triangle_vertices, np.int64, 3)
+    triangle_faces = np.repeat(np.arange(len(triangle_counts)), triangle_counts)
+    triangle_offsets = np.cumsum(triangle_counts) - triangle_counts
+    if not len(triangles) or not len(data.uv_ids):
+        return triangle_offsets, triangles, np.zeros_like(triangles)
+
+    # rank of every triangle corner in the vertex list of its face
+    face_counts = data.face_counts.astype(np.int64)
+    face_vertices = np.full((len(face_counts), face_counts.max()), -1, dtype=np.int64)
+    face_vertices[np.arange(face_vertices.shape[1]) < face_counts[:, None]] = data.face_vertices
+    corner_ranks = np.argmax(face_vertices[triangle_faces][:, None, :] == triangles[:, :, None], axis=2)
+
+    uv_counts = data.uv_counts.astype(np.int64)
+    uv_starts = np.cumsum(uv_counts) - uv_counts
+    uv_indices = np.minimum(uv_starts[triangle_faces][:, None] + corner_ranks, len(data.uv_ids) - 1)
+    uv_triangles = np.where(uv_counts[triangle_faces][:, None] > 0, data.uv_ids[uv_indices], 0)
+    return triangle_offsets, triangles, uv_triangles.astype(np.int64)
+
+
+@_cached
+def nurbs_data(shape):
+    """
+    Arrays of a nurbsSurface shape.
+
+    :param shape: nurbsSurface shape node name
+    :return: NurbsData, cvs is a (CVs in U, CVs in V, 3) array and the knots
+        are the Maya knots, without the two end knots of the usual formulation
+    """
+    dag_path = get_dag_path(shape)
+    surface_fn = om.MFnNurbsSurface(dag_path)
+    cv_shape = (surface_fn.numCVsInU, surface_fn.numCVsInV)
+    homogeneous = _to_array(surface_fn.cvPositions(om.MSpace.kObject), np.float64, 4)
+    return NurbsData(cvs=homogeneous[:, :3].reshape(cv_shape + (3,)),
+                     weights=homogeneous[:, 3].reshape(cv_shape),
+                     matrix=_world_matrix(dag_path),
+                     knots_u=_to_array(surface_fn.knotsInU(), np.float64),
+                     knots_v=_to_array(surface_fn.knotsInV(), np.float64),
+                     degree_u=surface_fn.degreeInU,
+                     degree_v=surface_fn.degreeInV,
+                     periodic_u=surface_fn.formInU == om.MFnNurbsSurface.kPeriodic,
+                     periodic_v=surface_fn.formInV == om.MFnNurbsSurface.kPeriodic)
+
+
+def surface_data(shape):
+    """MeshData or NurbsData of a shape, see mesh_data and nurbs_data"""
+    if get_dag_path(shape).hasFn(om.MFn.kMesh):
+        return mesh_data(shape)
+    return nurbs_data(shape)
+
+
+def world_points(points, matrix):
+    """
+    Transform object space points by a Maya (row vector) matrix.
+
+    :param points: (..., 3) array
+    :param matrix: (4, 4) array
+    :return: (..., 3) float64 array
+    """
+    return np.asarray(points, dtype=np.float64).dot(matrix[:3, :3]) + matrix[3, :3]
+
+
+def content_hash(data):
+    """
+    Stable digest of MeshData or NurbsData.
+
+    The arrays are hashed through their buffers in a fixed dtype and byte
+    order, so the digest is the same across sessions and platforms.
+
+    :return: bytes digest
+    """
+    digest = hashlib.blake2b(type(data).__name__.encode(), digest_size=HASH_SIZE)
+    for value in data:
+        array = np.asarray(value)
+        array = np.ascontiguousarray(array, dtype=array.dtype.newbyteorder("<"))
+        digest.update(array.dtype.str.encode() + np.array(array.shape, dtype="<i8").tobytes())
+        digest.update(memoryview(array.reshape(-1)).cast("B"))
+    return digest.digest()
+
+
+@_cached
+def surface_hash(shape):
+    """Content hash of a mesh or nurbsSurface shape, see content_hash"""
+    return content_hash(surface_data(shape))
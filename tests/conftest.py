@@ -0,0 +1,6 @@
+"""The tests only cover the NumPy kernels, they run without Maya"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "follicle", "lib"))
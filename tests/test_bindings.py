@@ -0,0 +1,111 @@
+"""Follicle bindings evaluated at rest, moved rigidly, and through a .npz"""
+
+import numpy as np
+import pytest
+
+from follicle_kernels import bindings
+
+
+def grid(resolution=4, offset=(0.0, 0.0, 0.0)):
+    """Points and triangles of a grid over the unit square of the XZ plane"""
+    side = resolution + 1
+    x, z = np.meshgrid(np.linspace(0.0, 1.0, side), np.linspace(0.0, 1.0, side))
+    points = np.column_stack([x.ravel(), 0.1 * np.sin(4.0 * x.ravel() + z.ravel()), z.ravel()]) + offset
+    triangles = []
+    for row in range(resolution):
+        for column in range(resolution):
+            a, b = row * side + column, row * side + column + 1
+            c, d = a + side, b + side
+            triangles.extend([(a, c, d), (a, d, b)])
+    return points, np.array(triangles)
+
+
+def random_matrices(count, random_state):
+    """World matrices with a random rotation, uniform scale and translation"""
+    matrices = np.tile(np.eye(4), (count, 1, 1))
+    for matrix in matrices:
+        rotation, _ = np.linalg.qr(random_state.normal(size=(3, 3)))
+        matrix[:3, :3] = rotation * np.sign(np.linalg.det(rotation)) * random_state.uniform(0.5, 2.0)
+        matrix[3, :3] = random_state.uniform(-1.0, 1.0, size=3)
+    return matrices
+
+
+@pytest.fixture
+def bound():
+    """Bindings of 30 drivers on two grids, with their rest points and matrices"""
+    random_state = np.random.RandomState(4)
+    surfaces = [grid(), grid(offset=(2.0, 0.0, 0.0))]
+    count = 30
+    surface_index = random_state.randint(0, 2, size=count)
+    vertices = np.zeros((count, 3), dtype=np.int64)
+    for i, surface in enumerate(surface_index):
+        triangles = surfaces[surface][1]
+        vertices[i] = triangles[random_state.randint(len(triangles))]
+    barycentric = random_state.dirichlet(np.ones(3), size=count)
+    follicle_bindings = bindings.Bindings(
+        surfaces=["grid", "shifted_grid"],
+        vertex_counts=np.array([len(points) for points, _ in surfaces], dtype=np.int64),
+        surface_index=surface_index,
+        vertices=vertices,
+        point_weights=barycentric,
+        # the first edge of the triangle stands for the U tangent
+        tangent_weights=np.tile(bindings.EDGE_WEIGHTS[0], (count, 1)),
+        edge_weights=np.array(bindings.triangle_edge_weights(count)),
+        offsets=np.tile(np.eye(4), (count, 1, 1)))
+    rest_points = [points for points, _ in surfaces]
+    rest_matrices = random_matrices(count, random_state)
+    return bindings.bind_offsets(follicle_bindings, rest_points, rest_matrices), rest_points, rest_matrices
+
+
+def test_rest_pose_gives_the_rest_matrices(bound):
+    follicle_bindings, rest_points, rest_matrices = bound
+    matrices = bindings.evaluate(follicle_bindings, [points[None] for points in rest_points])
+    assert matrices.shape == (1, len(rest_matrices), 4, 4)
+    np.testing.assert_allclose(matrices[0], rest_matrices, atol=1e-9)
+
+
+def test_rigid_motion_moves_the_matrices(bound):
+    follicle_bindings, rest_points, rest_matrices = bound
+    motion = random_matrices(1, np.random.RandomState(8))[0]
+    # rotation and translation only
+    motion[:3, :3] /= np.cbrt(np.linalg.det(motion[:3, :3]))
+    moved = [np.einsum("vi,ij->vj", np.column_stack([points, np.ones(len(points))]), motion)[:, :3]
+             for points in rest_points]
+    frames = [np.stack([points, moved_points]) for points, moved_points in zip(rest_points, moved)]
+    matrices = bindings.evaluate(follicle_bindings, frames)
+    np.testing.assert_allclose(matrices[0], rest_matrices, atol=1e-9)
+    np.testing.assert_allclose(matrices[1], np.matmul(rest_matrices, motion), atol=1e-9)
+
+
+def test_frames_are_orthonormal(bound):
+    follicle_bindings, rest_points, _ = bound
+    points = rest_points[0][follicle_bindings.vertices[:, 0]]
+    frames = bindings.frames(points, np.tile((1.0, 0.0, 0.2), (len(points), 1)),
+                             np.tile((0.0, 0.0, 1.0), (len(points), 1)), np.tile((1.0, 0.0, 0.0), (len(points), 1)))
+    rotation = frames[:, :3, :3]
+    identity = np.tile(np.eye(3), (len(points), 1, 1))
+    np.testing.assert_allclose(np.matmul(rotation, np.swapaxes(rotation, 1, 2)), identity, atol=1e-12)
+    np.testing.assert_allclose(frames[:, 2, :3], np.tile((0.0, 1.0, 0.0), (len(points), 1)), atol=1e-12)
+    np.testing.assert_allclose(frames[:, 3, :3], points)
+
+
+def test_save_load_round_trip(bound, tmp_path):
+    follicle_bindings, rest_points, rest_matrices = bound
+    path = str(tmp_path / "bindings.npz")
+    bindings.save_bindings(follicle_bindings, path)
+    loaded = bindings.load_bindings(path)
+
+    assert loaded.surfaces == follicle_bindings.surfaces
+    for field in bindings.Bindings._fields[1:]:
+        np.testing.assert_allclose(getattr(loaded, field), getattr(follicle_bindings, field), rtol=1e-6, atol=1e-6)
+    # the weights and offsets are stored in float32
+    matrices = bindings.evaluate(loaded, [points[None] for points in rest_points])
+    np.testing.assert_allclose(matrices[0], rest_matrices, atol=1e-4)
+
+
+def test_point_count_must_match(bound):
+    follicle_bindings, rest_points, _ = bound
+    with pytest.raises(ValueError):
+        bindings.evaluate(follicle_bindings, [rest_points[0][None, :-1], rest_points[1][None]])
+    with pytest.raises(ValueError):
+        bindings.evaluate(follicle_bindings, [rest_points[0][None]])
@@ -0,0 +1,70 @@
+"""Farthest point sampling and inverse distance weights of the LOD points"""
+
+import numpy as np
+import pytest
+
+from follicle_kernels import lod
+
+
+@pytest.fixture
+def points():
+    return np.random.RandomState(11).uniform(-1.0, 1.0, size=(500, 3))
+
+
+def test_sampling_picks_the_farthest_point_every_time(points):
+    picked = lod.farthest_point_sampling(points, 20)
+    assert len(set(picked.tolist())) == 20
+
+    centroid_d2 = ((points - points.mean(axis=0)) ** 2).sum(axis=1)
+    assert picked[0] == np.argmax(centroid_d2)
+    for i in range(1, len(picked)):
+        d2 = ((points[:, None] - points[picked[:i]][None]) ** 2).sum(axis=2).min(axis=1)
+        assert d2[picked[i]] == pytest.approx(d2.max())
+
+
+def test_sampling_spreads_the_points(points):
+    # the picked points cover the cloud better than the same count of random ones
+    def coverage(indices):
+        return np.sqrt(((points[:, None] - points[indices][None]) ** 2).sum(axis=2).min(axis=1)).max()
+
+    random_indices = np.random.RandomState(2).choice(len(points), 20, replace=False)
+    assert coverage(lod.farthest_point_sampling(points, 20)) < coverage(random_indices)
+
+
+def test_sampling_count_is_clamped(points):
+    assert sorted(lod.farthest_point_sampling(points[:5], 10).tolist()) == list(range(5))
+    assert len(lod.farthest_point_sampling(points, 0)) == 0
+
+
+def test_weights_sum_to_one(points):
+    primaries = lod.farthest_point_sampling(points, 16)
+    indices, weights = lod.interpolation_weights(points, points[primaries])
+    assert indices.shape == weights.shape == (len(points), lod.NEIGHBORS)
+    np.testing.assert_allclose(weights.sum(axis=1), 1.0)
+    assert (weights >= 0.0).all()
+
+
+def test_weights_take_the_nearest_primaries(points):
+    primary_points = points[lod.farthest_point_sampling(points, 16)]
+    indices, _ = lod.interpolation_weights(points, primary_points)
+    d2 = ((points[:, None] - primary_points[None]) ** 2).sum(axis=2)
+    expected = np.sort(d2, axis=1)[:, :lod.NEIGHBORS]
+    np.testing.assert_allclose(np.sort(np.take_along_axis(d2, indices, axis=1), axis=1), expected)
+
+
+def test_point_on_a_primary_only_takes_that_primary(points):
+    primaries = lod.farthest_point_sampling(points, 16)
+    indices, weights = lod.interpolation_weights(points[primaries], points[primaries])
+    for row in range(len(primaries)):
+        exact = indices[row] == row
+        assert exact.sum() == 1
+        assert weights[row][exact] == 1.0
+        assert (weights[row][~exact] == 0.0).all()
+
+
+def test_blend_reproduces_a_point_on_a_primary(points):
+    primaries = lod.farthest_point_sampling(points, 8)
+    matrices = np.tile(np.eye(4), (8, 1, 1))
+    matrices[:, 3, :3] = points[primaries]
+    indices, weights = lod.interpolation_weights(points[primaries], points[primaries])
+    np.testing.assert_allclose(lod.blend_matrices(matrices, indices, weights), matrices)
@@ -0,0 +1,118 @@
+"""MeshSolver against a brute force closest point over every triangle"""
+
+import numpy as np
+import pytest
+
+from follicle_kernels import mesh_solver
+
+
+def closest_on_segment(point, a, b):
+    ab = b - a
+    t = np.clip(np.dot(point - a, ab) / np.dot(ab, ab), 0.0, 1.0)
+    return a + t * ab
+
+
+def brute_force_closest(point, vertices, triangles):
+    """Closest point and its triangle, projecting on every triangle plane then on its edges"""
+    best = (np.inf, None, None)
+    for triangle, (a, b, c) in enumerate(vertices[triangles]):
+        normal = np.cross(b - a, c - a)
+        projected = point - np.dot(point - a, normal) / np.dot(normal, normal) * normal
+        # barycentric weights of the projection, all positive inside the triangle
+        area = np.dot(normal, normal)
+        weights = [np.dot(np.cross(c - b, projected - b), normal) / area,
+                   np.dot(np.cross(a - c, projected - c), normal) / area,
+                   np.dot(np.cross(b - a, projected - a), normal) / area]
+        if min(weights) >= 0.0:
+            candidates = [projected]
+        else:
+            candidates = [closest_on_segment(point, a, b), closest_on_segment(point, b, c),
+                          closest_on_segment(point, c, a)]
+        for candidate in candidates:
+            distance = np.linalg.norm(point - candidate)
+            if distance < best[0]:
+                best = (distance, candidate, triangle)
+    return best
+
+
+def wavy_grid(resolution=6):
+    """Grid over the unit square bent along Y, its UVs follow X and Z"""
+    side = resolution + 1
+    x, z = np.meshgrid(np.linspace(0.0, 1.0, side), np.linspace(0.0, 1.0, side))
+    vertices = np.column_stack([x.ravel(), 0.2 * np.sin(3.0 * x.ravel()) * np.cos(2.0 * z.ravel()), z.ravel()])
+    triangles = []
+    for row in range(resolution):
+        for column in range(resolution):
+            a, b = row * side + column, row * side + column + 1
+            c, d = a + side, b + side
+            triangles.extend([(a, c, d), (a, d, b)])
+    return vertices, np.array(triangles), vertices[:, [0, 2]]
+
+
+@pytest.fixture
+def query_points():
+    return np.random.RandomState(3).uniform((-0.2, -0.4, -0.2), (1.2, 0.4, 1.2), size=(200, 3))
+
+
+def test_closest_matches_brute_force(query_points):
+    vertices, triangles, uvs = wavy_grid()
+    result = mesh_solver.MeshSolver(vertices, triangles, uvs, leaf_size=2).closest(query_points)
+    for i, point in enumerate(query_points):
+        distance, closest, triangle = brute_force_closest(point, vertices, triangles)
+        assert result.distance[i] == pytest.approx(distance, abs=1e-9)
+        np.testing.assert_allclose(result.point[i], closest, atol=1e-6)
+        # a point on a shared edge can be given to either triangle, both have the same corners there
+        corners = vertices[triangles[result.triangle[i]]]
+        np.testing.assert_allclose(result.barycentric[i].dot(corners), result.point[i], atol=1e-9)
+
+
+def test_barycentric_weights_sum_to_one(query_points):
+    vertices, triangles, uvs = wavy_grid()
+    result = mesh_solver.MeshSolver(vertices, triangles, uvs).closest(query_points)
+    np.testing.assert_allclose(result.barycentric.sum(axis=1), 1.0)
+    assert (result.barycentric >= -1e-12).all()
+
+
+def test_uvs_interpolate_the_closest_triangle(query_points):
+    vertices, triangles, uvs = wavy_grid()
+    result = mesh_solver.MeshSolver(vertices, triangles, uvs).closest(query_points)
+    # the UVs of the grid are its X and Z coordinates
+    np.testing.assert_allclose(result.uv, result.point[:, [0, 2]], atol=1e-9)
+    np.testing.assert_allclose(mesh_solver.solve_uvs(vertices, triangles, uvs, query_points), result.uv)
+
+
+def test_chunks_give_the_same_result(query_points):
+    vertices, triangles, uvs = wavy_grid()
+    solver = mesh_solver.MeshSolver(vertices, triangles, uvs)
+    whole = solver.closest(query_points)
+    chunked = solver.closest(query_points, chunk_size=7)
+    np.testing.assert_allclose(chunked.distance, whole.distance)
+    np.testing.assert_allclose(chunked.uv, whole.uv)
+
+
+def test_separate_uv_triangles():
+    vertices = np.array([(0.0, 0.0, 0.0), (1.0, 0.0, 0.0), (0.0, 0.0, 1.0)])
+    uvs = np.array([(0.0, 0.0), (0.5, 0.5), (1.0, 0.0), (0.0, 1.0)])
+    solver = mesh_solver.MeshSolver(vertices, [(0, 1, 2)], uvs, uv_triangles=[(0, 2, 3)])
+    result = solver.closest([(0.25, 1.0, 0.25)])
+    np.testing.assert_allclose(result.point, [(0.25, 0.0, 0.25)])
+    np.testing.assert_allclose(result.uv, [(0.25, 0.25)])
+    assert result.distance[0] == pytest.approx(1.0)
+
+
+def test_tangent_weights_follow_u():
+    vertices, triangles, uvs = wavy_grid()
+    solver = mesh_solver.MeshSolver(vertices, triangles, uvs)
+    all_triangles = np.arange(len(triangles))
+    weights = solver.tangent_weights(all_triangles)
+    tangents = np.einsum("ij,ijk->ik", weights, vertices[triangles])
+    # dU/dP along the tangent is positive and dV/dP is zero
+    corner_uvs = uvs[triangles]
+    np.testing.assert_allclose(np.einsum("ij,ij->i", weights, corner_uvs[:, :, 1]), 0.0, atol=1e-12)
+    assert (np.einsum("ij,ij->i", weights, corner_uvs[:, :, 0]) > 0.0).all()
+    assert (np.linalg.norm(tangents, axis=1) > 0.0).all()
+
+
+def test_bvh_needs_items():
+    with pytest.raises(ValueError):
+        mesh_solver.BVH(np.zeros((0, 3)), np.zeros((0, 3)))
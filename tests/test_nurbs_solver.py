@@ -0,0 +1,114 @@
+"""NurbsSolver against a Cox-de Boor evaluation and a dense parameter grid"""
+
+import numpy as np
+import pytest
+
+from follicle_kernels import nurbs_solver
+
+
+def basis(knots, i, degree, u):
+    """Cox-de Boor recursion, the last span includes the end of the knot range"""
+    if degree == 0:
+        if knots[i] <= u < knots[i + 1]:
+            return 1.0
+        last = u == knots[-1] and knots[i] < knots[i + 1] == knots[-1]
+        return 1.0 if last else 0.0
+    value = 0.0
+    if knots[i + degree] > knots[i]:
+        value += (u - knots[i]) / (knots[i + degree] - knots[i]) * basis(knots, i, degree - 1, u)
+    if knots[i + degree + 1] > knots[i + 1]:
+        value += ((knots[i + degree + 1] - u) / (knots[i + degree + 1] - knots[i + 1])
+                  * basis(knots, i + 1, degree - 1, u))
+    return value
+
+
+def reference_point(cvs, weights, knots_u, knots_v, degree_u, degree_v, u, v):
+    count_u, count_v = weights.shape
+    point = np.zeros(3)
+    total = 0.0
+    for i in range(count_u):
+        basis_u = basis(knots_u, i, degree_u, u)
+        if not basis_u:
+            continue
+        for j in range(count_v):
+            weight = basis_u * basis(knots_v, j, degree_v, v) * weights[i, j]
+            point += weight * cvs[i, j]
+            total += weight
+    return point / total
+
+
+@pytest.fixture(params=[False, True], ids=["polynomial", "rational"])
+def surface(request):
+    """Bicubic by quadratic patch over the knot ranges [2, 5] and [-1, 1]"""
+    count_u, count_v = 5, 4
+    u_grid, v_grid = np.meshgrid(np.linspace(0.0, 4.0, count_u), np.linspace(0.0, 3.0, count_v), indexing="ij")
+    cvs = np.stack([u_grid, 0.6 * np.sin(u_grid) * np.cos(v_grid), v_grid], axis=-1)
+    weights = np.ones((count_u, count_v))
+    if request.param:
+        weights = np.random.RandomState(1).uniform(0.5, 2.0, size=(count_u, count_v))
+    # Maya knot vectors, numCVs + degree - 1 knots
+    maya_u = [2.0, 2.0, 2.0, 3.5, 5.0, 5.0, 5.0]
+    maya_v = [-1.0, -1.0, 0.0, 1.0, 1.0]
+    return {"cvs": cvs, "weights": weights, "degree_u": 3, "degree_v": 2,
+            "knots_u": nurbs_solver.maya_knots(maya_u), "knots_v": nurbs_solver.maya_knots(maya_v)}
+
+
+def make_solver(surface):
+    return nurbs_solver.NurbsSolver(surface["cvs"], surface["knots_u"], surface["knots_v"],
+                                    surface["degree_u"], surface["degree_v"], weights=surface["weights"])
+
+
+def test_maya_knots_adds_the_end_knots():
+    np.testing.assert_array_equal(nurbs_solver.maya_knots([0, 0, 0, 1, 1, 1]), [0, 0, 0, 0, 1, 1, 1, 1])
+
+
+def test_evaluate_matches_cox_de_boor(surface):
+    solver = make_solver(surface)
+    u, v = np.meshgrid(np.linspace(2.0, 5.0, 7), np.linspace(-1.0, 1.0, 5))
+    points = solver.evaluate(u.ravel(), v.ravel())[0, 0]
+    for point, u_val, v_val in zip(points, u.ravel(), v.ravel()):
+        expected = reference_point(surface["cvs"], surface["weights"], surface["knots_u"], surface["knots_v"],
+                                   surface["degree_u"], surface["degree_v"], u_val, v_val)
+        np.testing.assert_allclose(point, expected, atol=1e-12)
+
+
+def test_first_derivatives_match_finite_differences(surface):
+    solver = make_solver(surface)
+    u, v, step = np.array([2.7, 4.1]), np.array([-0.3, 0.6]), 1e-6
+    derivatives = solver.evaluate(u, v, order=1)
+    along_u = (solver.evaluate(u + step, v)[0, 0] - solver.evaluate(u - step, v)[0, 0]) / (2.0 * step)
+    along_v = (solver.evaluate(u, v + step)[0, 0] - solver.evaluate(u, v - step)[0, 0]) / (2.0 * step)
+    np.testing.assert_allclose(derivatives[1, 0], along_u, atol=1e-6)
+    np.testing.assert_allclose(derivatives[0, 1], along_v, atol=1e-6)
+
+
+def test_closest_matches_dense_grid(surface):
+    solver = make_solver(surface)
+    points = np.random.RandomState(5).uniform((-0.5, -1.0, -0.5), (4.5, 1.0, 3.5), size=(60, 3))
+    result = solver.closest(points)
+
+    u, v = np.meshgrid(np.linspace(2.0, 5.0, 301), np.linspace(-1.0, 1.0, 201))
+    samples = solver.evaluate(u.ravel(), v.ravel())[0, 0]
+    brute_distance = np.linalg.norm(points[:, None] - samples[None], axis=-1).min(axis=1)
+
+    # Newton refines past the grid, it can only be closer, and not by more than the grid spacing allows
+    assert (result.distance <= brute_distance + 1e-9).all()
+    np.testing.assert_allclose(result.distance, brute_distance, atol=5e-3)
+    for point, u_val, v_val in zip(result.point, result.u, result.v):
+        expected = reference_point(surface["cvs"], surface["weights"], surface["knots_u"], surface["knots_v"],
+                                   surface["degree_u"], surface["degree_v"], u_val, v_val)
+        np.testing.assert_allclose(point, expected, atol=1e-9)
+
+
+def test_uvs_are_normalized(surface):
+    solver = make_solver(surface)
+    corners = solver.evaluate(np.array([2.0, 5.0, 2.0, 5.0]), np.array([-1.0, -1.0, 1.0, 1.0]))[0, 0]
+    result = solver.closest(corners)
+    np.testing.assert_allclose(result.uv, [(0, 0), (1, 0), (0, 1), (1, 1)], atol=1e-6)
+    np.testing.assert_allclose(result.uv, solver.normalize(result.u, result.v))
+
+
+def test_knots_must_match_the_cvs(surface):
+    with pytest.raises(ValueError):
+        nurbs_solver.NurbsSolver(surface["cvs"], surface["knots_u"][1:], surface["knots_v"],
+                                 surface["degree_u"], surface["degree_v"])
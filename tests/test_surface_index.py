@@ -0,0 +1,51 @@
+"""SurfaceIndex against the distance to every surface"""
+
+import numpy as np
+
+from follicle_kernels import mesh_solver
+from follicle_kernels.surface_index import SurfaceIndex
+
+
+def square(offset, size=1.0):
+    """Two triangles over a square of the XZ plane, moved by offset"""
+    vertices = np.array([(0.0, 0.0, 0.0), (size, 0.0, 0.0), (0.0, 0.0, size), (size, 0.0, size)]) + offset
+    return vertices, np.array([(0, 2, 3), (0, 3, 1)]), vertices[:, [0, 2]]
+
+
+def surfaces(count=12):
+    offsets = np.random.RandomState(5).uniform(-4.0, 4.0, size=(count, 3))
+    return [mesh_solver.MeshSolver(*square(offset)) for offset in offsets]
+
+
+def index_of(solvers, leaf_size=1):
+    box_min = [solver.vertices.min(axis=0) for solver in solvers]
+    box_max = [solver.vertices.max(axis=0) for solver in solvers]
+    return SurfaceIndex(box_min, box_max, lambda surface: solvers[surface], leaf_size=leaf_size)
+
+
+def test_nearest_matches_every_surface():
+    solvers = surfaces()
+    points = np.random.RandomState(7).uniform(-5.0, 5.0, size=(300, 3))
+    surface, distance = index_of(solvers).nearest(points)
+
+    distances = np.column_stack([solver.closest(points).distance for solver in solvers])
+    np.testing.assert_allclose(distance, distances.min(axis=1))
+    np.testing.assert_allclose(distances[np.arange(len(points)), surface], distance)
+
+
+def test_nearest_only_measures_the_candidate_surfaces():
+    # squares in a row, two units apart
+    solvers = [mesh_solver.MeshSolver(*square((3.0 * i, 0.0, 0.0))) for i in range(8)]
+    built = []
+    index = SurfaceIndex([solver.vertices.min(axis=0) for solver in solvers],
+                         [solver.vertices.max(axis=0) for solver in solvers],
+                         lambda surface: built.append(surface) or solvers[surface])
+    surface, distance = index.nearest([(3.5, 0.0, 0.5)])
+    assert surface[0] == 1 and distance[0] == 0.0
+    # every other box is farther than the square holding the point
+    assert built == [1]
+
+
+def test_nearest_of_no_point():
+    surface, distance = index_of(surfaces()).nearest(np.zeros((0, 3)))
+    assert surface.shape == (0,) and distance.shape == (0,)
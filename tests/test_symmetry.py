@@ -0,0 +1,57 @@
+"""Mirror maps of surfaces symmetric across the YZ plane"""
+
+import numpy as np
+
+from follicle_kernels import symmetry
+
+
+def grid(columns=4, rows=3):
+    """Quad grid of the XY plane from x -1 to 1, with UVs following x and y"""
+    x, y = np.meshgrid(np.linspace(-1.0, 1.0, columns + 1), np.linspace(0.0, 1.0, rows + 1))
+    points = np.column_stack([x.ravel(), y.ravel(), np.zeros(x.size)])
+    corners = np.array([(row * (columns + 1) + column, row * (columns + 1) + column + 1,
+                         (row + 1) * (columns + 1) + column + 1, (row + 1) * (columns + 1) + column)
+                        for row in range(rows) for column in range(columns)])
+    triangles = np.concatenate([corners[:, [0, 1, 2]], corners[:, [0, 2, 3]]], axis=1).reshape(-1, 3)
+    return points, corners, triangles
+
+
+def test_vertex_mirror_map_is_an_involution():
+    points, _, _ = grid()
+    mirror_map = symmetry.vertex_mirror_map(points)
+
+    np.testing.assert_array_equal(mirror_map[mirror_map], np.arange(len(points)))
+    np.testing.assert_allclose(points[mirror_map], symmetry.mirror_points(points))
+    # the vertices on the plane are their own mirror
+    on_plane = np.flatnonzero(points[:, 0] == 0.0)
+    np.testing.assert_array_equal(mirror_map[on_plane], on_plane)
+
+
+def test_vertex_mirror_map_of_a_moved_vertex():
+    points, _, _ = grid()
+    points[0, 0] += 0.1
+    assert symmetry.vertex_mirror_map(points) is None
+
+
+def test_mesh_uv_mirror_flips_u():
+    points, corners, triangles = grid()
+    uvs = np.column_stack([(points[:, 0] + 1.0) / 2.0, points[:, 1]])
+    mesh_mirror = symmetry.mesh_uv_mirror(points, np.full(len(corners), 4), corners.ravel(),
+                                          np.full(len(corners), 4), corners.ravel(), uvs,
+                                          np.arange(len(corners)) * 2, triangles, triangles)
+
+    uv = np.random.RandomState(3).uniform(0.0, 1.0, size=(50, 2))
+    np.testing.assert_allclose(mesh_mirror.mirror(uv), np.column_stack([1.0 - uv[:, 0], uv[:, 1]]), atol=1e-9)
+
+
+def test_nurbs_uv_mirror_finds_the_flipped_direction():
+    u, v = np.meshgrid(np.linspace(-1.0, 1.0, 4), np.linspace(0.0, 2.0, 5), indexing="ij")
+    cvs = np.stack([u, v, u ** 2], axis=-1)
+    knots_u = [0.0, 0.0, 0.0, 1.0, 1.0, 1.0]
+    knots_v = [0.0, 0.0, 0.0, 1.0, 2.0, 2.0, 2.0]
+
+    mirror = symmetry.nurbs_uv_mirror(cvs, np.ones(u.shape), knots_u, knots_v)
+    assert (mirror.flip_u, mirror.flip_v) == (True, False)
+
+    cvs[0, 0, 1] += 0.1
+    assert symmetry.nurbs_uv_mirror(cvs, np.ones(u.shape), knots_u, knots_v) is None